@@ -0,0 +1,117 @@
+import argparse
+import heapq
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# --- Leaderboard Server ---
+# A small HTTP leaderboard for running on localhost or the LAN:
+#   POST /scores  {"scores": [{"name": "Liam", "score": 58}, ...]}  -> {"accepted": 1}
+#   GET  /top?limit=10                                             -> {"scores": [{"name": ..., "score": ...}, ...]}
+# Each name keeps its best score. Start it with:  python leaderboard_server.py --port 8765
+
+DEFAULT_PORT = 8765
+MAX_TOP_LIMIT = 100 # Largest top-N a single request may ask for
+MAX_BATCH_SIZE = 1000 # Submissions accepted per POST
+
+class Leaderboard:
+    """Best score per player name, optionally persisted to a JSON file after every accepted batch."""
+    def __init__(self, data_path=None):
+        self.data_path = data_path
+        self.best_scores = {} # name -> best score
+        self.lock = threading.Lock()
+        if data_path and os.path.exists(data_path):
+            with open(data_path, "r") as file:
+                self.best_scores = json.load(file)
+            print(f"Leaderboard: Loaded {len(self.best_scores)} players from {data_path}")
+
+    def submit(self, scores):
+        """Records a batch of (name, score) pairs and returns how many raised a player's best."""
+        accepted = 0
+        with self.lock:
+            for name, score in scores:
+                if score > self.best_scores.get(name, -1):
+                    self.best_scores[name] = score
+                    accepted += 1
+            if accepted and self.data_path:
+                self._save()
+        return accepted
+
+    def _save(self):
+        temp_path = self.data_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.best_scores, file)
+        os.replace(temp_path, self.data_path)
+
+    def top(self, limit):
+        with self.lock:
+            best = heapq.nlargest(limit, self.best_scores.items(), key=lambda item: item[1])
+        return [{'name': name, 'score': score} for name, score in best]
+
+class LeaderboardRequestHandler(BaseHTTPRequestHandler):
+    leaderboard = None # Set on the subclass make_server() creates
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/top":
+            self._send_json(404, {'error': "not found"})
+            return
+        try:
+            limit = int(parse_qs(url.query).get('limit', ["10"])[0])
+        except ValueError:
+            self._send_json(400, {'error': "limit must be an integer"})
+            return
+        self._send_json(200, {'scores': self.leaderboard.top(max(0, min(limit, MAX_TOP_LIMIT)))})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/scores":
+            self._send_json(404, {'error': "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            entries = json.loads(self.rfile.read(length))['scores'][:MAX_BATCH_SIZE]
+            scores = [(str(entry['name']), int(entry['score'])) for entry in entries]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': "expected {\"scores\": [{\"name\": ..., \"score\": ...}]}"})
+            return
+        self._send_json(200, {'accepted': self.leaderboard.submit(scores)})
+
+    def log_message(self, format, *args):
+        pass # Keep the console quiet; every game submits in the background
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, data_path=None):
+    """Creates (but does not start) a server; port 0 picks a free port, handy for loopback tests."""
+    handler = type("BoundLeaderboardRequestHandler", (LeaderboardRequestHandler,),
+                   {'leaderboard': Leaderboard(data_path)})
+    return ThreadingHTTPServer((host, port), handler)
+
+def start_server_thread(host="127.0.0.1", port=0, data_path=None):
+    """Starts a server on a daemon thread and returns it; its URL is http://host:server.server_port."""
+    server = make_server(host, port, data_path)
+    threading.Thread(target=server.serve_forever, name="leaderboard-server", daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Boot.dev Platformer leaderboard server")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (0.0.0.0 to serve the LAN)")
+    arg_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    arg_parser.add_argument("--data", metavar="PATH", help="JSON file the scores are kept in between runs")
+    args = arg_parser.parse_args()
+
+    server = make_server(args.host, args.port, args.data)
+    print(f"Leaderboard: Serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
@@ -3,6 +3,53 @@ import os
 import random
 import math
 import json
+import argparse
+import time
+import weakref
+import csv
+import hashlib
+import mmap
+import io
+import contextlib
+import platform
+import statistics
+import sqlite3
+import threading
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+np = None # NumPy, imported by EnemyArrayStore.available() only when --vectorized-enemies is on
+
+# --- Startup Timing ---
+class StartupTimer:
+    """Splits launch time into named phases so the startup report shows where it goes."""
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.last_time = self.start_time
+        self.phases = [] # (name, seconds)
+        self.reported = False
+
+    def mark(self, name):
+        """Ends the phase that started at the previous mark (or at launch)."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last_time))
+        self.last_time = now
+
+    def finish(self, name=None):
+        """Marks the final phase (if named) and prints the report, only the first time it is called."""
+        if self.reported:
+            return
+        if name:
+            self.mark(name)
+        print(self.report())
+        self.reported = True
+
+    def report(self):
+        phases = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases)
+        return f"Startup: {phases} (total {(self.last_time - self.start_time) * 1000:.0f} ms)"
+
+startup_timer = StartupTimer()
 
 # --- Game Constants ---
 SCREEN_WIDTH = 800
@@ -28,6 +75,15 @@ FIRE_DASH_DURATION = 20 # Frames for fire dash
 FIRE_DASH_SPEED_MULTIPLIER = 4 # How much faster the player moves during fire dash
 FIRE_DASH_COOLDOWN = 120 # Frames (2 seconds cooldown for fire dash)
 
+# Simulation Timing
+# Every "Frames" duration in this file counts fixed simulation steps, so gameplay speed
+# no longer depends on how fast the screen is redrawn
+SIM_HZ = 60 # Simulation steps per second
+SIM_STEP = 1.0 / SIM_HZ # Seconds of game time per simulation step
+MAX_FRAME_TIME = 0.25 # Longer stalls (window drag, breakpoint) are not caught up
+MAX_SIM_STEPS_PER_FRAME = 8 # Catch-up limit per rendered frame under sustained load
+RENDER_SNAP_DISTANCE = 64 # Pixels; larger jumps in one step (respawns, knockback) are drawn without interpolation
+
 
 # Boss Constants
 BOSS_WIDTH = 80
@@ -76,6 +132,7 @@ ORANGE = (255, 165, 0) # For selected player text
 GOLD = (255, 215, 0) # For weapon select highlights
 ENEMY_GREEN = (0, 150, 0) # Default enemy color if image fails
 FIRE_RED = (255, 50, 0, 180) # For fire dash visual (R,G,B, Alpha)
+ROLL_CYAN = (0, 255, 255, 128) # For roll visual (R,G,B, Alpha)
 FLYER_TEAL = (0, 128, 128) # Fallback for flyer enemy
 
 
@@ -91,6 +148,13 @@ INITIAL_LIVES = 3
 BOSS_APPEAR_INTERVAL = 5 # Boss appears every 5 levels
 # Maximum vertical distance player can jump relative to previous platform
 MAX_PLATFORM_JUMP_HEIGHT = 180 # Pixels (allows for comfortable double jumping to next platform)
+MAX_PLATFORM_JUMP_DISTANCE = 120 # Horizontal gap (pixels) the player can clear between two platforms
+LEVEL_GEN_ATTEMPTS = 40 # Candidate placements tried per platform before the generator gives up on it
+
+# Terrain index constants
+TERRAIN_CELL_SIZE = 64 # Pixels per side of a terrain grid cell
+TERRAIN_QUERY_MARGIN = 16 # Extra pixels around an entity's movement when looking up nearby platforms
+COLLISION_CELL_SIZE = 64 # Pixels per side of a collision broadphase cell
 
 # Power-up specific constants
 BLAST_ATTACK_UNLOCK_LEVEL = 1 # Player gets blast attack from level 2 (current_level 1)
@@ -112,6 +176,68 @@ NEW_ENEMY_SPAWN_LEVEL = 3 # New enemy types (Shooter, Guard) appear after level
 
 # --- File Paths ---
 PLAYER_PROFILES_FILE = "player_profiles.json" # For multiple player profiles
+ASSET_CACHE_DIR = "asset_cache" # Pre-scaled raw images written by --build-assets
+ASSET_MANIFEST_FILE = "manifest.json" # Inside ASSET_CACHE_DIR: one entry per (source, size, alpha) -> cache file
+ASSET_MANIFEST_VERSION = 2 # Manifests written with another version are ignored until --build-assets runs again
+PROFILES_PER_PAGE = 4 # Profiles listed per page on the player select screen
+ASSET_LOADER_THREADS = 4 # Worker threads decoding image files at startup
+
+# --- Command Line Options ---
+arg_parser = argparse.ArgumentParser(description="Boot.dev Platformer")
+arg_parser.add_argument("--headless", action="store_true",
+                        help="Run the game logic with no window and no frame cap, then report simulated FPS")
+arg_parser.add_argument("--levels", type=int, default=10, help="Number of levels to simulate in headless mode")
+arg_parser.add_argument("--frames-per-level", type=int, default=600, help="Frames to simulate per level in headless mode")
+arg_parser.add_argument("--dirty-rects", action="store_true",
+                        help="Only repaint and push the screen regions that changed during gameplay (for low-power displays)")
+arg_parser.add_argument("--fps", type=int, default=60,
+                        help="Render frame-rate cap, 0 for uncapped (the simulation always steps at SIM_HZ)")
+arg_parser.add_argument("--profile-csv", metavar="PATH",
+                        help="Write per-frame timings of each game loop phase to a CSV file (F3 shows them on screen)")
+arg_parser.add_argument("--input-latency", action="store_true",
+                        help="Measure key press to display latency per gameplay action and print histograms at exit")
+arg_parser.add_argument("--seed", type=int, help="Seed for level generation and enemy randomness (random if omitted)")
+arg_parser.add_argument("--record", metavar="PATH", help="Record the session's seed and per-frame input to a replay file")
+arg_parser.add_argument("--replay", metavar="PATH",
+                        help="Play back a recorded session frame by frame (combine with --headless to time it without drawing)")
+arg_parser.add_argument("--vectorized-enemies", action="store_true",
+                        help="Update enemies as batched NumPy array operations (for swarm levels with thousands of enemies)")
+arg_parser.add_argument("--profile-db", metavar="PATH",
+                        help="Keep player profiles in an SQLite database (created from player_profiles.json if new)")
+arg_parser.add_argument("--leaderboard-url", metavar="URL",
+                        help="Submit high scores to a leaderboard_server.py instance, e.g. http://127.0.0.1:8765")
+arg_parser.add_argument("--benchmark", action="store_true",
+                        help="Time the simulation hot paths (updates, collisions, drawing, setup_game) without a window")
+arg_parser.add_argument("--benchmark-sizes", default="10x10,100x50,1000x200", metavar="ExP,...",
+                        help="Comma-separated entity x platform counts to benchmark (default: 10x10,100x50,1000x200)")
+arg_parser.add_argument("--benchmark-out", metavar="PATH", help="Save benchmark results to a JSON file")
+arg_parser.add_argument("--benchmark-baseline", metavar="PATH",
+                        help="Compare benchmark results with a JSON file saved by an earlier --benchmark-out run")
+arg_parser.add_argument("--build-assets", action="store_true",
+                        help="Write pre-scaled raw copies of every image and a manifest to asset_cache/, then exit")
+arg_parser.add_argument("--verbose", action="store_true",
+                        help="Print gameplay events (spawns, level starts, pickups) in --headless and --benchmark runs too")
+
+# --- Game Event Log ---
+log_game_events = True # main() turns the per-level chatter off for --headless and --benchmark unless --verbose
+
+def log_game_event(message):
+    """Prints a gameplay event (a spawn, level start, pickup or score), unless event logging is off."""
+    if log_game_events:
+        print(message)
+
+# --- Session Seed ---
+# Level layout and enemy randomness all come from game_rng, so a session is reproducible from its seed
+replay_data = None # The recording being played back by --replay
+session_seed = None
+game_rng = random.Random()
+
+def seed_session(seed=None):
+    """Reseeds game_rng for a new session (with a random seed if none is given) and returns the seed."""
+    global session_seed
+    session_seed = random.randrange(2 ** 32) if seed is None else seed
+    game_rng.seed(session_seed)
+    return session_seed
 
 # Declare these as global variables at the module level.
 player = None # This will be initialized once, outside setup_game
@@ -131,15 +257,15 @@ orbiting_lights_group = pygame.sprite.Group() # Global group for all orbiting li
 # Boss related global variables
 boss_active = False
 boss_sprite = None
+boss_group = pygame.sprite.GroupSingle() # Holds boss_sprite while it is alive
 boss_projectiles = pygame.sprite.Group() # Boss dark blast projectiles
 
 score = 0
 lives = INITIAL_LIVES
 current_level = 0 # Track the current level
 
-# Multi-player profiles
-player_profiles = [] # List of dictionaries: [{'name': 'Liam', 'high_score': 0}, ...]
-selected_player_index = -1 # Index of the currently active player in player_profiles
+# Multi-player profiles (the profiles themselves live in profile_store)
+selected_player_index = -1 # Index of the currently active player in profile_store
 selected_player_name = "Guest" # Display name of the currently active player
 high_score = 0 # High score for the currently selected player (updated from profile)
 
@@ -160,264 +286,1064 @@ GAME_STATE_CREATE_PLAYER = 7 # New state for creating a new player
 GAME_STATE_WEAPON_SELECT = 8 # New state for weapon selection
 
 
-# Initialize Pygame
-pygame.init()
-
-# Set up the display screen
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Boot.dev Platformer")
+# --- Display ---
+# Set by init_display(); importing the module never initializes pygame or opens a window
+screen = None
+clock = None
+font = menu_font_large = menu_font_medium = menu_font_small = game_over_font = None
+
+def init_display(headless=False):
+    """Initializes pygame and creates the screen, clock and fonts (on SDL's dummy drivers if headless)."""
+    global screen, clock, font, menu_font_large, menu_font_medium, menu_font_small, game_over_font
+    if headless:
+        # SDL's dummy drivers give us a display surface (needed for convert()) without opening a window
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pygame.init()
+
+    # Set up the display screen
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Boot.dev Platformer")
+
+    # Create a clock object
+    clock = pygame.time.Clock()
+    startup_timer.mark("pygame init")
+
+    # Set up fonts
+    font = pygame.font.Font(None, 36)
+    menu_font_large = pygame.font.Font(None, 74)
+    menu_font_medium = pygame.font.Font(None, 40) # New font size for subheadings
+    menu_font_small = pygame.font.Font(None, 30) # Adjusted for controls list
+    game_over_font = pygame.font.Font(None, 100)
+    startup_timer.mark("fonts")
+
+
+# --- Asset Manager ---
+class AssetManager:
+    """
+    Loads, converts and scales each image once per (path, size, alpha) and hands out the shared surface.
+    With a cache_dir built by --build-assets, images come from pre-scaled raw pixel files instead of
+    being decoded, as long as their source file hasn't changed.
+    """
+    def __init__(self, cache_dir=None):
+        self.images = {} # (path, size, alpha) -> Surface, or None if the file couldn't be loaded
+        self.labels = {} # (path, size, alpha) -> label it was first loaded with (names its cache file)
+        self.scaled = weakref.WeakKeyDictionary() # source surface -> {size: scaled copy}
+        self.hits = 0
+        self.misses = 0
+        self.decoded = {} # path -> decoded file before conversion, or None if it couldn't be loaded
+        self.decoding = {} # path -> Future of the decoded surface
+        self.decode_seconds = {} # path -> worker time spent decoding it
+        self.executor = None # Created by the first prefetch()
+        self.cache_dir = cache_dir
+        self.cache_entries = {} # (path, size, alpha) -> manifest entry
+        self.source_checks = {} # path -> whether the file still matches the manifest (checked once per run)
+        self.cache_loads = 0
+        if cache_dir:
+            self._read_manifest()
+
+    def prefetch(self, paths):
+        """
+        Starts decoding image files on worker threads. load() converts and scales the result on
+        first use, waiting for the decode only if it hasn't finished yet.
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=ASSET_LOADER_THREADS, thread_name_prefix="asset-decode")
+        for path in paths:
+            if path not in self.decoding and not self._cached(path):
+                self.decoding[path] = self.executor.submit(self._decode, path)
+
+    def _decode(self, path):
+        start_time = time.perf_counter()
+        try:
+            return pygame.image.load(path) # pygame releases the GIL while the image library decodes
+        finally:
+            self.decode_seconds[path] = time.perf_counter() - start_time
 
-# Create a clock object
-clock = pygame.time.Clock()
+    def load(self, path, size=None, alpha=True, label=""):
+        """
+        Returns the image at path converted for the display (with per-pixel alpha unless alpha=False)
+        and scaled to size, or None if it can't be loaded. Callers must not draw onto the result.
+        """
+        key = (path, size, alpha)
+        if key in self.images:
+            self.hits += 1
+            return self.images[key]
+        self.misses += 1
+
+        self.labels[key] = label
+        image = self._load_cached(key)
+        if image:
+            self.cache_loads += 1
+            self.images[key] = image
+            return image
+
+        description = f"{path} ({label})" if label else path
+        if path in self.decoded: # Same file at another size or alpha: skip the disk read and decode
+            source = self.decoded[path]
+        else:
+            source = None
+            try:
+                future = self.decoding.pop(path, None)
+                source = future.result() if future else pygame.image.load(path)
+                print(f"Asset Load: {description} loaded successfully.")
+            except (pygame.error, FileNotFoundError): # pygame 2 raises FileNotFoundError for missing files
+                print(f"Asset Load: ERROR - {description} not found.")
+            self.decoded[path] = source
+
+        image = None
+        if source:
+            # Scaling before converting means large source files are never converted at full size
+            if size and source.get_size() != (int(size[0]), int(size[1])):
+                source = pygame.transform.scale(source, (int(size[0]), int(size[1])))
+            image = source.convert_alpha() if alpha else source.convert()
+        self.images[key] = image
+        return image
+
+    def release_sources(self):
+        """
+        Drops the full-resolution decoded files once the sizes they feed are built; a later load at
+        a new size decodes the file again. Files that failed to load stay marked as missing.
+        """
+        self.decoded = {path: None for path, source in self.decoded.items() if source is None}
 
-# Set up fonts
-font = pygame.font.Font(None, 36)
-menu_font_large = pygame.font.Font(None, 74)
-menu_font_medium = pygame.font.Font(None, 40) # New font size for subheadings
-menu_font_small = pygame.font.Font(None, 30) # Adjusted for controls list
-game_over_font = pygame.font.Font(None, 100)
+    # --- Pre-converted asset cache (--build-assets) ---
+    def _read_manifest(self):
+        manifest_path = os.path.join(self.cache_dir, ASSET_MANIFEST_FILE)
+        try:
+            with open(manifest_path, "r") as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return # No cache built yet: decode as usual
+        except (OSError, ValueError) as e:
+            print(f"Asset Cache: Ignoring unreadable manifest {manifest_path}: {e}")
+            return
+        if manifest.get('version') != ASSET_MANIFEST_VERSION:
+            print(f"Asset Cache: Ignoring {manifest_path} from another version; run --build-assets to rebuild it")
+            return
+        for entry in manifest.get('assets', []):
+            size = tuple(entry['size']) if entry['size'] else None
+            self.cache_entries[(entry['source'], size, entry['alpha'])] = entry
+
+    def _source_unchanged(self, entry):
+        """
+        True if the entry's source file is the one the cache was built from: same size and mtime,
+        or (after a touch or checkout) the same SHA-256.
+        """
+        path = entry['source']
+        if path not in self.source_checks:
+            try:
+                stat = os.stat(path)
+                unchanged = stat.st_size == entry['source_size'] and \
+                    (stat.st_mtime_ns == entry['source_mtime_ns'] or file_sha256(path) == entry['source_sha256'])
+            except OSError:
+                unchanged = False # Source gone: load() reports it missing as usual
+            self.source_checks[path] = unchanged
+        return self.source_checks[path]
+
+    def _cached(self, path):
+        """True if every cache entry for path is still valid (so there's nothing to decode)."""
+        entries = [entry for entry in self.cache_entries.values() if entry['source'] == path]
+        return bool(entries) and all(self._source_unchanged(entry) for entry in entries)
+
+    def _load_cached(self, key):
+        entry = self.cache_entries.get(key)
+        if entry is None or not self._source_unchanged(entry):
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, entry['file']), "rb") as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                # The surface reads straight from the mapped file; converting copies it into display format
+                raw = pygame.image.frombuffer(buffer, tuple(entry['size']), entry['format'])
+                image = raw.convert_alpha() if entry['alpha'] else raw.convert()
+                del raw # Releases the buffer so the mapping can close
+            finally:
+                buffer.close()
+        except (OSError, ValueError, pygame.error) as e:
+            print(f"Asset Cache: Could not read {entry['file']}: {e}")
+            return None
+        return image
 
+    def write_cache(self, cache_dir):
+        """
+        Writes every image loaded so far as raw pixels plus a manifest with one entry per
+        (path, size, alpha), the key load() looks them up by; returns the entry count.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest = {'version': ASSET_MANIFEST_VERSION, 'assets': []}
+        file_names = set()
+        for (path, size, alpha), image in self.images.items():
+            if image is None:
+                continue
+            name = self.labels.get((path, size, alpha)) or os.path.splitext(path)[0]
+            pixel_format = "RGBA" if alpha else "RGB"
+            width, height = image.get_size()
+            stem = f"{name.lower().replace(' ', '_')}_{width}x{height}"
+            file_name = f"{stem}.{pixel_format.lower()}"
+            copy_number = 1
+            while file_name in file_names: # Same label and size from another file
+                copy_number += 1
+                file_name = f"{stem}_{copy_number}.{pixel_format.lower()}"
+            file_names.add(file_name)
+            with open(os.path.join(cache_dir, file_name), "wb") as file:
+                file.write(pygame.image.tobytes(image, pixel_format))
+            stat = os.stat(path)
+            manifest['assets'].append({
+                'label': name,
+                'source': path,
+                'size': list(size) if size else None,
+                'alpha': alpha,
+                'file': file_name,
+                'format': pixel_format,
+                'source_size': stat.st_size,
+                'source_mtime_ns': stat.st_mtime_ns,
+                'source_sha256': file_sha256(path),
+            })
+        manifest_path = os.path.join(cache_dir, ASSET_MANIFEST_FILE)
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump(manifest, file, indent=4)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        return len(manifest['assets'])
+
+    def scale(self, surface, size):
+        """Returns a shared copy of surface scaled to size (surface itself if it already has that size)."""
+        size = (int(size[0]), int(size[1]))
+        if surface.get_size() == size:
+            return surface
+        sizes = self.scaled.get(surface)
+        if sizes is None:
+            sizes = {}
+            self.scaled[surface] = sizes
+        scaled = sizes.get(size)
+        if scaled is None:
+            self.misses += 1
+            scaled = pygame.transform.scale(surface, size)
+            sizes[size] = scaled
+        else:
+            self.hits += 1
+        return scaled
+
+    def report(self):
+        loaded = sum(1 for image in self.images.values() if image is not None)
+        return f"Asset Cache: {loaded} images cached, {self.hits} hits, {self.misses} misses"
+
+    def decode_report(self):
+        decode_time = sum(self.decode_seconds.values())
+        slowest = max(self.decode_seconds, key=self.decode_seconds.get, default=None)
+        report = f"Asset Load: {len(self.decode_seconds)} files decoded on {ASSET_LOADER_THREADS} threads ({decode_time * 1000:.0f} ms of decoding"
+        if slowest:
+            report += f", slowest {slowest} {self.decode_seconds[slowest] * 1000:.0f} ms"
+        if self.cache_loads:
+            report += f"; {self.cache_loads} images read from the asset cache"
+        return report + ")"
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+assets = AssetManager() # Replaced by load_menu_assets(), which can read from the asset cache
 
 # --- Load Global Assets ---
-BACKGROUND_IMAGE = None # Initialize to None
-try:
-    BACKGROUND_IMAGE = pygame.image.load('background_image.png').convert()
-    BACKGROUND_IMAGE = pygame.transform.scale(BACKGROUND_IMAGE, (SCREEN_WIDTH, SCREEN_HEIGHT))
-    print("Asset Load: background_image.png loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - background_image.png not found. Using default light blue background.")
-    pass # No default image, will use screen.fill(LIGHT_BLUE) later
-
-# Player Combat Assets
-SLASH_IMAGE = None
-try:
-    SLASH_IMAGE = pygame.image.load('image_628cc4.png').convert_alpha()
-    SLASH_IMAGE = pygame.transform.scale(SLASH_IMAGE, (PLAYER_WIDTH * 2, PLAYER_HEIGHT * 2)) # Larger for effect
-    print("Asset Load: image_628cc4.png (Slash) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_628cc4.png (Slash) not found.")
-
-BLAST_IMAGE = None
-try:
-    BLAST_IMAGE = pygame.image.load('image_629081.png').convert_alpha()
-    BLAST_IMAGE = pygame.transform.scale(BLAST_IMAGE, (PROJECTILE_SIZE * 2, PROJECTILE_SIZE * 2)) # Larger than actual collision size
-    print("Asset Load: image_629081.png (Blast) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_629081.png (Blast) not found.")
-
-SHIELD_IMAGE = None
-try:
-    SHIELD_IMAGE = pygame.image.load('image_62e378.jpg').convert_alpha()
-    SHIELD_IMAGE = pygame.transform.scale(SHIELD_IMAGE, (SHIELD_WIDTH, SHIELD_HEIGHT))
-    print("Asset Load: image_62e378.jpg (Shield) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_62e378.jpg (Shield) not found.")
-
-# Boss Assets
-BOSS_IMAGE = None
-try:
-    BOSS_IMAGE = pygame.image.load('image_a5e99a.png').convert_alpha()
-    BOSS_IMAGE = pygame.transform.scale(BOSS_IMAGE, (BOSS_WIDTH, BOSS_HEIGHT))
-    print("Asset Load: image_a5e99a.png (Boss) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_a5e99a.png (Boss) not found.")
-
-DARK_BLAST_IMAGE = None
-try:
-    DARK_BLAST_IMAGE = pygame.image.load('image_a5e960.png').convert_alpha()
-    DARK_BLAST_IMAGE = pygame.transform.scale(DARK_BLAST_IMAGE, (BOSS_PROJECTILE_SIZE, BOSS_PROJECTILE_SIZE))
-    print("Asset Load: image_a5e960.png (Dark Blast) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_a5e960.png (Dark Blast) not found.")
-
-# Power-up Images
-DOUBLE_BLAST_POWERUP_IMAGE = None
-try:
-    DOUBLE_BLAST_POWERUP_IMAGE = pygame.image.load('image_893031.png').convert_alpha()
-    DOUBLE_BLAST_POWERUP_IMAGE = pygame.transform.scale(DOUBLE_BLAST_POWERUP_IMAGE, (COIN_SIZE, COIN_SIZE))
-    print("Asset Load: image_893031.png (Double Blast Powerup) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_893031.png (Double Blast Powerup) not found.")
-
-ORBIT_SHIELD_POWERUP_IMAGE = None
-try:
-    ORBIT_SHIELD_POWERUP_IMAGE = pygame.image.load('image_892ff0.png').convert_alpha()
-    ORBIT_SHIELD_POWERUP_IMAGE = pygame.transform.scale(ORBIT_SHIELD_POWERUP_IMAGE, (COIN_SIZE, COIN_SIZE))
-    print("Asset Load: image_892ff0.png (Orbit Shield Powerup) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_892ff0.png (Orbit Shield Powerup) not found.")
-
-ORBITING_LIGHT_IMAGE = None # Will use the same image as Orbit Shield Powerup, but scaled smaller
-try:
-    ORBITING_LIGHT_IMAGE = pygame.image.load('image_892ff0.png').convert_alpha()
-    ORBITING_LIGHT_IMAGE = pygame.transform.scale(ORBITING_LIGHT_IMAGE, (ORBIT_SHIELD_SIZE, ORBIT_SHIELD_SIZE))
-    print("Asset Load: image_892ff0.png (Orbiting Light) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_892ff0.png (Orbiting Light) not found.")
-
-JUMP_POWERUP_IMAGE = None
-try:
-    JUMP_POWERUP_IMAGE = pygame.image.load('image_7d564d.png').convert_alpha()
-    JUMP_POWERUP_IMAGE = pygame.transform.scale(JUMP_POWERUP_IMAGE, (COIN_SIZE, COIN_SIZE))
-    print("Asset Load: image_7d564d.png (Jump Powerup) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_7d564d.png (Jump Powerup) not found.")
-
-LIFE_POWERUP_IMAGE = None # New image for extra life
-try:
-    LIFE_POWERUP_IMAGE = pygame.image.load('image_33b612.jpg').convert_alpha()
-    LIFE_POWERUP_IMAGE = pygame.transform.scale(LIFE_POWERUP_IMAGE, (COIN_SIZE, COIN_SIZE))
-    print("Asset Load: image_33b612.jpg (Life Powerup) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_33b612.jpg (Life Powerup) not found.")
-
-# Weapon Images
-BIG_SWORD_IMAGE = None
-try:
-    BIG_SWORD_IMAGE = pygame.image.load('image_335fbb.png').convert_alpha()
-    BIG_SWORD_IMAGE = pygame.transform.scale(BIG_SWORD_IMAGE, (PLAYER_WIDTH * 2, PLAYER_HEIGHT * 2))
-    print("Asset Load: image_335fbb.png (Big Sword) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_335fbb.png (Big Sword) not found.")
-
-DAGGER_IMAGE = None
-try:
-    DAGGER_IMAGE = pygame.image.load('image_3358d3.png').convert_alpha()
-    DAGGER_IMAGE = pygame.transform.scale(DAGGER_IMAGE, (PLAYER_WIDTH * 2, PLAYER_HEIGHT * 2))
-    print("Asset Load: image_3358d3.png (Dagger) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_3358d3.png (Dagger) not found.")
-
-CLUB_IMAGE = None
-try:
-    CLUB_IMAGE = pygame.image.load('image_33541d.jpg').convert_alpha()
-    CLUB_IMAGE = pygame.transform.scale(CLUB_IMAGE, (PLAYER_WIDTH * 2, PLAYER_HEIGHT * 2))
-    print("Asset Load: image_33541d.jpg (Club) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_33541d.jpg (Club) not found.")
-
-# Enemy Images
-REGULAR_ENEMY_IMAGE = None # New: For generic enemies
-try:
-    # Assuming 'enemy_sprite.png' is the generic enemy sprite used previously
-    REGULAR_ENEMY_IMAGE = pygame.image.load('enemy_sprite.png').convert_alpha()
-    REGULAR_ENEMY_IMAGE = pygame.transform.scale(REGULAR_ENEMY_IMAGE, (ENEMY_WIDTH, ENEMY_HEIGHT))
-    print("Asset Load: enemy_sprite.png (Regular Enemy) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - enemy_sprite.png (Regular Enemy) not found. Using default color.")
-
-
-SHOOTER_ENEMY_IMAGE = None
-try:
-    SHOOTER_ENEMY_IMAGE = pygame.image.load('image_333e73.png').convert_alpha()
-    SHOOTER_ENEMY_IMAGE = pygame.transform.scale(SHOOTER_ENEMY_IMAGE, (SHOOTER_ENEMY_WIDTH, SHOOTER_ENEMY_HEIGHT))
-    print("Asset Load: image_333e73.png (Shooter Enemy) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_333e73.png (Shooter Enemy) not found.")
-
-SHOOTER_PROJECTILE_IMAGE = None
-try:
-    SHOOTER_PROJECTILE_IMAGE = pygame.image.load('image_334931.png').convert_alpha()
-    SHOOTER_PROJECTILE_IMAGE = pygame.transform.scale(SHOOTER_PROJECTILE_IMAGE, (SHOOTER_PROJECTILE_SIZE, SHOOTER_PROJECTILE_SIZE))
-    print("Asset Load: image_334931.png (Shooter Projectile) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_334931.png (Shooter Projectile) not found.")
-
-GUARD_ENEMY_IMAGE = None
-try:
-    GUARD_ENEMY_IMAGE = pygame.image.load('image_016ed6.png').convert_alpha()
-    GUARD_ENEMY_IMAGE = pygame.transform.scale(GUARD_ENEMY_IMAGE, (GUARD_ENEMY_WIDTH, GUARD_ENEMY_HEIGHT))
-    print("Asset Load: image_016ed6.png (Guard Enemy) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_016ed6.png (Guard Enemy) not found.")
-
-FLYER_ENEMY_IMAGE = None # New: For flyer enemies
-try:
-    FLYER_ENEMY_IMAGE = pygame.image.load('image_f33c19.png').convert_alpha()
-    FLYER_ENEMY_IMAGE = pygame.transform.scale(FLYER_ENEMY_IMAGE, (FLYER_ENEMY_WIDTH, FLYER_ENEMY_HEIGHT))
-    print("Asset Load: image_f33c19.png (Flyer Enemy) loaded successfully.")
-except pygame.error:
-    print("Asset Load: ERROR - image_f33c19.png (Flyer Enemy) not found.")
+BACKGROUND_IMAGE = None # None: use screen.fill(LIGHT_BLUE)
+
+def load_menu_assets(cache_dir=ASSET_CACHE_DIR):
+    """
+    Starts every image file decoding on worker threads and loads the background. The menu only needs
+    the background; the gameplay images are converted and scaled on first use by load_gameplay_assets().
+    """
+    global assets, BACKGROUND_IMAGE
+    assets = AssetManager(cache_dir)
+    assets.prefetch([
+        'background_image.png', 'player_sprite.png', 'coin_sprite.png', 'enemy_sprite.png',
+        'image_628cc4.png', 'image_629081.png', 'image_62e378.jpg', 'image_a5e99a.png', 'image_a5e960.png',
+        'image_893031.png', 'image_892ff0.png', 'image_7d564d.png', 'image_33b612.jpg', 'image_335fbb.png',
+        'image_3358d3.png', 'image_33541d.jpg', 'image_333e73.png', 'image_334931.png', 'image_016ed6.png',
+        'image_f33c19.png',
+    ])
+    BACKGROUND_IMAGE = assets.load('background_image.png', (SCREEN_WIDTH, SCREEN_HEIGHT), alpha=False, label="Background")
+    startup_timer.mark("menu assets")
+
+# Gameplay images, None until load_gameplay_assets() runs
+SLASH_IMAGE = BLAST_IMAGE = SHIELD_IMAGE = None
+BOSS_IMAGE = DARK_BLAST_IMAGE = None
+DOUBLE_BLAST_POWERUP_IMAGE = ORBIT_SHIELD_POWERUP_IMAGE = ORBITING_LIGHT_IMAGE = JUMP_POWERUP_IMAGE = LIFE_POWERUP_IMAGE = None
+BIG_SWORD_IMAGE = DAGGER_IMAGE = CLUB_IMAGE = None
+REGULAR_ENEMY_IMAGE = SHOOTER_ENEMY_IMAGE = SHOOTER_PROJECTILE_IMAGE = GUARD_ENEMY_IMAGE = FLYER_ENEMY_IMAGE = None
+gameplay_assets_loaded = False
+
+def load_gameplay_assets():
+    """Converts and scales the gameplay images the first time a level (or the weapon screen) needs them."""
+    global SLASH_IMAGE, BLAST_IMAGE, SHIELD_IMAGE, BOSS_IMAGE, DARK_BLAST_IMAGE
+    global DOUBLE_BLAST_POWERUP_IMAGE, ORBIT_SHIELD_POWERUP_IMAGE, ORBITING_LIGHT_IMAGE, JUMP_POWERUP_IMAGE, LIFE_POWERUP_IMAGE
+    global BIG_SWORD_IMAGE, DAGGER_IMAGE, CLUB_IMAGE
+    global REGULAR_ENEMY_IMAGE, SHOOTER_ENEMY_IMAGE, SHOOTER_PROJECTILE_IMAGE, GUARD_ENEMY_IMAGE, FLYER_ENEMY_IMAGE
+    global gameplay_assets_loaded
+    if gameplay_assets_loaded:
+        return
+    gameplay_assets_loaded = True
+    start_time = time.perf_counter()
+
+    # Player Combat Assets
+    SLASH_IMAGE = assets.load('image_628cc4.png', (PLAYER_WIDTH * 2, PLAYER_HEIGHT * 2), label="Slash") # Larger for effect
+    BLAST_IMAGE = assets.load('image_629081.png', (PROJECTILE_SIZE * 2, PROJECTILE_SIZE * 2), label="Blast") # Larger than actual collision size
+    SHIELD_IMAGE = assets.load('image_62e378.jpg', (SHIELD_WIDTH, SHIELD_HEIGHT), label="Shield")
+
+    # Boss Assets
+    BOSS_IMAGE = assets.load('image_a5e99a.png', (BOSS_WIDTH, BOSS_HEIGHT), label="Boss")
+    DARK_BLAST_IMAGE = assets.load('image_a5e960.png', (BOSS_PROJECTILE_SIZE, BOSS_PROJECTILE_SIZE), label="Dark Blast")
+
+    # Power-up Images
+    DOUBLE_BLAST_POWERUP_IMAGE = assets.load('image_893031.png', (COIN_SIZE, COIN_SIZE), label="Double Blast Powerup")
+    ORBIT_SHIELD_POWERUP_IMAGE = assets.load('image_892ff0.png', (COIN_SIZE, COIN_SIZE), label="Orbit Shield Powerup")
+    # Same image as the Orbit Shield Powerup, but scaled smaller
+    ORBITING_LIGHT_IMAGE = assets.load('image_892ff0.png', (ORBIT_SHIELD_SIZE, ORBIT_SHIELD_SIZE), label="Orbiting Light")
+    JUMP_POWERUP_IMAGE = assets.load('image_7d564d.png', (COIN_SIZE, COIN_SIZE), label="Jump Powerup")
+    LIFE_POWERUP_IMAGE = assets.load('image_33b612.jpg', (COIN_SIZE, COIN_SIZE), label="Life Powerup") # New image for extra life
+
+    # Weapon Images
+    BIG_SWORD_IMAGE = assets.load('image_335fbb.png', (PLAYER_WIDTH * 2, PLAYER_HEIGHT * 2), label="Big Sword")
+    DAGGER_IMAGE = assets.load('image_3358d3.png', (PLAYER_WIDTH * 2, PLAYER_HEIGHT * 2), label="Dagger")
+    CLUB_IMAGE = assets.load('image_33541d.jpg', (PLAYER_WIDTH * 2, PLAYER_HEIGHT * 2), label="Club")
+
+    # Enemy Images
+    REGULAR_ENEMY_IMAGE = assets.load('enemy_sprite.png', (ENEMY_WIDTH, ENEMY_HEIGHT), label="Regular Enemy") # None: use default color
+    SHOOTER_ENEMY_IMAGE = assets.load('image_333e73.png', (SHOOTER_ENEMY_WIDTH, SHOOTER_ENEMY_HEIGHT), label="Shooter Enemy")
+    SHOOTER_PROJECTILE_IMAGE = assets.load('image_334931.png', (SHOOTER_PROJECTILE_SIZE, SHOOTER_PROJECTILE_SIZE), label="Shooter Projectile")
+    GUARD_ENEMY_IMAGE = assets.load('image_016ed6.png', (GUARD_ENEMY_WIDTH, GUARD_ENEMY_HEIGHT), label="Guard Enemy")
+    FLYER_ENEMY_IMAGE = assets.load('image_f33c19.png', (FLYER_ENEMY_WIDTH, FLYER_ENEMY_HEIGHT), label="Flyer Enemy") # New: For flyer enemies
+
+    for weapon_image in (SLASH_IMAGE, DAGGER_IMAGE, CLUB_IMAGE): # Slash overlays face the player's direction
+        prepare_oriented_images(weapon_image)
+    assets.release_sources() # Some sources are huge (image_62e378.jpg is 5142x6122 for a 40x40 shield)
+    print(f"Asset Load: Gameplay assets ready in {(time.perf_counter() - start_time) * 1000:.0f} ms")
+    print(assets.decode_report())
 
 
 # --- High Score & Player Profile Functions ---
-def load_player_profiles():
-    """Loads all player profiles from a JSON file."""
-    global player_profiles, selected_player_index, selected_player_name, high_score
-    if os.path.exists(PLAYER_PROFILES_FILE):
+class ProfileWriter:
+    """
+    Serializes and writes the profiles file on a background thread so saving never stalls the frame
+    loop. Saves requested while a write is in flight coalesce into one write of the latest snapshot, and
+    each write goes to a temp file that is renamed over the real one, so a crash mid-write leaves
+    the previous file intact.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.pending = None # Latest snapshot of the profiles waiting to be written
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = None # Started on the first save
+
+    def save(self, profiles):
+        # Profiles hold only strings and numbers, so copying each dict snapshots the list as it is now
+        snapshot = [dict(profile) for profile in profiles]
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="profile-writer", daemon=True)
+                self.thread.start()
+            self.pending = snapshot
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return # Closed with nothing left to write
+                snapshot, self.pending = self.pending, None
+            self._write(snapshot)
+
+    def _write(self, snapshot):
+        temp_path = self.path + ".tmp"
         try:
-            with open(PLAYER_PROFILES_FILE, "r") as file:
-                player_profiles = json.load(file)
-            print(f"Player Profiles: Loaded {len(player_profiles)} profiles.")
-            # Default to no player selected, or the first one if profiles exist
-            if player_profiles:
-                # Ensure selected_player_index is valid, otherwise default to first
-                if selected_player_index == -1 or selected_player_index >= len(player_profiles):
-                    selected_player_index = 0
-                selected_player_name = player_profiles[selected_player_index]['name']
-                high_score = player_profiles[selected_player_index]['high_score']
-            else:
-                selected_player_index = -1
-                selected_player_name = "Guest"
-                high_score = 0
-        except json.JSONDecodeError:
-            player_profiles = []
-            selected_player_index = -1
-            selected_player_name = "Guest"
-            high_score = 0
-            print("Player Profiles: Invalid JSON in file, resetting profiles.")
+            data = json.dumps(snapshot, indent=4)
+            with open(temp_path, "w") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path) # Atomic: readers see the old file or the new one, never half of one
+            print("Player Profiles: Saved successfully.")
         except Exception as e:
-            player_profiles = []
-            selected_player_index = -1
-            selected_player_name = "Guest"
-            high_score = 0
-            print(f"Player Profiles: Error loading file: {e}, resetting profiles.")
-    else:
-        player_profiles = []
-        selected_player_index = -1
+            print(f"Player Profiles: Error saving file: {e}")
+
+    def close(self):
+        """Finishes any pending write; called once at exit."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+
+class JsonProfileStore:
+    """
+    Player profiles kept in memory as a list (the source of truth) and written behind to a JSON file.
+    Profiles are addressed by their position in creation order, like the select screen lists them.
+    """
+    def __init__(self, profiles, path=None):
+        self.profiles = profiles
+        self.writer = ProfileWriter(path) if path else None # No path: nothing is persisted (replays)
+
+    @classmethod
+    def load(cls, path):
+        profiles = []
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as file:
+                    profiles = json.load(file)
+                print(f"Player Profiles: Loaded {len(profiles)} profiles.")
+            except json.JSONDecodeError:
+                print("Player Profiles: Invalid JSON in file, resetting profiles.")
+            except Exception as e:
+                print(f"Player Profiles: Error loading file: {e}, resetting profiles.")
+        else:
+            print("Player Profiles: File not found, starting with no profiles.")
+        return cls(profiles, path)
+
+    def _save(self):
+        if self.writer:
+            self.writer.save(self.profiles)
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def get(self, index):
+        return self.profiles[index]
+
+    def page(self, start, count):
+        return self.profiles[start:start + count]
+
+    def has_name(self, name):
+        return any(profile['name'].lower() == name.lower() for profile in self.profiles)
+
+    def add(self, name):
+        """Adds a profile with no high score and returns its index."""
+        self.profiles.append({'name': name, 'high_score': 0})
+        self._save()
+        return len(self.profiles) - 1
+
+    def delete(self, index):
+        del self.profiles[index]
+        self._save()
+
+    def set_high_score(self, index, high_score):
+        self.profiles[index]['high_score'] = high_score
+        self._save()
+
+    def top_scores(self, count):
+        return sorted(self.profiles, key=lambda profile: profile['high_score'], reverse=True)[:count]
+
+    def snapshot(self):
+        return json.loads(json.dumps(self.profiles))
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+class SqliteWriter:
+    """
+    Runs an SQLite database's writes on a background thread with its own connection, so a commit
+    never stalls the frame loop. Statements queued while a commit is in flight go into the next
+    transaction together, in the order they were queued.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.queue = [] # (sql, params) waiting to be committed
+        self.busy = False # A transaction is being committed
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="profile-db-writer", daemon=True)
+        self.thread.start()
+
+    def execute(self, sql, params=()):
+        with self.condition:
+            self.queue.append((sql, params))
+            self.condition.notify_all()
+
+    def flush(self):
+        """Waits until everything queued so far is committed (returns at once when idle)."""
+        with self.condition:
+            while self.queue or self.busy:
+                self.condition.wait()
+
+    def _run(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                if not self.queue:
+                    break # Closed with nothing left to write
+                statements, self.queue = self.queue, []
+                self.busy = True
+            try:
+                with connection:
+                    for sql, params in statements:
+                        connection.execute(sql, params)
+            except sqlite3.Error as e:
+                print(f"Player Profiles: Error saving to {self.path}: {e}")
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+        connection.close()
+
+    def close(self):
+        """Commits anything still queued; called once at exit."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+class SqliteProfileStore:
+    """
+    Player profiles in an SQLite database, for deployments with more players than a JSON list
+    handles well. Names (case-insensitive) and high scores are indexed, listing is paginated, and
+    an empty database is seeded from the JSON profiles file the first time it is opened.
+    Writes are queued to an SqliteWriter and applied to the cached rows at once; reads that go to
+    the database first wait for the queued writes, so they always see them.
+    """
+    def __init__(self, path, json_path=None):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer thread, and commits append to the log
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS profiles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                high_score INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS profiles_high_score ON profiles (high_score DESC);
+        """)
+        self.rows = {} # index -> cached profile dict, shared with every page that lists it
+        self.ids = {} # index -> row id of the cached profiles, for keyset paging
+        self.count = self.connection.execute("SELECT COUNT(*) FROM profiles").fetchone()[0] # COUNT(*) scans the table; kept up to date after this
+        if self.count == 0 and json_path and os.path.exists(json_path):
+            self.migrate(json_path)
+        self.writer = SqliteWriter(path)
+        print(f"Player Profiles: Opened {path} with {self.count} profiles.")
+
+    def migrate(self, json_path):
+        """Imports a JSON profiles file, keeping the higher score when a name already exists."""
+        try:
+            with open(json_path, "r") as file:
+                profiles = json.load(file)
+        except Exception as e:
+            print(f"Player Profiles: Could not migrate {json_path}: {e}")
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO profiles (name, high_score) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET high_score = MAX(high_score, excluded.high_score)",
+                [(profile['name'], profile['high_score']) for profile in profiles])
+        self.count = self.connection.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+        print(f"Player Profiles: Migrated {len(profiles)} profiles from {json_path}.")
+
+    def _fetch(self, start, count):
+        self.writer.flush() # Make our own queued writes visible to this connection
+        previous_id = self.ids.get(start - 1)
+        if previous_id is not None: # Keyset: seek past the previous profile's id instead of skipping start rows
+            rows = self.connection.execute("SELECT id, name, high_score FROM profiles WHERE id > ? ORDER BY id LIMIT ?",
+                                           (previous_id, count)).fetchall()
+        else:
+            rows = self.connection.execute("SELECT id, name, high_score FROM profiles ORDER BY id LIMIT ? OFFSET ?",
+                                           (count, start)).fetchall()
+        for index, (row_id, name, high_score) in enumerate(rows, start):
+            self.ids[index] = row_id
+            self.rows[index] = {'name': name, 'high_score': high_score}
+
+    def __len__(self):
+        return self.count
+
+    def get(self, index):
+        return self.page(index, 1)[0]
+
+    def page(self, start, count):
+        indexes = range(start, min(start + count, self.count))
+        if any(index not in self.rows for index in indexes):
+            self._fetch(start, len(indexes))
+        return [self.rows[index] for index in indexes if index in self.rows]
+
+    def has_name(self, name):
+        self.writer.flush()
+        return self.connection.execute("SELECT 1 FROM profiles WHERE name = ?", (name,)).fetchone() is not None
+
+    def add(self, name):
+        """Adds a profile with no high score and returns its index."""
+        self.writer.execute("INSERT INTO profiles (name, high_score) VALUES (?, 0)", (name,))
+        self.count += 1
+        return self.count - 1 # New ids are always the largest, so existing indexes don't move
+
+    def delete(self, index):
+        self.writer.execute("DELETE FROM profiles WHERE name = ?", (self.get(index)['name'],))
+        self.count -= 1
+        self.rows.clear() # Every later profile moves up one index
+        self.ids.clear()
+
+    def set_high_score(self, index, high_score):
+        profile = self.get(index) # Cached: the selected player's row was read when it was selected
+        profile['high_score'] = high_score
+        self.writer.execute("UPDATE profiles SET high_score = ? WHERE name = ?", (high_score, profile['name']))
+
+    def top_scores(self, count):
+        self.writer.flush()
+        rows = self.connection.execute("SELECT name, high_score FROM profiles ORDER BY high_score DESC LIMIT ?",
+                                       (count,)).fetchall()
+        return [{'name': name, 'high_score': high_score} for name, high_score in rows]
+
+    def snapshot(self):
+        return json.loads(json.dumps(self.page(0, self.count)))
+
+    def close(self):
+        self.writer.close()
+        self.connection.close()
+
+def open_profile_store(profile_db=None):
+    if replay_data:
+        return JsonProfileStore(replay_data['profiles']) # Replays run on the recorded profiles and never touch disk
+    if profile_db:
+        return SqliteProfileStore(profile_db, json_path=PLAYER_PROFILES_FILE)
+    return JsonProfileStore.load(PLAYER_PROFILES_FILE)
+
+def select_player(index):
+    """Makes the profile at index the active player (-1 plays as Guest)."""
+    global selected_player_index, selected_player_name, high_score
+    selected_player_index = index
+    if index == -1:
         selected_player_name = "Guest"
         high_score = 0
-        print("Player Profiles: File not found, starting with no profiles.")
-
-def save_player_profiles():
-    """Saves all current player profiles to a JSON file."""
-    try:
-        with open(PLAYER_PROFILES_FILE, "w") as file:
-            json.dump(player_profiles, file, indent=4)
-        print("Player Profiles: Saved successfully.")
-    except Exception as e:
-        print(f"Player Profiles: Error saving file: {e}")
+    else:
+        profile = profile_store.get(index)
+        selected_player_name = profile['name']
+        high_score = profile['high_score']
 
 def update_player_high_score(current_score):
     """Updates the high score for the currently selected player."""
     global high_score
-    if selected_player_index != -1 and current_score > player_profiles[selected_player_index]['high_score']:
-        player_profiles[selected_player_index]['high_score'] = current_score
+    if selected_player_index != -1 and current_score > profile_store.get(selected_player_index)['high_score']:
+        profile_store.set_high_score(selected_player_index, current_score)
         high_score = current_score # Update global high_score for display
-        save_player_profiles()
-        print(f"Player {selected_player_name}: New high score saved: {high_score}")
+        log_game_event(f"Player {selected_player_name}: New high score saved: {high_score}")
+        if leaderboard_client:
+            leaderboard_client.submit(selected_player_name, current_score) # Sent in the background
     else:
-        print(f"Player {selected_player_name}: Current score {current_score} not higher than {high_score}.")
+        log_game_event(f"Player {selected_player_name}: Current score {current_score} not higher than {high_score}.")
 
-# Load player profiles once at the start of the game
-load_player_profiles()
+profile_store = None # Opened by load_player_profiles()
+
+def load_player_profiles(profile_db=None):
+    """Opens the player profiles once at the start of the game, defaulting to the first player if there is one."""
+    global profile_store
+    profile_store = open_profile_store(profile_db)
+    if replay_data:
+        select_player(replay_data['selected_player_index'])
+    else:
+        select_player(0 if len(profile_store) else -1)
+    startup_timer.mark("profiles")
+
+# --- Leaderboard Client ---
+LEADERBOARD_BATCH_WINDOW = 0.5 # Seconds submissions wait so ones made close together share a request
+LEADERBOARD_RETRY_SECONDS = 5 # Wait before resending a batch the server did not take
+LEADERBOARD_CACHE_SECONDS = 30 # How long a top-N answer is served before it is refreshed
+LEADERBOARD_TIMEOUT = 3 # Seconds per HTTP request
+LEADERBOARD_CLOSE_TIMEOUT = 1 # Seconds for the last send at exit, so close() never holds up shutdown for long
+
+class LeaderboardClient:
+    """
+    Client for leaderboard_server.py that never blocks the game: submissions are queued and sent in
+    batches from a background thread (kept for the next batch while the server is unreachable), and
+    top() answers from a cache that the same thread refreshes.
+    """
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.pending = [] # (name, score) submissions not yet accepted by the server
+        self.cached_top = []
+        self.cache_limit = 0
+        self.cache_time = None # time.monotonic() of the last refresh attempt
+        self.refresh_requested = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="leaderboard-client", daemon=True)
+        self.thread.start()
+
+    def submit(self, name, score):
+        with self.condition:
+            self.pending.append((name, score))
+            self.condition.notify()
+
+    def top(self, limit):
+        """The cached top scores, possibly stale or empty; an old or too short cache is refreshed in the background."""
+        with self.condition:
+            if self.cache_time is None or limit > self.cache_limit or \
+                    time.monotonic() - self.cache_time > LEADERBOARD_CACHE_SECONDS:
+                self.cache_limit = max(self.cache_limit, limit)
+                if not self.refresh_requested:
+                    self.refresh_requested = True
+                    self.condition.notify()
+            return self.cached_top[:limit]
+
+    def _request(self, path, payload=None, timeout=LEADERBOARD_TIMEOUT):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+
+    def _send_batch(self, batch, timeout=LEADERBOARD_TIMEOUT):
+        try:
+            self._request("/scores", {'scores': [{'name': name, 'score': score} for name, score in batch]}, timeout)
+            print(f"Leaderboard: Sent {len(batch)} score(s).")
+            return True
+        except (OSError, ValueError) as e: # URLError and timeouts are OSErrors
+            print(f"Leaderboard: Could not send {len(batch)} score(s): {e}")
+            return False
+
+    def _refresh_top(self):
+        with self.condition:
+            limit = self.cache_limit
+        try:
+            scores = self._request(f"/top?limit={limit}")['scores']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Leaderboard: Could not fetch top scores: {e}")
+            scores = None
+        with self.condition:
+            if scores is not None:
+                self.cached_top = scores
+            self.cache_time = time.monotonic() # A failed refresh also waits out the cache period
+
+    def _run(self):
+        retry_at = None # time.monotonic() before which a batch the server did not take is not resent
+        while True:
+            with self.condition:
+                while True:
+                    now = time.monotonic()
+                    send_due = bool(self.pending) and (retry_at is None or now >= retry_at)
+                    if send_due or self.refresh_requested or self.closed:
+                        break
+                    # New submissions wake this up but wait out the retry deadline with the failed batch
+                    self.condition.wait(retry_at - now if self.pending else None)
+                closing = self.closed
+            if send_due and not closing:
+                time.sleep(LEADERBOARD_BATCH_WINDOW)
+            with self.condition:
+                batch = []
+                if send_due or closing:
+                    batch, self.pending = self.pending, []
+                refresh, self.refresh_requested = self.refresh_requested, False
+            if closing:
+                if batch:
+                    self._send_batch(batch, LEADERBOARD_CLOSE_TIMEOUT)
+                return # One last attempt at exit; unsent scores are dropped
+            sent = self._send_batch(batch) if batch else False
+            if batch and not sent:
+                with self.condition:
+                    self.pending[:0] = batch # Retry them, oldest first, with whatever is queued next
+                retry_at = time.monotonic() + LEADERBOARD_RETRY_SECONDS
+            elif sent:
+                retry_at = None
+            if refresh or sent: # New scores can change the top list
+                self._refresh_top()
+
+    def close(self):
+        """
+        Makes one last attempt to send queued scores. Waits a little longer than that request's
+        LEADERBOARD_CLOSE_TIMEOUT; if a regular request is still in flight, the scores are dropped.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join(LEADERBOARD_CLOSE_TIMEOUT + 0.5)
+
+leaderboard_client = None # Set by main() for --leaderboard-url
+
+# --- Sprite Image Caches ---
+# Mirrored and tinted variants are built once per source surface and shared, so turning around,
+# rolling or fire dashing never allocates a new Surface in the frame loop. Weak keys let the
+# variants go away together with their source image.
+_flipped_images = weakref.WeakKeyDictionary() # surface -> left-facing copy
+_tinted_images = weakref.WeakKeyDictionary() # surface -> {tint color: tinted copy}
+
+def get_oriented_image(surface, facing_right):
+    """Returns surface as-is when facing right, or its shared mirrored copy when facing left."""
+    if facing_right:
+        return surface
+    flipped = _flipped_images.get(surface)
+    if flipped is None:
+        flipped = pygame.transform.flip(surface, True, False)
+        _flipped_images[surface] = flipped
+    return flipped
+
+def get_tinted_image(surface, tint):
+    """Returns a shared copy of surface multiplied by the RGBA tint (roll and fire dash overlays)."""
+    tints = _tinted_images.get(surface)
+    if tints is None:
+        tints = {}
+        _tinted_images[surface] = tints
+    tinted = tints.get(tint)
+    if tinted is None:
+        tinted = surface.copy()
+        tinted.fill(tint, special_flags=pygame.BLEND_RGBA_MULT)
+        tints[tint] = tinted
+    return tinted
+
+def prepare_oriented_images(surface):
+    """Builds the mirrored copy of surface up front, so the first turn-around doesn't pay for it."""
+    if surface:
+        get_oriented_image(surface, False)
+
+# --- Fallback Art ---
+# Placeholder art for missing images is drawn once per (kind, size) and shared by every sprite that
+# needs it, so spawning with a trimmed-down asset set doesn't pay for pygame.draw calls each time.
+_fallback_art = {} # (kind, (width, height)) -> surface
+
+def draw_fallback_art(kind, size):
+    width, height = size
+    if kind in ('enemy', 'guard_enemy', 'shooter_enemy', 'flyer_enemy', 'platform', 'moving_platform'):
+        art = pygame.Surface(size)
+    else:
+        art = pygame.Surface(size, pygame.SRCALPHA)
+
+    if kind == 'platform':
+        art.fill(GREEN)
+    elif kind == 'moving_platform':
+        art.fill(BLUE) # Different color for moving platform
+    elif kind == 'coin':
+        pygame.draw.circle(art, YELLOW, (width // 2, height // 2), width // 2)
+    elif kind == 'enemy':
+        art.fill(ENEMY_GREEN) # Default green for enemies
+    elif kind == 'guard_enemy':
+        art.fill(BLUE) # Different fallback color for guard
+        pygame.draw.rect(art, BLACK, art.get_rect(), 2) # Border
+    elif kind == 'shooter_enemy':
+        art.fill(RED) # Different fallback color for shooter
+        pygame.draw.circle(art, BLACK, (width // 2, height // 2), width // 2, 2)
+    elif kind == 'flyer_enemy':
+        art.fill(FLYER_TEAL) # Fallback color for flyer
+    elif kind == 'boss':
+        pygame.draw.circle(art, BOSS_PURPLE, (width // 2, height // 2), width // 2, 2)
+    elif kind == 'blast':
+        pygame.draw.circle(art, PURPLE, (width // 2, height // 2), width // 4)
+    elif kind == 'shooter_blast':
+        art.fill(BLACK) # Default black for shooter projectile
+        pygame.draw.circle(art, WHITE, (width // 2, height // 2), width // 2 - 2, 1)
+    elif kind == 'dark_blast':
+        pygame.draw.circle(art, BOSS_PURPLE, (width // 2, height // 2), width // 2)
+    elif kind == 'shield':
+        art.fill(LIGHT_GRAY) # Default gray if image not loaded
+        pygame.draw.rect(art, BLUE, art.get_rect(), 2) # Add a blue border
+    elif kind == 'orbiting_light':
+        pygame.draw.circle(art, RED, (width // 2, height // 2), width // 2)
+    elif kind == 'double_blast':
+        pygame.draw.rect(art, WHITE, art.get_rect(), 0, 3) # White square
+        pygame.draw.line(art, PURPLE, (5,15), (25,15), 3) # Double line
+        pygame.draw.line(art, PURPLE, (5,10), (25,10), 3)
+    elif kind == 'orbit_shield':
+        pygame.draw.circle(art, WHITE, (width // 2, height // 2), width // 2 - 2, 2) # White circle outline
+        pygame.draw.circle(art, RED, (width // 2, height // 2), width // 4) # Red inner
+    elif kind == 'quad_jump':
+        pygame.draw.polygon(art, WHITE, [(width//2, 0), (width, height//2), (width//2, height), (0, height//2)])
+        pygame.draw.line(art, BLUE, (width//4, height//2), (width*3//4, height//2), 2)
+        pygame.draw.line(art, BLUE, (width//2, height//4), (width//2, height*3//4), 2)
+    elif kind == 'extra_life': # New extra life power-up visual
+        pygame.draw.circle(art, WHITE, (width // 2, height // 2), width // 2 - 2, 2)
+        pygame.draw.line(art, RED, (width // 2, height // 4), (width // 2, height * 3 // 4), 3)
+        pygame.draw.line(art, RED, (width // 4, height // 2), (width * 3 // 4, height // 2), 3)
+    return art
+
+def get_fallback_art(kind, size):
+    """Shared placeholder surface for a sprite kind whose image failed to load. Callers must not draw on it."""
+    key = (kind, size)
+    art = _fallback_art.get(key)
+    if art is None:
+        art = draw_fallback_art(kind, size)
+        _fallback_art[key] = art
+    return art
+
+# --- Terrain Index ---
+class TerrainGrid:
+    """Uniform grid of platforms so entities only test the platforms in the cells they overlap."""
+    def __init__(self, cell_size=TERRAIN_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {} # (col, row) -> platforms in that cell, kept in the order they were added
+        self.platform_cells = {} # platform -> list of (col, row) cells it currently covers
+        self.order = {} # platform -> insertion index, so lookups keep the level's platform order
+        self.next_order = 0
+
+    def _cells_for(self, rect):
+        cell_size = self.cell_size
+        return [(col, row)
+                for col in range(rect.left // cell_size, (rect.right - 1) // cell_size + 1)
+                for row in range(rect.top // cell_size, (rect.bottom - 1) // cell_size + 1)]
+
+    def _insert(self, cell, platform):
+        bucket = self.cells.setdefault(cell, [])
+        position = len(bucket)
+        platform_order = self.order[platform]
+        while position > 0 and self.order[bucket[position - 1]] > platform_order:
+            position -= 1
+        bucket.insert(position, platform)
+
+    def clear(self):
+        self.cells.clear()
+        self.platform_cells.clear()
+        self.order.clear()
+        self.next_order = 0
+
+    def add(self, platform):
+        self.order[platform] = self.next_order
+        self.next_order += 1
+        cells = self._cells_for(platform.rect)
+        self.platform_cells[platform] = cells
+        for cell in cells:
+            self._insert(cell, platform)
+
+    def rebuild(self, *groups):
+        """Re-indexes every platform in the given groups (called once per level from setup_game)."""
+        self.clear()
+        for group in groups:
+            for platform in group:
+                self.add(platform)
+
+    def move(self, platform):
+        """Re-buckets a platform after its rect changed, touching only the cells it entered or left."""
+        old_cells = self.platform_cells.get(platform)
+        if old_cells is None:
+            return # Not indexed (e.g. level is being torn down)
+        new_cells = self._cells_for(platform.rect)
+        if new_cells == old_cells:
+            return
+        for cell in old_cells:
+            if cell not in new_cells:
+                bucket = self.cells[cell]
+                bucket.remove(platform)
+                if not bucket:
+                    del self.cells[cell]
+        for cell in new_cells:
+            if cell not in old_cells:
+                self._insert(cell, platform)
+        self.platform_cells[platform] = new_cells
+
+    def query(self, rect):
+        """Returns the platforms sharing a cell with rect, in the order they were added to the level."""
+        cells = self._cells_for(rect)
+        if len(cells) == 1:
+            return self.cells.get(cells[0], ())
+        found = {}
+        for cell in cells:
+            for platform in self.cells.get(cell, ()):
+                found[platform] = self.order[platform]
+        return sorted(found, key=found.get)
+
+    def query_movement(self, rect, vel_x, vel_y):
+        """Platforms an entity at rect could touch this frame when moving by (vel_x, vel_y)."""
+        area = rect.union(rect.move(vel_x, vel_y)).inflate(2 * TERRAIN_QUERY_MARGIN, 2 * TERRAIN_QUERY_MARGIN)
+        return self.query(area)
+
+    def query_cells(self, cells):
+        """Returns the platforms in any of the given (col, row) cells, in the order they were added to the level."""
+        found = {}
+        for cell in cells:
+            for platform in self.cells.get(cell, ()):
+                found[platform] = self.order[platform]
+        return sorted(found, key=found.get)
+
+terrain = TerrainGrid() # Rebuilt by setup_game for every level
+
+# --- Sprite Pools ---
+class PooledSprite(pygame.sprite.Sprite):
+    """
+    Sprite that goes back to the pool that created it once it has left every group (killed, or its
+    groups emptied by setup_game), so the next spawn can reset() and reuse it instead of allocating.
+    """
+    pool = None # Set by the SpritePool that created the sprite
+    pooled = False # True while the sprite waits in its pool's free list
+
+    def kill(self):
+        was_alive = self.alive()
+        super().kill()
+        if was_alive and self.pool:
+            self.pool.release(self)
+
+    def remove_internal(self, group):
+        super().remove_internal(group)
+        if self.pool and not self.alive():
+            self.pool.release(self)
+
+class SpritePool:
+    """Free list of one sprite class. Reused sprites are re-initialized through their reset() method."""
+    def __init__(self, sprite_class):
+        self.sprite_class = sprite_class
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.pooled = False
+            previous_sprite_positions.pop(sprite, None) # Don't interpolate from where its last life ended
+            sprite.reset(*args)
+            self.reused += 1
+        else:
+            sprite = self.sprite_class(*args)
+            sprite.pool = self
+            self.created += 1
+        return sprite
+
+    def release(self, sprite):
+        if not sprite.pooled:
+            sprite.pooled = True
+            self.free.append(sprite)
+
+class SpritePools:
+    """One SpritePool per sprite class, for the entities spawned during play and by setup_game."""
+    def __init__(self):
+        self.pools = {} # Sprite class -> SpritePool
+
+    def spawn(self, sprite_class, *args):
+        """Returns a sprite_class instance initialized with args, reusing a released one when possible."""
+        pool = self.pools.get(sprite_class)
+        if pool is None:
+            pool = self.pools[sprite_class] = SpritePool(sprite_class)
+        return pool.acquire(*args)
+
+    def report(self):
+        stats = ", ".join(f"{sprite_class.__name__} {pool.created} created/{pool.reused} reused/{len(pool.free)} free"
+                          for sprite_class, pool in self.pools.items())
+        return f"Sprite Pools: {stats or 'nothing spawned'}"
+
+pools = SpritePools()
 
 # --- Game Classes ---
 
-class Platform(pygame.sprite.Sprite):
+class Platform(PooledSprite):
+    fallback_art = 'platform'
+
     def __init__(self, x, y, width):
         super().__init__()
-        self.image = pygame.Surface([width, PLATFORM_HEIGHT])
-        self.image.fill(GREEN)
+        Platform.reset(self, x, y, width) # Subclasses' reset() takes their own constructor arguments
+
+    def reset(self, x, y, width):
+        self.image = get_fallback_art(self.fallback_art, (width, PLATFORM_HEIGHT)) # Shared by same-width platforms
         self.rect = self.image.get_rect(topleft=(x, y))
 
 class MovingPlatform(Platform):
+    fallback_art = 'moving_platform'
+
     def __init__(self, x, y, width, start_x, end_x, speed):
         super().__init__(x, y, width)
         self.start_x = start_x
         self.end_x = end_x
         self.vel_x = speed
-        self.image.fill(BLUE) # Different color for moving platform
+
+    def reset(self, x, y, width, start_x, end_x, speed):
+        super().reset(x, y, width)
+        self.start_x = start_x
+        self.end_x = end_x
+        self.vel_x = speed
 
     def update(self):
         self.rect.x += self.vel_x
@@ -427,29 +1353,29 @@ class MovingPlatform(Platform):
         elif self.vel_x < 0 and self.rect.left < self.start_x:
             self.rect.left = self.start_x
             self.vel_x *= -1
+        terrain.move(self) # Keep the terrain grid in sync with the new position
 
-class Coin(pygame.sprite.Sprite):
+class Coin(PooledSprite):
     def __init__(self, x, y):
         super().__init__()
-        try:
-            self.image = pygame.image.load('coin_sprite.png').convert_alpha()
-            self.image = pygame.transform.scale(self.image, (COIN_SIZE, COIN_SIZE))
-        except pygame.error:
-            self.image = pygame.Surface([COIN_SIZE, COIN_SIZE], pygame.SRCALPHA)
-            pygame.draw.circle(self.image, YELLOW, (COIN_SIZE // 2, COIN_SIZE // 2), COIN_SIZE // 2)
+        self.image = assets.load('coin_sprite.png', (COIN_SIZE, COIN_SIZE), label="Coin") # Shared by every coin
+        if not self.image:
+            self.image = get_fallback_art('coin', (COIN_SIZE, COIN_SIZE))
+        self.reset(x, y)
+
+    def reset(self, x, y):
         self.rect = self.image.get_rect(topleft=(x, y))
 
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
-        try:
-            self.image_base = pygame.image.load('player_sprite.png').convert_alpha()
-            self.image_base = pygame.transform.scale(self.image_base, (PLAYER_WIDTH, PLAYER_HEIGHT))
-        except pygame.error:
+        self.image_base = assets.load('player_sprite.png', (PLAYER_WIDTH, PLAYER_HEIGHT), label="Player")
+        if not self.image_base:
             self.image_base = pygame.Surface([PLAYER_WIDTH, PLAYER_HEIGHT])
             self.image_base.fill(BLUE)
 
         self.image = self.image_base # Current image to display
+        prepare_oriented_images(self.image_base)
         self.rect = self.image.get_rect(topleft=(x, y))
         self.vel_x = 0
         self.vel_y = 0
@@ -492,7 +1418,7 @@ class Player(pygame.sprite.Sprite):
         self.attack_knockback = 0 # Knockback for club
 
 
-    def update(self, platforms, moving_platforms):
+    def update(self, terrain):
         # Store on_ground state before any changes in this frame
         was_on_ground = self.on_ground
 
@@ -526,10 +1452,7 @@ class Player(pygame.sprite.Sprite):
                 self.is_invincible = False # End invincibility from roll
                 self.vel_x = 0 # Stop horizontal roll movement
                 # Reset image to normal if it was modified for rolling
-                if not self.facing_right:
-                    self.image = pygame.transform.flip(self.image_base, True, False)
-                else:
-                    self.image = self.image_base
+                self.image = get_oriented_image(self.image_base, self.facing_right)
             else:
                 # During roll, apply high horizontal velocity
                 if self.facing_right:
@@ -550,10 +1473,7 @@ class Player(pygame.sprite.Sprite):
                 self.vel_x = 0 # Stop horizontal fire dash movement
                 self.fire_dash_active = False # Deactivate for collision checks
                 # Reset image to normal
-                if not self.facing_right:
-                    self.image = pygame.transform.flip(self.image_base, True, False)
-                else:
-                    self.image = self.image_base
+                self.image = get_oriented_image(self.image_base, self.facing_right)
             else:
                 # During fire dash, apply very high horizontal velocity
                 if self.facing_right:
@@ -573,18 +1493,36 @@ class Player(pygame.sprite.Sprite):
         else: # During roll/fire dash, no vertical movement for simplicity
              self.vel_y = 0
 
+        # Only platforms near this frame's movement can collide (one lookup for both passes)
+        nearby_platforms = terrain.query_movement(self.rect, self.vel_x, self.vel_y)
+
+        # Swept test: a step longer than a platform is thick must stop at the first platform edge it
+        # crossed, not tunnel through. Of every edge crossed, the one nearest the starting position wins.
+        old_top, old_bottom = self.rect.top, self.rect.bottom
         self.rect.y += self.vel_y
 
         self.on_ground = False
-        all_ground_surfaces = platforms.sprites() + moving_platforms.sprites()
-        for platform in all_ground_surfaces:
+        crossed = None
+        for platform in nearby_platforms:
+            if not (self.rect.left < platform.rect.right and self.rect.right > platform.rect.left):
+                continue
+            if self.vel_y > 0 and old_bottom <= platform.rect.top < self.rect.bottom: # Falling past a platform top
+                if crossed is None or platform.rect.top < crossed.rect.top:
+                    crossed = platform
+            elif self.vel_y < 0 and old_top >= platform.rect.bottom > self.rect.top: # Rising past a platform bottom
+                if crossed is None or platform.rect.bottom > crossed.rect.bottom:
+                    crossed = platform
+        if crossed and self.vel_y > 0:
+            self.land_on(crossed)
+        elif crossed:
+            self.rect.top = crossed.rect.bottom
+            self.vel_y = 0
+
+        # Platforms the player was already partly inside (e.g. a moving platform rose into it)
+        for platform in nearby_platforms:
             if self.rect.colliderect(platform.rect):
                 if self.vel_y > 0 and self.rect.bottom <= platform.rect.bottom: # Falling and hit top of platform
-                    self.rect.bottom = platform.rect.top
-                    self.vel_y = 0
-                    self.on_ground = True
-                    if isinstance(platform, MovingPlatform):
-                        self.rect.x += platform.vel_x
+                    self.land_on(platform)
                 elif self.vel_y < 0 and self.rect.top >= platform.rect.top: # Jumping and hit bottom of platform
                     self.rect.top = platform.rect.bottom
                     self.vel_y = 0
@@ -595,14 +1533,16 @@ class Player(pygame.sprite.Sprite):
             else:
                 self.jumps_remaining = MAX_JUMPS # Otherwise, default 2 jumps
 
+        old_left, old_right = self.rect.left, self.rect.right
         self.rect.x += self.vel_x
 
-        for platform in all_ground_surfaces:
-            if self.rect.colliderect(platform.rect):
-                if self.vel_x > 0: # Moving right and hit left of platform
-                    self.rect.right = platform.rect.left
-                elif self.vel_x < 0: # Moving left and hit right of platform
-                    self.rect.left = platform.rect.right
+        for platform in nearby_platforms:
+            overlapping = self.rect.colliderect(platform.rect)
+            level = self.rect.top < platform.rect.bottom and self.rect.bottom > platform.rect.top
+            if self.vel_x > 0 and (overlapping or (level and old_right <= platform.rect.left < self.rect.right)): # Moving right and hit left of platform
+                self.rect.right = platform.rect.left
+            elif self.vel_x < 0 and (overlapping or (level and old_left >= platform.rect.right > self.rect.left)): # Moving left and hit right of platform
+                self.rect.left = platform.rect.right
 
         if self.rect.left < 0:
             self.rect.left = 0
@@ -615,34 +1555,26 @@ class Player(pygame.sprite.Sprite):
         # Update player image for facing direction if not currently attacking, shielding, rolling, or fire dashing
         if not self.attacking and not self.shielding and not self.is_rolling and not self.is_fire_dashing:
             if self.vel_x < 0 and self.facing_right:
-                self.image = pygame.transform.flip(self.image_base, True, False)
+                self.image = get_oriented_image(self.image_base, False)
                 self.facing_right = False
             elif self.vel_x > 0 and not self.facing_right:
                 self.image = self.image_base
                 self.facing_right = True
             elif self.vel_x == 0 and not self.facing_right:
                  # If standing still and facing left, keep flipped image
-                self.image = pygame.transform.flip(self.image_base, True, False)
+                self.image = get_oriented_image(self.image_base, False)
             elif self.vel_x == 0 and self.facing_right:
                 # If standing still and facing right, keep original image
                 self.image = self.image_base
         # Visual for rolling (can be a temporary color change or different sprite)
         elif self.is_rolling:
             # Example: temporary color change for roll
-            temp_image = self.image_base.copy()
-            temp_image.fill((0, 255, 255, 128), special_flags=pygame.BLEND_RGBA_MULT) # Cyan overlay for rolling
-            if not self.facing_right:
-                self.image = pygame.transform.flip(temp_image, True, False)
-            else:
-                self.image = temp_image
+            roll_image = get_tinted_image(self.image_base, ROLL_CYAN) # Cyan overlay for rolling
+            self.image = get_oriented_image(roll_image, self.facing_right)
         # Visual for Fire Dashing (fiery red/orange)
         elif self.is_fire_dashing:
-            temp_image = self.image_base.copy()
-            temp_image.fill(FIRE_RED, special_flags=pygame.BLEND_RGBA_MULT) # Fiery red/orange overlay
-            if not self.facing_right:
-                self.image = pygame.transform.flip(temp_image, True, False)
-            else:
-                self.image = temp_image
+            fire_dash_image = get_tinted_image(self.image_base, FIRE_RED) # Fiery red/orange overlay
+            self.image = get_oriented_image(fire_dash_image, self.facing_right)
 
 
         # Update orbiting lights position
@@ -651,6 +1583,13 @@ class Player(pygame.sprite.Sprite):
                 ol_sprite.update(self.rect.centerx, self.rect.centery, i)
 
 
+    def land_on(self, platform):
+        self.rect.bottom = platform.rect.top
+        self.vel_y = 0
+        self.on_ground = True
+        if isinstance(platform, MovingPlatform):
+            self.rect.x += platform.vel_x # Ride along with the platform
+
     def jump(self):
         # Now checks for can_quad_jump for max jumps
         if self.can_quad_jump and self.jumps_remaining > 0:
@@ -762,7 +1701,7 @@ class Player(pygame.sprite.Sprite):
                 blast_x = self.rect.left - PROJECTILE_SIZE
                 blast_vel_x = -BLAST_SPEED
             
-            blast = Projectile(blast_x, self.rect.centery, blast_vel_x)
+            blast = pools.spawn(Projectile, blast_x, self.rect.centery, blast_vel_x)
             projectiles.add(blast)
             all_sprites.add(blast)
 
@@ -770,7 +1709,7 @@ class Player(pygame.sprite.Sprite):
             if self.can_double_blast:
                 # Fire a second blast slightly offset vertically
                 blast2_y_offset = 10 # Adjust for visual separation
-                blast2 = Projectile(blast_x, self.rect.centery + blast2_y_offset, blast_vel_x)
+                blast2 = pools.spawn(Projectile, blast_x, self.rect.centery + blast2_y_offset, blast_vel_x)
                 projectiles.add(blast2)
                 all_sprites.add(blast2)
         return None
@@ -782,7 +1721,7 @@ class Player(pygame.sprite.Sprite):
             self.is_invincible = True
             self.shield_timer = SHIELD_DURATION # Set shield duration
             # Create a shield sprite
-            shield_sprite = Shield(self.rect.centerx, self.rect.centery)
+            shield_sprite = pools.spawn(Shield, self.rect.centerx, self.rect.centery)
             shields.add(shield_sprite)
             all_sprites.add(shield_sprite)
 
@@ -904,21 +1843,25 @@ class Player(pygame.sprite.Sprite):
             print(f"Weapon selected: Default Slash (Range: {self.attack_range_current})")
 
 
-class Projectile(pygame.sprite.Sprite):
+class Projectile(PooledSprite):
     def __init__(self, x, y, vel_x):
         super().__init__()
-        self.image_orig = BLAST_IMAGE if BLAST_IMAGE else pygame.Surface([PROJECTILE_SIZE * 2, PROJECTILE_SIZE * 2], pygame.SRCALPHA)
-        if not BLAST_IMAGE:
-            pygame.draw.circle(self.image_orig, PURPLE, (PROJECTILE_SIZE, PROJECTILE_SIZE), PROJECTILE_SIZE // 2)
+        self.image_orig = BLAST_IMAGE if BLAST_IMAGE else get_fallback_art('blast', (PROJECTILE_SIZE * 2, PROJECTILE_SIZE * 2))
 
         self.image = self.image_orig
+        self.reset(x, y, vel_x)
+
+    def reset(self, x, y, vel_x):
+        """Puts the projectile at its launch state, so a pooled one can be fired again."""
         self.rect = self.image.get_rect(center=(x, y))
         self.vel_x = vel_x
         # Projectile disappears after crossing screen width or a set lifetime
         self.lifetime = SCREEN_WIDTH // abs(BLAST_SPEED) + 10 # Added a small buffer
         self.creation_time = pygame.time.get_ticks() # Store creation time for debugging/long-range tracking
+        self.swept_from = None # Rect at the start of the latest step, for swept collisions
 
     def update(self):
+        self.swept_from = self.rect.copy()
         self.rect.x += self.vel_x
         
         # Check lifetime based on frames, or position for off-screen
@@ -926,14 +1869,13 @@ class Projectile(pygame.sprite.Sprite):
         if self.lifetime <= 0 or self.rect.left > SCREEN_WIDTH or self.rect.right < 0:
             self.kill() # Remove projectile if it goes off screen or lifetime expires
 
-class Shield(pygame.sprite.Sprite):
+class Shield(PooledSprite):
     def __init__(self, x, y):
         super().__init__()
-        self.image = SHIELD_IMAGE if SHIELD_IMAGE else pygame.Surface([SHIELD_WIDTH, SHIELD_HEIGHT], pygame.SRCALPHA)
-        if not SHIELD_IMAGE:
-            self.image.fill(LIGHT_GRAY) # Default gray if image not loaded
-            pygame.draw.rect(self.image, BLUE, self.image.get_rect(), 2) # Add a blue border
+        self.image = SHIELD_IMAGE if SHIELD_IMAGE else get_fallback_art('shield', (SHIELD_WIDTH, SHIELD_HEIGHT))
+        self.reset(x, y)
 
+    def reset(self, x, y):
         self.rect = self.image.get_rect(center=(x, y))
         self.player_ref = player # Reference to the player it's attached to
 
@@ -951,16 +1893,23 @@ class Shield(pygame.sprite.Sprite):
             self.kill() # Remove shield if player is no longer shielding
 
 
-class Enemy(pygame.sprite.Sprite):
+class Enemy(PooledSprite):
+    fallback_art = 'enemy' # Placeholder art when the image asset is missing
+
     def __init__(self, x, y, width, height, image_asset, speed, patrol_range=100, health=1):
         super().__init__()
-        # Use provided image_asset, fallback to REGULAR_ENEMY_IMAGE, then to a colored surface
-        self.image_base = image_asset if image_asset else REGULAR_ENEMY_IMAGE
-        if not self.image_base: # If all image assets fail, create a colored surface
-            self.image_base = pygame.Surface([width, height])
-            self.image_base.fill(ENEMY_GREEN) # Default green for enemies
-        else: # Scale the image asset if it was loaded
-            self.image_base = pygame.transform.scale(self.image_base, (width, height))
+        self.art_key = None # (width, height, image_asset) that image_base was built for
+        Enemy.reset(self, x, y, width, height, image_asset, speed, patrol_range, health) # Subclasses' reset() takes their own constructor arguments
+
+    def reset(self, x, y, width, height, image_asset, speed, patrol_range=100, health=1):
+        """(Re)spawns the enemy at (x, y). Pooled enemies keep their art."""
+        if self.art_key != (width, height, image_asset):
+            self.art_key = (width, height, image_asset)
+            if image_asset: # Scale the image asset if it was loaded (shared between enemies of the same size)
+                self.image_base = assets.scale(image_asset, (width, height))
+            else: # Otherwise use this enemy type's shared placeholder art
+                self.image_base = get_fallback_art(self.fallback_art, (width, height))
+            prepare_oriented_images(self.image_base)
 
         self.image = self.image_base # Current image
         self.rect = self.image.get_rect(topleft=(x, y))
@@ -972,14 +1921,14 @@ class Enemy(pygame.sprite.Sprite):
         self.facing_right = True # For directing enemy visual
         self.health = health # For enemies that take multiple hits
 
-    def update(self, platforms, moving_platforms):
-        all_ground_surfaces = platforms.sprites() + moving_platforms.sprites()
-        
+    def update(self, terrain):
         self.vel_y += GRAVITY
+        # One terrain lookup covers the landing check and the edge detection below
+        nearby_platforms = terrain.query_movement(self.rect, self.vel_x, self.vel_y)
         self.rect.y += self.vel_y
 
         self.on_ground = False
-        for platform in all_ground_surfaces:
+        for platform in nearby_platforms:
             if self.rect.colliderect(platform.rect):
                 if self.vel_y > 0 and self.rect.bottom <= platform.rect.bottom:
                     self.rect.bottom = platform.rect.top
@@ -994,7 +1943,7 @@ class Enemy(pygame.sprite.Sprite):
             self.image = self.image_base
             self.facing_right = True
         elif self.vel_x < 0 and self.facing_right:
-            self.image = pygame.transform.flip(self.image_base, True, False)
+            self.image = get_oriented_image(self.image_base, False)
             self.facing_right = False
 
 
@@ -1018,7 +1967,7 @@ class Enemy(pygame.sprite.Sprite):
             
             # Assume no ground initially
             has_ground_ahead = False
-            for platform in all_ground_surfaces:
+            for platform in nearby_platforms:
                 if check_rect.colliderect(platform.rect):
                     has_ground_ahead = True
                     break
@@ -1032,23 +1981,29 @@ class Enemy(pygame.sprite.Sprite):
             self.kill() # Remove enemy if health is zero
 
 class GuardEnemy(Enemy):
+    fallback_art = 'guard_enemy'
+
     def __init__(self, x, y, patrol_range=100):
         super().__init__(x, y, GUARD_ENEMY_WIDTH, GUARD_ENEMY_HEIGHT, GUARD_ENEMY_IMAGE, GUARD_SPEED, patrol_range, GUARD_HEALTH_MAX)
-        if not GUARD_ENEMY_IMAGE:
-            self.image_base.fill(BLUE) # Different fallback color for guard
-            pygame.draw.rect(self.image_base, BLACK, self.image_base.get_rect(), 2) # Border
+
+    def reset(self, x, y, patrol_range=100):
+        super().reset(x, y, GUARD_ENEMY_WIDTH, GUARD_ENEMY_HEIGHT, GUARD_ENEMY_IMAGE, GUARD_SPEED, patrol_range, GUARD_HEALTH_MAX)
 
 class ShooterEnemy(Enemy):
+    fallback_art = 'shooter_enemy'
+
     def __init__(self, x, y, patrol_range=100):
         super().__init__(x, y, SHOOTER_ENEMY_WIDTH, SHOOTER_ENEMY_HEIGHT, SHOOTER_ENEMY_IMAGE, SHOOTER_SPEED, patrol_range, health=1)
         self.attack_cooldown_timer = SHOOTER_BLAST_COOLDOWN
         self.is_shooting = False # State to indicate if currently shooting (can affect movement)
-        if not SHOOTER_ENEMY_IMAGE:
-            self.image_base.fill(RED) # Different fallback color for shooter
-            pygame.draw.circle(self.image_base, BLACK, (SHOOTER_ENEMY_WIDTH // 2, SHOOTER_ENEMY_HEIGHT // 2), SHOOTER_ENEMY_WIDTH // 2, 2)
 
-    def update(self, platforms, moving_platforms):
-        super().update(platforms, moving_platforms) # Call base Enemy update for movement and gravity
+    def reset(self, x, y, patrol_range=100):
+        super().reset(x, y, SHOOTER_ENEMY_WIDTH, SHOOTER_ENEMY_HEIGHT, SHOOTER_ENEMY_IMAGE, SHOOTER_SPEED, patrol_range, health=1)
+        self.attack_cooldown_timer = SHOOTER_BLAST_COOLDOWN
+        self.is_shooting = False
+
+    def update(self, terrain):
+        super().update(terrain) # Call base Enemy update for movement and gravity
 
         self.attack_cooldown_timer -= 1
         if self.attack_cooldown_timer <= 0:
@@ -1064,25 +2019,27 @@ class ShooterEnemy(Enemy):
         blast_x = self.rect.centerx + (self.rect.width // 2 * (1 if self.facing_right else -1))
         blast_y = self.rect.centery # Roughly from the center of the enemy
 
-        new_projectile = ShooterProjectile(blast_x, blast_y, blast_vel_x, 0) # No vertical vel for now
+        new_projectile = pools.spawn(ShooterProjectile, blast_x, blast_y, blast_vel_x, 0) # No vertical vel for now
         shooter_projectiles.add(new_projectile)
         all_sprites.add(new_projectile)
 
-class ShooterProjectile(pygame.sprite.Sprite):
+class ShooterProjectile(PooledSprite):
     def __init__(self, x, y, vel_x, vel_y):
         super().__init__()
-        self.image_orig = SHOOTER_PROJECTILE_IMAGE if SHOOTER_PROJECTILE_IMAGE else pygame.Surface([SHOOTER_PROJECTILE_SIZE, SHOOTER_PROJECTILE_SIZE], pygame.SRCALPHA)
-        if not SHOOTER_PROJECTILE_IMAGE:
-            self.image_orig.fill(BLACK) # Default black for shooter projectile
-            pygame.draw.circle(self.image_orig, WHITE, (SHOOTER_PROJECTILE_SIZE // 2, SHOOTER_PROJECTILE_SIZE // 2), SHOOTER_PROJECTILE_SIZE // 2 - 2, 1)
+        self.image_orig = SHOOTER_PROJECTILE_IMAGE if SHOOTER_PROJECTILE_IMAGE else get_fallback_art('shooter_blast', (SHOOTER_PROJECTILE_SIZE, SHOOTER_PROJECTILE_SIZE))
 
         self.image = self.image_orig
+        self.reset(x, y, vel_x, vel_y)
+
+    def reset(self, x, y, vel_x, vel_y):
         self.rect = self.image.get_rect(center=(x, y))
         self.vel_x = vel_x
         self.vel_y = vel_y
         self.lifetime = 180 # Projectile disappears after 3 seconds (60 FPS * 3)
+        self.swept_from = None # Rect at the start of the latest step, for swept collisions
 
     def update(self):
+        self.swept_from = self.rect.copy()
         self.rect.x += self.vel_x
         self.rect.y += self.vel_y
         self.lifetime -= 1
@@ -1094,14 +2051,19 @@ class ShooterProjectile(pygame.sprite.Sprite):
             self.kill()
 
 class FlyerEnemy(Enemy):
+    fallback_art = 'flyer_enemy'
+
     def __init__(self, x, y, patrol_range=150):
         super().__init__(x, y, FLYER_ENEMY_WIDTH, FLYER_ENEMY_HEIGHT, FLYER_ENEMY_IMAGE, FLYER_SPEED, patrol_range, health=1)
         self.initial_y = y # Store initial Y for oscillation
-        self.oscillation_timer = random.uniform(0, 2 * math.pi) # Start at a random point in sine wave
-        if not FLYER_ENEMY_IMAGE:
-            self.image_base.fill(FLYER_TEAL) # Fallback color for flyer
+        self.oscillation_timer = game_rng.uniform(0, 2 * math.pi) # Start at a random point in sine wave
 
-    def update(self, platforms, moving_platforms):
+    def reset(self, x, y, patrol_range=150):
+        super().reset(x, y, FLYER_ENEMY_WIDTH, FLYER_ENEMY_HEIGHT, FLYER_ENEMY_IMAGE, FLYER_SPEED, patrol_range, health=1)
+        self.initial_y = y
+        self.oscillation_timer = game_rng.uniform(0, 2 * math.pi)
+
+    def update(self, terrain):
         # Horizontal movement (from base Enemy class)
         self.rect.x += self.vel_x
         if self.vel_x > 0 and self.rect.right >= self.start_x + self.patrol_range:
@@ -1118,7 +2080,7 @@ class FlyerEnemy(Enemy):
             self.image = self.image_base
             self.facing_right = True
         elif self.vel_x < 0 and self.facing_right:
-            self.image = pygame.transform.flip(self.image_base, True, False)
+            self.image = get_oriented_image(self.image_base, False)
             self.facing_right = False
         
         # Keep within screen bounds (vertical too for flying enemies)
@@ -1132,14 +2094,239 @@ class FlyerEnemy(Enemy):
             self.oscillation_timer = 3*math.pi/2 # Start going up
 
 
+# --- Array-Backed Enemy Store ---
+def round_like_rect(values):
+    """Rounds an array the way pygame.Rect rounds an assigned float (halves away from zero)."""
+    return np.where(values >= 0, np.floor(values + 0.5), np.ceil(values - 0.5))
+
+class EnemyArrayStore:
+    """
+    Runs the enemy updates as batched NumPy operations (--vectorized-enemies): gravity, platform
+    landing, patrol reversal, edge turning, facing and flyer oscillation. Each frame the enemies'
+    position, velocity, patrol bounds and facing are gathered into arrays, stepped, and written
+    back, so the sprites stay the source of truth for drawing, collisions, damage and knockback.
+    Walkers only test the platforms the terrain grid holds in the cells they can reach. The
+    results match Enemy.update / ShooterEnemy.update / FlyerEnemy.update step for step.
+    """
+    VECTOR_TYPES = (Enemy, GuardEnemy, ShooterEnemy, FlyerEnemy) # Other subclasses keep their own update()
+    MIN_BATCH = 300 # Measured break-even: below this many enemies the per-sprite updates are cheaper
+
+    def __init__(self):
+        self.sprites = [] # Enemies the per-enemy constant arrays below were built for
+
+    @staticmethod
+    def available():
+        """Imports NumPy on first use, so sessions without --vectorized-enemies never pay for it."""
+        global np
+        if np is None:
+            try:
+                import numpy
+            except ImportError:
+                return False
+            np = numpy
+        return True
+
+    def invalidate(self):
+        self.sprites = []
+
+    def refresh_constants(self, sprites):
+        """Rebuilds the arrays that don't change while an enemy is alive, when the set of enemies changes."""
+        if sprites == self.sprites:
+            return
+        self.sprites = sprites
+        self.width = np.array([sprite.rect.width for sprite in sprites], dtype=float)
+        self.height = np.array([sprite.rect.height for sprite in sprites], dtype=float)
+        self.patrol_min = np.array([sprite.start_x - sprite.patrol_range for sprite in sprites], dtype=float)
+        self.patrol_max = np.array([sprite.start_x + sprite.patrol_range for sprite in sprites], dtype=float)
+        is_flyer = np.array([isinstance(sprite, FlyerEnemy) for sprite in sprites], dtype=bool)
+        self.walker_indices = np.flatnonzero(~is_flyer)
+        self.flyer_indices = np.flatnonzero(is_flyer)
+        self.flyers = [sprites[i] for i in self.flyer_indices]
+        self.shooters = [sprite for sprite in sprites if isinstance(sprite, ShooterEnemy)]
+
+    def update(self, terrain, groups):
+        sprites = []
+        for group in groups:
+            for sprite in group:
+                if type(sprite) in self.VECTOR_TYPES:
+                    sprites.append(sprite)
+                else:
+                    sprite.update(terrain)
+        if len(sprites) < self.MIN_BATCH:
+            for sprite in sprites:
+                sprite.update(terrain)
+            return
+        self.refresh_constants(sprites)
+
+        # Gather the state that gameplay code may have changed since last frame
+        x = np.array([sprite.rect.x for sprite in sprites], dtype=float)
+        y = np.array([sprite.rect.y for sprite in sprites], dtype=float)
+        vel_x = np.array([sprite.vel_x for sprite in sprites], dtype=float)
+        vel_y = np.array([sprite.vel_y for sprite in sprites], dtype=float)
+        facing_right = np.array([sprite.facing_right for sprite in sprites], dtype=bool)
+        was_facing_right = facing_right.copy()
+        on_ground = np.zeros(len(sprites), dtype=bool)
+
+        self.update_walkers(self.walker_indices, x, y, vel_x, vel_y, facing_right, on_ground, terrain)
+        oscillation = self.update_flyers(self.flyer_indices, x, y, vel_x, facing_right)
+
+        # Write the results back to the sprites
+        for sprite, new_x, new_y, new_vel_x, new_vel_y, new_on_ground in zip(
+                sprites, x.tolist(), y.tolist(), vel_x.tolist(), vel_y.tolist(), on_ground.tolist()):
+            sprite.rect.x = new_x
+            sprite.rect.y = new_y
+            sprite.vel_x = new_vel_x
+            sprite.vel_y = new_vel_y
+            sprite.on_ground = new_on_ground
+        for i in np.flatnonzero(facing_right != was_facing_right).tolist():
+            sprite = sprites[i]
+            sprite.facing_right = bool(facing_right[i])
+            sprite.image = get_oriented_image(sprite.image_base, sprite.facing_right)
+        if oscillation:
+            timers, initial_ys = oscillation
+            for sprite, timer, initial_y in zip(self.flyers, timers.tolist(), initial_ys.tolist()):
+                sprite.oscillation_timer = timer
+                sprite.initial_y = initial_y
+
+        # Shooters count down and fire after moving, in group order, as ShooterEnemy.update does
+        for shooter in self.shooters:
+            shooter.attack_cooldown_timer -= 1
+            if shooter.attack_cooldown_timer <= 0:
+                shooter.shoot_blast()
+                shooter.attack_cooldown_timer = SHOOTER_BLAST_COOLDOWN
+
+    def nearby_platforms(self, terrain, x, y, vel_x, vel_y, width, height):
+        """
+        Looks up, through the terrain grid, the platforms in every cell the walkers can reach this frame.
+        Returns their rects as (x, y, width, height) arrays plus a (walkers x platforms) mask of the
+        platforms each walker's own terrain.query_movement() would return.
+        """
+        cell_size = terrain.cell_size
+        margin = TERRAIN_QUERY_MARGIN
+        move_x, move_y = np.trunc(vel_x), np.trunc(vel_y) # Rect.move truncates float offsets
+        col_lo = ((np.minimum(x, x + move_x) - margin) // cell_size).astype(np.int64)
+        col_hi = ((np.maximum(x, x + move_x) + width + margin - 1) // cell_size).astype(np.int64)
+        row_lo = ((np.minimum(y, y + move_y) - margin) // cell_size).astype(np.int64)
+        row_hi = ((np.maximum(y, y + move_y) + height + margin - 1) // cell_size).astype(np.int64)
+
+        # Every cell covered by some walker's movement area, visited once
+        cols = col_lo[:, None, None] + np.arange(int((col_hi - col_lo).max()) + 1)[None, :, None]
+        rows = row_lo[:, None, None] + np.arange(int((row_hi - row_lo).max()) + 1)[None, None, :]
+        cols, rows = np.broadcast_arrays(cols, rows)
+        covered = (cols <= col_hi[:, None, None]) & (rows <= row_hi[:, None, None])
+        platforms = terrain.query_cells(set(zip(cols[covered].tolist(), rows[covered].tolist())))
+        if not platforms:
+            return None
+
+        rects = np.array([tuple(platform.rect) for platform in platforms], dtype=float)
+        # A platform's cells form one block, from its first (col, row) to its last
+        spans = np.array([terrain.platform_cells[platform][0] + terrain.platform_cells[platform][-1]
+                          for platform in platforms], dtype=np.int64)
+        near = (spans[:, 0] <= col_hi[:, None]) & (spans[:, 2] >= col_lo[:, None]) & \
+               (spans[:, 1] <= row_hi[:, None]) & (spans[:, 3] >= row_lo[:, None])
+        return rects[:, 0], rects[:, 1], rects[:, 2], rects[:, 3], near
+
+    def update_walkers(self, indices, x, y, vel_x, vel_y, facing_right, on_ground, terrain):
+        """Enemy.update for every walking enemy at once."""
+        if not len(indices):
+            return
+        wx, wy, wvx, wvy = x[indices], y[indices], vel_x[indices], vel_y[indices]
+        width, height = self.width[indices], self.height[indices]
+        facing = facing_right[indices]
+        landed = np.zeros(len(indices), dtype=bool)
+
+        wvy += GRAVITY
+        nearby = self.nearby_platforms(terrain, wx, wy, wvx, wvy, width, height)
+        wy = round_like_rect(wy + wvy)
+        if nearby:
+            platform_x, platform_y, platform_width, platform_height, near = nearby
+            # Each walker resolves its nearby platforms one after another in level order, exactly like
+            # the per-enemy loop: every round handles the next platform it overlaps at its current height
+            candidates = near & (wx[:, None] < platform_x + platform_width) & (wx[:, None] + width[:, None] > platform_x)
+            rows = np.arange(len(indices))
+            after = np.full(len(indices), -1)
+            while len(rows):
+                row_y, row_height = wy[rows][:, None], height[rows][:, None]
+                hit = candidates[rows] & (np.arange(len(platform_x)) > after[rows][:, None]) & \
+                      (row_y < platform_y + platform_height) & (row_y + row_height > platform_y)
+                found = hit.any(axis=1)
+                rows = rows[found]
+                if not len(rows):
+                    break
+                j = hit[found].argmax(axis=1)
+                after[rows] = j
+                row_y, row_vy, row_height = wy[rows], wvy[rows], height[rows]
+                top, bottom = platform_y[j], platform_y[j] + platform_height[j]
+                land = (row_vy > 0) & (row_y + row_height <= bottom)
+                bump = (row_vy < 0) & (row_y >= top)
+                wy[rows] = np.where(land, top - row_height, np.where(bump, bottom, row_y))
+                wvy[rows] = np.where(land | bump, 0.0, row_vy)
+                landed[rows] |= land
+
+        # Facing follows the velocity before this frame's turn-arounds
+        facing = np.where((wvx > 0) & ~facing, True, np.where((wvx < 0) & facing, False, facing))
+
+        wx = round_like_rect(wx + wvx)
+        reverse = ((wvx > 0) & (wx + width >= self.patrol_max[indices])) | \
+                  ((wvx < 0) & (wx <= self.patrol_min[indices]))
+        wvx = np.where(reverse, -wvx, wvx)
+
+        # Edge detection: turn around when there is no nearby platform just ahead of the feet
+        ground_ahead = np.zeros(len(indices), dtype=bool)
+        if nearby:
+            check_offset = 5
+            check_x = np.where(wvx > 0, wx + width + check_offset, wx - check_offset)[:, None]
+            check_y = (wy + height + 1)[:, None]
+            ground_ahead = (near & (check_x < platform_x + platform_width) & (check_x + 5 > platform_x) &
+                            (check_y < platform_y + platform_height) & (check_y + 5 > platform_y)).any(axis=1)
+        wvx = np.where(landed & ~ground_ahead, -wvx, wvx)
+
+        x[indices], y[indices], vel_x[indices], vel_y[indices] = wx, wy, wvx, wvy
+        facing_right[indices] = facing
+        on_ground[indices] = landed
+
+    def update_flyers(self, indices, x, y, vel_x, facing_right):
+        """FlyerEnemy.update for every flyer at once. Returns the new (oscillation timers, initial ys)."""
+        if not len(indices):
+            return None
+        fx, fvx = x[indices], vel_x[indices]
+        height = self.height[indices]
+        timers = np.array([sprite.oscillation_timer for sprite in self.flyers], dtype=float)
+        initial_ys = np.array([sprite.initial_y for sprite in self.flyers], dtype=float)
+
+        fx = round_like_rect(fx + fvx)
+        reverse = ((fvx > 0) & (fx + self.width[indices] >= self.patrol_max[indices])) | \
+                  ((fvx < 0) & (fx <= self.patrol_min[indices]))
+        fvx = np.where(reverse, -fvx, fvx)
+
+        timers += FLYER_VERTICAL_OSCILLATION_SPEED
+        fy = round_like_rect(initial_ys + FLYER_VERTICAL_OSCILLATION_MAGNITUDE * np.sin(timers))
+
+        facing = facing_right[indices]
+        facing = np.where((fvx > 0) & ~facing, True, np.where((fvx < 0) & facing, False, facing))
+
+        # Keep within screen bounds, restarting the wave from the edge that was hit
+        above = fy < 0
+        fy = np.where(above, 0.0, fy)
+        initial_ys = np.where(above, fy, initial_ys)
+        timers = np.where(above, math.pi / 2, timers)
+        below = fy + height > SCREEN_HEIGHT
+        fy = np.where(below, SCREEN_HEIGHT - height, fy)
+        initial_ys = np.where(below, fy, initial_ys)
+        timers = np.where(below, 3 * math.pi / 2, timers)
+
+        x[indices], y[indices], vel_x[indices] = fx, fy, fvx
+        facing_right[indices] = facing
+        return timers, initial_ys
+
+
 class Boss(pygame.sprite.Sprite):
     def __init__(self, x, y, patrol_range=BOSS_PATROL_RANGE):
         super().__init__()
-        self.image_base = BOSS_IMAGE if BOSS_IMAGE else pygame.Surface([BOSS_WIDTH, BOSS_HEIGHT], pygame.SRCALPHA)
-        if not BOSS_IMAGE:
-            pygame.draw.circle(self.image_base, BOSS_PURPLE, (BOSS_WIDTH // 2, BOSS_HEIGHT // 2), BOSS_WIDTH // 2, 2)
-        
+        self.image_base = BOSS_IMAGE if BOSS_IMAGE else get_fallback_art('boss', (BOSS_WIDTH, BOSS_HEIGHT))
+
         self.image = self.image_base
+        prepare_oriented_images(self.image_base)
         self.rect = self.image.get_rect(topleft=(x, y))
         self.vel_x = BOSS_SPEED
         self.vel_y = 0
@@ -1150,9 +2337,7 @@ class Boss(pygame.sprite.Sprite):
         self.health = BOSS_HEALTH_MAX
         self.attack_cooldown_timer = BOSS_BLAST_COOLDOWN # Initial cooldown for blast
 
-    def update(self, platforms, moving_platforms, player_rect):
-        all_ground_surfaces = platforms.sprites() + moving_platforms.sprites()
-
+    def update(self, terrain, player_rect):
         # Boss "floating" movement - less affected by gravity
         self.vel_y += GRAVITY * 0.2 # Reduced gravity for floating effect
         if self.vel_y > MAX_FALL_VELOCITY / 2: # Cap boss fall speed
@@ -1160,7 +2345,7 @@ class Boss(pygame.sprite.Sprite):
         self.rect.y += self.vel_y
 
         # Collision with platforms (simplified for boss)
-        for platform in all_ground_surfaces:
+        for platform in terrain.query_movement(self.rect, 0, 0):
             if self.rect.colliderect(platform.rect):
                 if self.vel_y > 0: # Falling
                     self.rect.bottom = platform.rect.top
@@ -1195,7 +2380,7 @@ class Boss(pygame.sprite.Sprite):
             self.image = self.image_base
             self.facing_right = True
         elif self.vel_x < 0 and self.facing_right:
-            self.image = pygame.transform.flip(self.image_base, True, False)
+            self.image = get_oriented_image(self.image_base, False)
             self.facing_right = False
 
         # Boss attack logic
@@ -1215,7 +2400,7 @@ class Boss(pygame.sprite.Sprite):
             vel_x = (dx / distance) * BOSS_PROJECTILE_SPEED
             vel_y = (dy / distance) * BOSS_PROJECTILE_SPEED
             
-            blast = BossProjectile(self.rect.centerx, self.rect.centery, int(vel_x), int(vel_y)) # Cast to int
+            blast = pools.spawn(BossProjectile, self.rect.centerx, self.rect.centery, int(vel_x), int(vel_y)) # Cast to int
             boss_projectiles.add(blast)
             all_sprites.add(blast)
 
@@ -1225,20 +2410,23 @@ class Boss(pygame.sprite.Sprite):
             self.kill() # Remove boss if health is zero
 
 
-class BossProjectile(pygame.sprite.Sprite):
+class BossProjectile(PooledSprite):
     def __init__(self, x, y, vel_x, vel_y):
         super().__init__()
-        self.image_orig = DARK_BLAST_IMAGE if DARK_BLAST_IMAGE else pygame.Surface([BOSS_PROJECTILE_SIZE, BOSS_PROJECTILE_SIZE], pygame.SRCALPHA)
-        if not DARK_BLAST_IMAGE:
-            pygame.draw.circle(self.image_orig, BOSS_PURPLE, (BOSS_PROJECTILE_SIZE // 2, BOSS_PROJECTILE_SIZE // 2), BOSS_PROJECTILE_SIZE // 2)
+        self.image_orig = DARK_BLAST_IMAGE if DARK_BLAST_IMAGE else get_fallback_art('dark_blast', (BOSS_PROJECTILE_SIZE, BOSS_PROJECTILE_SIZE))
 
         self.image = self.image_orig
+        self.reset(x, y, vel_x, vel_y)
+
+    def reset(self, x, y, vel_x, vel_y):
         self.rect = self.image.get_rect(center=(x, y))
         self.vel_x = vel_x
         self.vel_y = vel_y
         self.lifetime = 180 # Projectile disappears after 3 seconds (60 FPS * 3)
+        self.swept_from = None # Rect at the start of the latest step, for swept collisions
 
     def update(self):
+        self.swept_from = self.rect.copy()
         self.rect.x += self.vel_x
         self.rect.y += self.vel_y
         self.lifetime -= 1
@@ -1249,28 +2437,14 @@ class BossProjectile(pygame.sprite.Sprite):
            self.rect.top > SCREEN_HEIGHT or self.rect.bottom < 0:
             self.kill()
 
-class PowerUp(pygame.sprite.Sprite):
+class PowerUp(PooledSprite):
     """Base class for all power-up items."""
     def __init__(self, x, y, image, pu_type):
         super().__init__()
-        self.image = image if image else pygame.Surface([COIN_SIZE, COIN_SIZE], pygame.SRCALPHA)
-        if not image: # Default if image not loaded
-            if pu_type == 'double_blast':
-                pygame.draw.rect(self.image, WHITE, self.image.get_rect(), 0, 3) # White square
-                pygame.draw.line(self.image, PURPLE, (5,15), (25,15), 3) # Double line
-                pygame.draw.line(self.image, PURPLE, (5,10), (25,10), 3)
-            elif pu_type == 'orbit_shield':
-                pygame.draw.circle(self.image, WHITE, (COIN_SIZE // 2, COIN_SIZE // 2), COIN_SIZE // 2 - 2, 2) # White circle outline
-                pygame.draw.circle(self.image, RED, (COIN_SIZE // 2, COIN_SIZE // 2), COIN_SIZE // 4) # Red inner
-            elif pu_type == 'quad_jump':
-                pygame.draw.polygon(self.image, WHITE, [(COIN_SIZE//2, 0), (COIN_SIZE, COIN_SIZE//2), (COIN_SIZE//2, COIN_SIZE), (0, COIN_SIZE//2)])
-                pygame.draw.line(self.image, BLUE, (COIN_SIZE//4, COIN_SIZE//2), (COIN_SIZE*3//4, COIN_SIZE//2), 2)
-                pygame.draw.line(self.image, BLUE, (COIN_SIZE//2, COIN_SIZE//4), (COIN_SIZE//2, COIN_SIZE*3//4), 2)
-            elif pu_type == 'extra_life': # New extra life power-up visual
-                pygame.draw.circle(self.image, WHITE, (COIN_SIZE // 2, COIN_SIZE // 2), COIN_SIZE // 2 - 2, 2)
-                pygame.draw.line(self.image, RED, (COIN_SIZE // 2, COIN_SIZE // 4), (COIN_SIZE // 2, COIN_SIZE * 3 // 4), 3)
-                pygame.draw.line(self.image, RED, (COIN_SIZE // 4, COIN_SIZE // 2), (COIN_SIZE * 3 // 4, COIN_SIZE // 2), 3)
+        self.reset(x, y, image, pu_type)
 
+    def reset(self, x, y, image, pu_type):
+        self.image = image if image else get_fallback_art(pu_type, (COIN_SIZE, COIN_SIZE)) # Default if image not loaded
         self.rect = self.image.get_rect(topleft=(x, y))
         self.type = pu_type # 'double_blast', 'orbit_shield', 'quad_jump', or 'extra_life'
 
@@ -1279,10 +2453,10 @@ class PowerUp(pygame.sprite.Sprite):
         global lives # Need to modify global lives for extra life
         if self.type == 'double_blast':
             player_ref.can_double_blast = True
-            print("Double Blast Power-up collected!")
+            log_game_event("Double Blast Power-up collected!")
         elif self.type == 'orbit_shield':
             player_ref.orbit_shield_hits = ORBIT_SHIELD_MAX_HITS
-            print(f"Orbit Shield Power-up collected! {ORBIT_SHIELD_MAX_HITS} hits available.")
+            log_game_event(f"Orbit Shield Power-up collected! {ORBIT_SHIELD_MAX_HITS} hits available.")
             
             # Clear existing global orbiting lights and spawn new ones to match MAX_HITS
             orbiting_lights_group.empty() # Clear existing visuals
@@ -1295,10 +2469,10 @@ class PowerUp(pygame.sprite.Sprite):
         elif self.type == 'quad_jump':
             player_ref.can_quad_jump = True
             player_ref.jumps_remaining = QUAD_JUMP_COUNT # Give max jumps immediately
-            print("4x Jump Power-up collected!")
+            log_game_event("4x Jump Power-up collected!")
         elif self.type == 'extra_life': # New extra life effect
             lives += 1
-            print("Extra Life Power-up collected! Lives: ", lives)
+            log_game_event(f"Extra Life Power-up collected! Lives:  {lives}")
                 
         self.kill() # Power-up item disappears after collection
 
@@ -1307,9 +2481,7 @@ class OrbitingLight(pygame.sprite.Sprite):
     """A small light that orbits the player and blocks hits."""
     def __init__(self, player_ref, initial_angle_offset):
         super().__init__()
-        self.image = ORBITING_LIGHT_IMAGE if ORBITING_LIGHT_IMAGE else pygame.Surface([ORBIT_SHIELD_SIZE, ORBIT_SHIELD_SIZE], pygame.SRCALPHA)
-        if not ORBITING_LIGHT_IMAGE:
-            pygame.draw.circle(self.image, RED, (ORBIT_SHIELD_SIZE // 2, ORBIT_SHIELD_SIZE // 2), ORBIT_SHIELD_SIZE // 2)
+        self.image = ORBITING_LIGHT_IMAGE if ORBITING_LIGHT_IMAGE else get_fallback_art('orbiting_light', (ORBIT_SHIELD_SIZE, ORBIT_SHIELD_SIZE))
 
         self.rect = self.image.get_rect()
         self.player_ref = player_ref
@@ -1378,6 +2550,549 @@ def apply_player_damage_to_boss(boss_sprite_ref, player_ref, base_damage, score_
         boss_sprite_ref.rect.right = min(SCREEN_WIDTH, boss_sprite_ref.rect.right)
 
 
+# --- Entity Types ---
+class EntityType:
+    """
+    One kind of level entity and the per-frame systems it takes part in. setup_game, the update
+    pass, the collision layers and the level-complete check all walk ENTITY_TYPES, so a new kind of
+    entity is one table entry rather than a new group, update call and collision loop.
+    """
+    def __init__(self, name, group, update=None, layers=(), blocks_completion=False, batched=False,
+                 updates_while=None, collides_while=None):
+        self.name = name
+        self.group = group
+        self.update = update # Called with the group once per simulation step; None for entities that don't move
+        self.layers = layers # Collision layers the sprites join (several types can share one)
+        self.blocks_completion = blocks_completion # The level isn't complete while any remain
+        self.batched = batched # Updated in EnemyArrayStore's batch when --vectorized-enemies is on
+        self.updates_while = updates_while # Condition for the update to run this step, if any
+        self.collides_while = collides_while # Condition for the sprites to collide this step, if any
+
+    def updating(self):
+        return self.update is not None and (self.updates_while is None or self.updates_while())
+
+    def colliding(self):
+        return self.collides_while is None or self.collides_while()
+
+def update_sprites(group):
+    group.update()
+
+def update_on_terrain(group):
+    group.update(terrain)
+
+def update_boss(group):
+    group.update(terrain, player.rect)
+
+def boss_fight_active():
+    # boss_sprite stays set until the level-complete check, so shots in flight still land in the frame the boss dies
+    return boss_active and boss_sprite is not None
+
+def no_boss_fight_active():
+    return not boss_fight_active()
+
+def shooters_remain():
+    return bool(shooter_enemies)
+
+# Table order is update order
+ENTITY_TYPES = [
+    EntityType("platform", platforms),
+    EntityType("moving_platform", moving_platforms, update_sprites),
+    EntityType("player_shot", projectiles, update_sprites, layers=('player_shot',)),
+    EntityType("shield", shields, update_sprites),
+    EntityType("powerup", powerups, update_sprites, layers=('powerup',)),
+    EntityType("boss", boss_group, update_boss, layers=('boss',)),
+    EntityType("boss_shot", boss_projectiles, update_sprites, layers=('boss_shot',),
+               updates_while=boss_fight_active, collides_while=boss_fight_active),
+    # Blasts and the fire dash test every enemy at once; touching the player is checked group by group
+    EntityType("enemy", enemies, update_on_terrain, layers=('enemy', 'walker_contact'), blocks_completion=True,
+               batched=True, updates_while=no_boss_fight_active), # Regular and guard enemies sit out boss fights
+    EntityType("shooter_enemy", shooter_enemies, update_on_terrain, layers=('enemy', 'shooter_contact'),
+               blocks_completion=True, batched=True),
+    EntityType("shooter_shot", shooter_projectiles, update_sprites, layers=('shooter_shot',),
+               collides_while=shooters_remain), # Shots still in flight are harmless once every shooter is gone
+    EntityType("flyer_enemy", flyer_enemies, update_on_terrain, layers=('enemy', 'flyer_contact'),
+               blocks_completion=True, batched=True),
+    EntityType("coin", coins, layers=('coin',), blocks_completion=True),
+]
+
+def update_entities():
+    """
+    The update system: one pass over ENTITY_TYPES. With --vectorized-enemies, every batched type
+    that updates this step goes through a single EnemyArrayStore update where the first one would run.
+    """
+    batch_done = False
+    for entity_type in ENTITY_TYPES:
+        if not entity_type.updating():
+            continue
+        if entity_type.batched and enemy_store:
+            if not batch_done:
+                enemy_store.update(terrain, [batched_type.group for batched_type in ENTITY_TYPES
+                                             if batched_type.batched and batched_type.updating()])
+                batch_done = True
+            continue
+        entity_type.update(entity_type.group)
+
+
+# --- Collision Layers ---
+def swept_rect_hits(start, end, target):
+    """
+    Whether a box moving in a straight line from start to end (same size) overlaps target at any
+    point during the move. Slab test: the times each axis overlaps must intersect within the step.
+    """
+    if end.colliderect(target):
+        return True
+    enter_time, exit_time = 0.0, 1.0
+    for start_min, start_max, delta, target_min, target_max in (
+            (start.left, start.right, end.x - start.x, target.left, target.right),
+            (start.top, start.bottom, end.y - start.y, target.top, target.bottom)):
+        if delta == 0:
+            if start_max <= target_min or start_min >= target_max:
+                return False
+            continue
+        axis_enter = (target_min - start_max) / delta
+        axis_exit = (target_max - start_min) / delta
+        if axis_enter > axis_exit:
+            axis_enter, axis_exit = axis_exit, axis_enter
+        enter_time = max(enter_time, axis_enter)
+        exit_time = min(exit_time, axis_exit)
+        if enter_time >= exit_time:
+            return False
+    return True
+
+def collision_bounds(sprite):
+    """The area a sprite covered during the latest step: its swept box if it records one, else its rect."""
+    swept_from = getattr(sprite, 'swept_from', None)
+    return sprite.rect.union(swept_from) if swept_from else sprite.rect
+
+def sprites_touch(sprite_a, sprite_b):
+    """
+    colliderect, made continuous for fast movers: a sprite with a swept_from rect (projectiles)
+    hits anything its path crossed during the step, so it can't skip over a target between steps.
+    """
+    if getattr(sprite_b, 'swept_from', None):
+        sprite_a, sprite_b = sprite_b, sprite_a
+    swept_from = getattr(sprite_a, 'swept_from', None)
+    if swept_from:
+        return swept_rect_hits(swept_from, sprite_a.rect, sprite_b.rect)
+    return sprite_a.rect.colliderect(sprite_b.rect)
+
+class CollisionBroadphase:
+    """Spatial hash over the collidable sprites that reports every overlapping layer pair in one pass."""
+    def __init__(self, cell_size=COLLISION_CELL_SIZE):
+        self.cell_size = cell_size
+
+    def find_pairs(self, layers, matrix):
+        """
+        Hashes the sprites of every target layer (right side of a matrix pair) into grid cells once,
+        then looks up each source-layer sprite's cells, so only sprites sharing a cell are tested.
+        Returns {(layer_a, layer_b): [(sprite_a, sprite_b), ...]} for every layer pair in matrix,
+        ordered the way nested loops over the two layers would have visited them.
+        """
+        cell_size = self.cell_size
+        target_layers = {layer_b for _, layer_b in matrix}
+        cells = {}
+        for layer_name in target_layers:
+            for layer_index, sprite in enumerate(layers[layer_name]):
+                rect = collision_bounds(sprite)
+                entry = (layer_name, layer_index, sprite)
+                for col in range(rect.left // cell_size, (rect.right - 1) // cell_size + 1):
+                    for row in range(rect.top // cell_size, (rect.bottom - 1) // cell_size + 1):
+                        cells.setdefault((col, row), []).append(entry)
+
+        found = {layer_pair: {} for layer_pair in matrix}
+        for layer_a in {layer_a for layer_a, _ in matrix}:
+            for index_a, sprite_a in enumerate(layers[layer_a]):
+                rect = collision_bounds(sprite_a)
+                for col in range(rect.left // cell_size, (rect.right - 1) // cell_size + 1):
+                    for row in range(rect.top // cell_size, (rect.bottom - 1) // cell_size + 1):
+                        for layer_b, index_b, sprite_b in cells.get((col, row), ()):
+                            pairs = found.get((layer_a, layer_b))
+                            # Keyed by visit order, so pairs sharing several cells are only reported once
+                            if pairs is not None and (index_a, index_b) not in pairs and sprites_touch(sprite_a, sprite_b):
+                                pairs[(index_a, index_b)] = (sprite_a, sprite_b)
+
+        return {layer_pair: [pairs[order] for order in sorted(pairs)] for layer_pair, pairs in found.items()}
+
+collision_broadphase = CollisionBroadphase()
+
+def get_collision_layers():
+    """Collects this frame's collidable sprites into the layers named by COLLISION_MATRIX."""
+    # Projectiles can be absorbed by the orbiting lights while the orbit shield has charges
+    shot_targets = [player]
+    if player.orbit_shield_hits > 0:
+        shot_targets += orbiting_lights_group.sprites()
+    layers = {'player': [player], 'shot_target': shot_targets}
+    for entity_type in ENTITY_TYPES:
+        for layer_name in entity_type.layers:
+            layer = layers.setdefault(layer_name, [])
+            if entity_type.colliding():
+                layer += entity_type.group.sprites()
+    return layers
+
+def collide_player_powerup(player_ref, powerup):
+    powerup.apply_effect(player_ref) # Apply effect, which also calls pu.kill()
+
+def collide_fire_dash_enemy(player_ref, enemy):
+    # Fire dash damage to regular enemies
+    if player_ref.is_fire_dashing and player_ref.fire_dash_active:
+        apply_player_damage_to_enemy(enemy, player_ref, 10 * FIRE_DASH_DAMAGE_MULTIPLIER)
+
+def collide_fire_dash_boss(player_ref, boss):
+    # Fire dash damage to boss: base 20 damage * 5x multiplier, 25 score
+    if player_ref.is_fire_dashing and player_ref.fire_dash_active:
+        apply_player_damage_to_boss(boss, player_ref, 20 * FIRE_DASH_DAMAGE_MULTIPLIER, 25)
+
+def collide_player_enemy(player_ref, enemy):
+    # Player takes damage unless shielding, rolling, or fire dashing (also used for direct boss contact)
+    if not player_ref.is_fire_dashing:
+        handle_player_enemy_collision(enemy, player_ref)
+
+def collide_blast_enemy(projectile, enemy):
+    if enemy.alive(): # An earlier blast this frame may already have defeated it
+        projectile.kill()
+        apply_player_damage_to_enemy(enemy, player, 10) # Player blast damage
+
+def collide_blast_boss(projectile, boss):
+    if projectile.alive():
+        projectile.kill() # Destroy projectile on hit
+        apply_player_damage_to_boss(boss, player, 20, 5) # Blast does 20 damage to boss
+
+def collide_enemy_shot_target(projectile, target):
+    # Each enemy projectile hits only its first target: the player, or one of the orbiting lights
+    if not projectile.alive() or not target.alive():
+        return
+    projectile.kill()
+    if target == player:
+        if not player.is_fire_dashing: # Only take damage if not fire dashing
+            handle_player_enemy_collision(target, player)
+    elif isinstance(target, OrbitingLight):
+        player.take_hit() # Consume shield charge
+
+def collide_player_coin(player_ref, coin):
+    global score
+    coin.kill()
+    score += 1
+
+# Rules run in this order each frame; COLLISION_MATRIX is the set of layer pairs that interact at all.
+COLLISION_RULES = [
+    (('player', 'powerup'), collide_player_powerup),
+    (('player', 'enemy'), collide_fire_dash_enemy),
+    (('player', 'boss'), collide_fire_dash_boss),
+    # One rule per enemy group, so a hit that respawns the player is seen before the next group is checked
+    (('player', 'walker_contact'), collide_player_enemy),
+    (('player', 'shooter_contact'), collide_player_enemy),
+    (('player', 'flyer_contact'), collide_player_enemy),
+    (('player', 'boss'), collide_player_enemy),
+    (('player_shot', 'enemy'), collide_blast_enemy),
+    (('player_shot', 'boss'), collide_blast_boss),
+    (('boss_shot', 'shot_target'), collide_enemy_shot_target),
+    (('shooter_shot', 'shot_target'), collide_enemy_shot_target),
+    (('player', 'coin'), collide_player_coin),
+]
+COLLISION_MATRIX = {layer_pair for layer_pair, _ in COLLISION_RULES}
+# Frame profiler section names, one per rule
+COLLISION_RULE_SECTIONS = [f"{handler.__name__} {layer_a}-{layer_b}" for (layer_a, layer_b), handler in COLLISION_RULES]
+
+
+# --- Level Generator ---
+class LevelGenerator:
+    """
+    Lays out a regular level's platforms on a jump-reachability graph.
+
+    Every candidate is anchored to a platform that is already reachable from the ground (at most
+    MAX_PLATFORM_JUMP_HEIGHT above it and MAX_PLATFORM_JUMP_DISTANCE across), overlap is tested
+    against a uniform grid of placed platforms instead of all of them, and each platform gets a fixed
+    number of attempts, so generation stays bounded however many platforms a level asks for.
+    """
+    def __init__(self, rng, cell_size=TERRAIN_CELL_SIZE):
+        self.rng = rng
+        self.cell_size = cell_size
+        self.cells = {} # (col, row) -> indices of the placed areas overlapping that cell
+        self.areas = [] # Ground, then static platforms, then moving platforms (their whole sweep)
+        self.skipped = 0
+
+    def _cells_for(self, rect):
+        cell_size = self.cell_size
+        return [(col, row)
+                for col in range(rect.left // cell_size, (rect.right - 1) // cell_size + 1)
+                for row in range(rect.top // cell_size, (rect.bottom - 1) // cell_size + 1)]
+
+    def _nearby(self, rect):
+        """Indices of the placed areas sharing a grid cell with rect, in placement order."""
+        found = set()
+        for cell in self._cells_for(rect):
+            found.update(self.cells.get(cell, ()))
+        return sorted(found)
+
+    def _add(self, area):
+        index = len(self.areas)
+        self.areas.append(area)
+        for cell in self._cells_for(area):
+            self.cells.setdefault(cell, []).append(index)
+
+    def _fits(self, area):
+        buffered = area.inflate(10, 10) # Same spacing buffer the old overlap check used
+        return not any(buffered.colliderect(self.areas[index]) for index in self._nearby(buffered))
+
+    @staticmethod
+    def can_reach(source, target):
+        """True if the player standing on source can land on target with a (double) jump or a drop."""
+        if target.top < source.top - MAX_PLATFORM_JUMP_HEIGHT:
+            return False
+        gap = max(target.left - source.right, source.left - target.right, 0)
+        return gap <= MAX_PLATFORM_JUMP_DISTANCE
+
+    def _place(self, make_candidate):
+        """Tries up to LEVEL_GEN_ATTEMPTS candidates beside reachable platforms; returns the winner or None."""
+        min_y = PLAYER_HEIGHT # Don't place platforms too high off screen (top edge)
+        max_y = SCREEN_HEIGHT - (2 * PLATFORM_HEIGHT) - PLAYER_HEIGHT # Leave room above the ground
+        for _ in range(LEVEL_GEN_ATTEMPTS):
+            anchor = self.areas[self.rng.randrange(len(self.areas))] # Every placed area is reachable
+            y = self.rng.randint(max(min_y, anchor.top - MAX_PLATFORM_JUMP_HEIGHT), max_y)
+            candidate = make_candidate(anchor, y)
+            if candidate and self.can_reach(anchor, candidate[0]) and self._fits(candidate[0]):
+                self._add(candidate[0])
+                return candidate
+        self.skipped += 1
+        return None
+
+    def _static_candidate(self, anchor, y):
+        width = self.rng.randint(80, 200)
+        low = max(50, anchor.left - MAX_PLATFORM_JUMP_DISTANCE - width)
+        high = min(SCREEN_WIDTH - 150, anchor.right + MAX_PLATFORM_JUMP_DISTANCE)
+        if low > high:
+            return None
+        rect = pygame.Rect(self.rng.randint(low, high), y, width, PLATFORM_HEIGHT)
+        return rect, rect
+
+    def _moving_candidate(self, anchor, y):
+        width = self.rng.randint(60, 120)
+        start_x = self.rng.randint(50, SCREEN_WIDTH - 200)
+        end_x = self.rng.randint(start_x + 50, SCREEN_WIDTH - width - 20)
+        # The area covers the platform's whole sweep so nothing else is placed in its path
+        sweep = pygame.Rect(start_x, y, max(width, end_x - start_x), PLATFORM_HEIGHT)
+        spec = (pygame.Rect(start_x, y, width, PLATFORM_HEIGHT), start_x, end_x,
+                self.rng.choice([-ENEMY_SPEED, ENEMY_SPEED]))
+        return sweep, spec
+
+    def generate(self, num_static, num_moving):
+        """
+        Returns (static_rects, moving_specs), each moving spec being (rect, start_x, end_x, speed).
+        Platforms that run out of attempts are left out and counted in self.skipped.
+        """
+        self._add(pygame.Rect(0, SCREEN_HEIGHT - PLATFORM_HEIGHT, SCREEN_WIDTH, PLATFORM_HEIGHT))
+        static_rects = []
+        for _ in range(num_static):
+            placed = self._place(self._static_candidate)
+            if placed:
+                static_rects.append(placed[1])
+        moving_specs = []
+        for _ in range(num_moving):
+            placed = self._place(self._moving_candidate)
+            if placed:
+                moving_specs.append(placed[1])
+        return static_rects, moving_specs
+
+    def reachable(self):
+        """
+        Breadth-first search of the jump graph from the ground; returns one flag per placed area.
+        Neighbours come from the grid cells within jump range, so this stays close to linear.
+        """
+        flags = [False] * len(self.areas)
+        if not self.areas:
+            return flags
+        flags[0] = True
+        queue = deque([0])
+        while queue:
+            source = self.areas[queue.popleft()]
+            # Anything the player can reach lies at most a jump above and a jump across (drops reach down to the ground)
+            reach = pygame.Rect(source.left - MAX_PLATFORM_JUMP_DISTANCE, source.top - MAX_PLATFORM_JUMP_HEIGHT,
+                                source.width + 2 * MAX_PLATFORM_JUMP_DISTANCE, SCREEN_HEIGHT)
+            for index in self._nearby(reach.clip(pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))):
+                if not flags[index] and self.can_reach(source, self.areas[index]):
+                    flags[index] = True
+                    queue.append(index)
+        return flags
+
+# --- Level Plans ---
+def build_level_plan(level, seed):
+    """
+    Works out a level's layout and spawn list without touching sprites or globals, so it can run on
+    the prefetch thread. apply_level_plan() turns the result into sprites.
+    """
+    rng = random.Random(seed)
+    plan = {
+        'level': level,
+        'boss': level > 0 and level % BOSS_APPEAR_INTERVAL == 0,
+        'platforms': [],        # (x, y, width)
+        'moving_platforms': [], # (x, y, width, start_x, end_x, speed)
+        'coins': [],            # (x, y)
+        'enemies': [],          # (kind, x, y) with kind 'regular', 'guard' or 'shooter'
+        'flyers': [],           # (x, y)
+        'powerup': None,        # (x, y, powerup_type)
+        'skipped_platforms': 0,
+    }
+
+    if plan['boss']:
+        # Some simple platforms for strategy in boss fight
+        for _ in range(rng.randint(1, 3)):
+            x = rng.randint(50, SCREEN_WIDTH - 150)
+            y = rng.randint(SCREEN_HEIGHT // 2, SCREEN_HEIGHT - 100)
+            plan['platforms'].append((x, y, rng.randint(80, 200)))
+        return plan
+
+    # Lay out the rest of the level on the jump-reachability graph
+    generator = LevelGenerator(rng)
+    static_rects, moving_specs = generator.generate(rng.randint(3, 7), rng.randint(1, 3))
+    plan['skipped_platforms'] = generator.skipped
+    plan['platforms'] = [(rect.x, rect.y, rect.width) for rect in static_rects]
+    plan['moving_platforms'] = [(rect.x, rect.y, rect.width, start_x, end_x, speed)
+                                for rect, start_x, end_x, speed in moving_specs]
+
+    # Coins and enemies only go on platforms the player can actually get to
+    ground = pygame.Rect(0, SCREEN_HEIGHT - PLATFORM_HEIGHT, SCREEN_WIDTH, PLATFORM_HEIGHT)
+    level_rects = [ground] + static_rects + [spec[0] for spec in moving_specs]
+    targets = [rect for rect, reachable in zip(level_rects, generator.reachable()) if reachable]
+
+    for _ in range(rng.randint(5, 15)):
+        target = rng.choice(targets)
+        coin_x = rng.randint(target.left + COIN_SIZE, target.right - COIN_SIZE)
+        coin_y = target.top - COIN_SIZE - rng.randint(10, 30)
+        plan['coins'].append((coin_x, coin_y))
+
+    # Spawn new enemy types or regular enemies
+    enemy_kinds = []
+    if level >= NEW_ENEMY_SPAWN_LEVEL: # After level 3
+        # One special enemy per level, plus fewer regular enemies to balance it
+        enemy_kinds.append(rng.choice(['shooter', 'guard']))
+        enemy_kinds += ['regular'] * rng.randint(1, 2)
+    else: # Before new enemy spawn level, only spawn regular enemies
+        enemy_kinds += ['regular'] * rng.randint(1, 3)
+    for kind in enemy_kinds:
+        target = rng.choice(targets)
+        enemy_x = rng.randint(target.left, target.right - ENEMY_WIDTH)
+        plan['enemies'].append((kind, enemy_x, target.top - ENEMY_HEIGHT))
+
+    # Flyer enemies (can appear in any level)
+    for _ in range(rng.randint(1, 2)):
+        flyer_x = rng.randint(50, SCREEN_WIDTH - FLYER_ENEMY_WIDTH - 50)
+        flyer_y = rng.randint(SCREEN_HEIGHT // 4, SCREEN_HEIGHT // 2) # Fly higher up
+        plan['flyers'].append((flyer_x, flyer_y))
+
+    # Power-up spawning logic
+    if (level + 1) % POWERUP_SPAWN_INTERVAL == 0 and level > 0: # Ensures not on level 0 and aligned
+        target = rng.choice(targets)
+        pu_x = rng.randint(target.left + COIN_SIZE, target.right - COIN_SIZE)
+        pu_y = target.top - COIN_SIZE - rng.randint(10, 30)
+        powerup_types = ['double_blast', 'orbit_shield', 'quad_jump', 'extra_life'] # Added extra_life
+        plan['powerup'] = (pu_x, pu_y, rng.choice(powerup_types))
+
+    return plan
+
+def apply_level_plan(plan):
+    """Spawns a plan's sprites into the level groups setup_game() has just cleared."""
+    global boss_sprite, initial_coin_count_level
+
+    # Always add a ground platform first for consistency
+    ground = pools.spawn(Platform, 0, SCREEN_HEIGHT - PLATFORM_HEIGHT, SCREEN_WIDTH)
+    platforms.add(ground)
+    all_sprites.add(ground)
+
+    if plan['boss']:
+        boss_sprite = Boss(SCREEN_WIDTH // 2 - BOSS_WIDTH // 2, SCREEN_HEIGHT // 4)
+        all_sprites.add(boss_sprite)
+        boss_group.add(boss_sprite)
+
+    if plan['skipped_platforms']:
+        print(f"Level Generator: {plan['skipped_platforms']} platform(s) found no reachable spot and were left out.")
+    for x, y, width in plan['platforms']:
+        new_platform = pools.spawn(Platform, x, y, width)
+        platforms.add(new_platform)
+        all_sprites.add(new_platform)
+    for x, y, width, start_x, end_x, speed in plan['moving_platforms']:
+        new_moving_platform = pools.spawn(MovingPlatform, x, y, width, start_x, end_x, speed)
+        moving_platforms.add(new_moving_platform)
+        all_sprites.add(new_moving_platform)
+
+    terrain.rebuild(platforms, moving_platforms)
+    if plan['boss']:
+        return
+
+    initial_coin_count_level = len(plan['coins'])
+    for coin_x, coin_y in plan['coins']:
+        new_coin = pools.spawn(Coin, coin_x, coin_y)
+        coins.add(new_coin)
+        all_sprites.add(new_coin)
+
+    for kind, enemy_x, enemy_y in plan['enemies']:
+        if kind == 'shooter':
+            new_enemy = pools.spawn(ShooterEnemy, enemy_x, enemy_y)
+            shooter_enemies.add(new_enemy)
+            log_game_event(f"Spawned Shooter Enemy on Level {current_level+1}!")
+        elif kind == 'guard':
+            new_enemy = pools.spawn(GuardEnemy, enemy_x, enemy_y)
+            enemies.add(new_enemy) # Guard enemies are added to general enemies group
+            log_game_event(f"Spawned Guard Enemy on Level {current_level+1}!")
+        else:
+            new_enemy = pools.spawn(Enemy, enemy_x, enemy_y, ENEMY_WIDTH, ENEMY_HEIGHT, REGULAR_ENEMY_IMAGE, ENEMY_SPEED) # Pass regular enemy image
+            enemies.add(new_enemy)
+        all_sprites.add(new_enemy)
+
+    for flyer_x, flyer_y in plan['flyers']:
+        new_flyer = pools.spawn(FlyerEnemy, flyer_x, flyer_y)
+        flyer_enemies.add(new_flyer)
+        all_sprites.add(new_flyer)
+        log_game_event(f"Spawned Flyer Enemy on Level {current_level+1}!")
+
+    if plan['powerup']:
+        pu_x, pu_y, powerup_type = plan['powerup']
+        powerup_image = None
+        if powerup_type == 'double_blast':
+            powerup_image = DOUBLE_BLAST_POWERUP_IMAGE
+        elif powerup_type == 'orbit_shield':
+            powerup_image = ORBIT_SHIELD_POWERUP_IMAGE
+        elif powerup_type == 'quad_jump':
+            powerup_image = JUMP_POWERUP_IMAGE
+        elif powerup_type == 'extra_life': # New power-up image assignment
+            powerup_image = LIFE_POWERUP_IMAGE
+
+        new_powerup = pools.spawn(PowerUp, pu_x, pu_y, powerup_image, powerup_type)
+        powerups.add(new_powerup)
+        all_sprites.add(new_powerup)
+        log_game_event(f"Spawned {powerup_type} power-up on Level {current_level+1}!")
+
+# --- Level Prefetch ---
+class LevelPrefetcher:
+    """
+    Builds the next level's plan on a worker thread while the level-complete screen is showing, so
+    the key press that starts the level only has to spawn sprites. Each level's seed is drawn from
+    game_rng on the main thread at the same point either way, so prefetched and synchronously built
+    levels are identical for a given session seed.
+    """
+    def __init__(self):
+        self.executor = None # Created on first use
+        self.pending = None  # (level, future) for the plan being prefetched
+
+    def start(self, level):
+        if self.pending and self.pending[0] == level:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-prefetch")
+        self.pending = (level, self.executor.submit(build_level_plan, level, game_rng.getrandbits(64)))
+
+    def take(self, level):
+        """Returns the plan for level, waiting on the prefetch if it is still running or building it here if none was started."""
+        pending, self.pending = self.pending, None
+        if pending and pending[0] == level:
+            return pending[1].result()
+        return build_level_plan(level, game_rng.getrandbits(64))
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+level_prefetcher = LevelPrefetcher()
+
 # --- Game Setup Function ---
 def setup_game():
     global player, all_sprites, platforms, moving_platforms, coins, enemies, projectiles, shields
@@ -1385,17 +3100,11 @@ def setup_game():
     global powerups, orbiting_lights_group, shooter_enemies, shooter_projectiles, flyer_enemies # Include new groups
 
     # Clear all LEVEL-SPECIFIC sprite groups
-    platforms.empty()
-    moving_platforms.empty()
-    coins.empty()
-    enemies.empty()
-    shooter_enemies.empty() # Clear shooter enemies
-    shooter_projectiles.empty() # Clear shooter projectiles
-    flyer_enemies.empty() # Clear flyer enemies
-    projectiles.empty()
-    shields.empty() # Player temporary shields clear
-    boss_projectiles.empty()
-    powerups.empty()      # Clear power-up items
+    for entity_type in ENTITY_TYPES:
+        entity_type.group.empty()
+    terrain.clear()       # Platforms are re-indexed once the new layout is built
+    if enemy_store:
+        enemy_store.invalidate() # Pooled enemies come back with new patrol bounds
 
     # Remove all sprites from all_sprites that are not the player or orbiting lights
     # This prevents old level elements from persisting.
@@ -1426,6 +3135,8 @@ def setup_game():
        current_game_state == GAME_STATE_WEAPON_SELECT:
         return # Exit setup_game early, no level generation needed yet
 
+    load_gameplay_assets() # First level (or the weapon screen) of the session converts the gameplay images
+
     # --- Weapon Selection Trigger ---
     # After completing Level 1 (meaning current_level becomes 1), trigger weapon selection
     # Only trigger if the player still has the default weapon
@@ -1434,211 +3145,84 @@ def setup_game():
         return # Stop setting up game if we are going to weapon select
 
     # If we reached here, it means we are transitioning to a PLAYING or BOSS_FIGHT state
-    # Check if it's a boss level
-    if current_level > 0 and current_level % BOSS_APPEAR_INTERVAL == 0:
+    plan = level_prefetcher.take(current_level) # Usually built in the background during LEVEL_COMPLETE
+    if plan['boss']:
         boss_active = True
-        print(f"Starting Boss Level {current_level} (Boss Fight)!")
+        log_game_event(f"Starting Boss Level {current_level} (Boss Fight)!")
         current_game_state = GAME_STATE_BOSS_FIGHT # Set state to boss fight
-        
-        # For boss level, create a minimal platform for the player to stand on
-        ground = Platform(0, SCREEN_HEIGHT - PLATFORM_HEIGHT, SCREEN_WIDTH)
-        platforms.add(ground)
-        all_sprites.add(ground)
-
-        # Spawn the boss
-        boss_sprite = Boss(SCREEN_WIDTH // 2 - BOSS_WIDTH // 2, SCREEN_HEIGHT // 4)
-        all_sprites.add(boss_sprite)
-        # Some simple platforms for strategy in boss fight
-        num_static_platforms = random.randint(1, 3)
-        for _ in range(num_static_platforms):
-            x = random.randint(50, SCREEN_WIDTH - 150)
-            y = random.randint(SCREEN_HEIGHT // 2, SCREEN_HEIGHT - 100)
-            width = random.randint(80, 200)
-            new_platform = Platform(x, y, width)
-            platforms.add(new_platform)
-            all_sprites.add(new_platform)
-
-    else: # Regular level generation
+    else: # Regular level
         current_game_state = GAME_STATE_PLAYING # Set state to playing
-        print(f"Starting Regular Level {current_level}!")
-        
-        # Always add a ground platform first for consistency
-        ground = Platform(0, SCREEN_HEIGHT - PLATFORM_HEIGHT, SCREEN_WIDTH)
-        platforms.add(ground)
-        all_sprites.add(ground)
-
-        # Track the top of the most recently placed *reachable* platform
-        # Start from the ground for the first platforms
-        last_reachable_platform_top = SCREEN_HEIGHT - PLATFORM_HEIGHT
-        
-        # Generate static platforms
-        num_static_platforms = random.randint(3, 7)
-        for _ in range(num_static_platforms):
-            # Calculate a reachable y-position for the new platform
-            min_new_platform_y = int(max(
-                PLAYER_HEIGHT, # Don't place platforms too high off screen (top edge)
-                last_reachable_platform_top - MAX_PLATFORM_JUMP_HEIGHT
-            ))
-            # Ensure platforms are not too low either (above the ground + player height)
-            max_new_platform_y = int(SCREEN_HEIGHT - (2 * PLATFORM_HEIGHT) - PLAYER_HEIGHT)
-
-            # Ensure min_new_platform_y is not greater than max_new_platform_y
-            if min_new_platform_y >= max_new_platform_y:
-                # If range collapses, give a default valid range
-                y = random.randint(max(0, max_new_platform_y - 50), max_new_platform_y)
-            else:
-                y = random.randint(min_new_platform_y, max_new_platform_y)
-            
-            x = random.randint(50, SCREEN_WIDTH - 150)
-            width = random.randint(80, 200)
-            new_platform = Platform(x, y, width)
-            
-            # Simple check to avoid overlapping with existing platforms too much
-            overlap = False
-            for p in platforms:
-                if pygame.Rect.colliderect(new_platform.rect, p.rect.inflate(10, 10)): # Inflate slightly for buffer
-                    overlap = True
-                    break
-            
-            if not overlap:
-                platforms.add(new_platform)
-                all_sprites.add(new_platform)
-                last_reachable_platform_top = new_platform.rect.top # Update for next platform
-
-
-        # Generate moving platforms
-        num_moving_platforms = random.randint(1, 3)
-        for _ in range(num_moving_platforms):
-            width = random.randint(60, 120)
-            start_x = random.randint(50, SCREEN_WIDTH - 200)
-            end_x = random.randint(start_x + 50, SCREEN_WIDTH - width - 20)
-            
-            # Use similar reachable height logic for moving platforms
-            min_new_platform_y = int(max(
-                PLAYER_HEIGHT,
-                last_reachable_platform_top - MAX_PLATFORM_JUMP_HEIGHT
-            ))
-            max_new_platform_y = int(SCREEN_HEIGHT - (2 * PLATFORM_HEIGHT) - PLAYER_HEIGHT)
-
-            if min_new_platform_y >= max_new_platform_y:
-                y = random.randint(max(0, max_new_platform_y - 50), max_new_platform_y)
-            else:
-                y = random.randint(min_new_platform_y, max_new_platform_y)
-            
-            new_moving_platform = MovingPlatform(start_x, y, width, start_x, end_x, speed=random.choice([-ENEMY_SPEED, ENEMY_SPEED]))
-            
-            overlap = False
-            for p in platforms: # Check against static platforms
-                if pygame.Rect.colliderect(new_moving_platform.rect, p.rect.inflate(10, 10)):
-                    overlap = True
-                    break
-            for p in moving_platforms: # Check against other moving platforms
-                if pygame.Rect.colliderect(new_moving_platform.rect, p.rect.inflate(10, 10)):
-                    overlap = True
-                    break
+        log_game_event(f"Starting Regular Level {current_level}!")
+    apply_level_plan(plan)
 
-            if not overlap:
-                moving_platforms.add(new_moving_platform)
-                all_sprites.add(new_moving_platform)
-                # For moving platforms, we won't strictly update last_reachable_platform_top,
-                # as their 'base' Y doesn't always reflect a new jump point.
-                # The static platforms primarily define the upward path.
-                
-        all_available_platforms = list(platforms.sprites()) + list(moving_platforms.sprites())
-        
-        initial_coin_count_level = random.randint(5, 15)
-
-        for _ in range(initial_coin_count_level):
-            if not all_available_platforms:
-                break
-            target_platform = random.choice(all_available_platforms)
-            
-            coin_x = random.randint(target_platform.rect.left + COIN_SIZE, target_platform.rect.right - COIN_SIZE)
-            coin_y = target_platform.rect.top - COIN_SIZE - random.randint(10, 30)
-
-            new_coin = Coin(coin_x, coin_y)
-            coins.add(new_coin)
-            all_sprites.add(new_coin)
-
-        # Spawn new enemy types or regular enemies
-        if current_level >= NEW_ENEMY_SPAWN_LEVEL: # After level 3
-            # Spawn one special enemy per level
-            special_enemy_type = random.choice(['shooter', 'guard'])
-            if all_available_platforms:
-                target_platform = random.choice(all_available_platforms)
-                enemy_x = random.randint(target_platform.rect.left, target_platform.rect.right - ENEMY_WIDTH)
-                enemy_y = target_platform.rect.top - ENEMY_HEIGHT
-                
-                if special_enemy_type == 'shooter':
-                    new_enemy = ShooterEnemy(enemy_x, enemy_y)
-                    shooter_enemies.add(new_enemy)
-                    all_sprites.add(new_enemy)
-                    print(f"Spawned Shooter Enemy on Level {current_level+1}!")
-                else: # guard
-                    new_enemy = GuardEnemy(enemy_x, enemy_y)
-                    enemies.add(new_enemy) # Guard enemies are added to general enemies group
-                    all_sprites.add(new_enemy)
-                    print(f"Spawned Guard Enemy on Level {current_level+1}!")
-            
-            # Also spawn some regular enemies (fewer to balance with special enemy)
-            num_enemies = random.randint(1, 2)
-            for _ in range(num_enemies):
-                target_platform = random.choice(all_available_platforms)
-                enemy_x = random.randint(target_platform.rect.left, target_platform.rect.right - ENEMY_WIDTH)
-                enemy_y = target_platform.rect.top - ENEMY_HEIGHT
-                new_enemy = Enemy(enemy_x, enemy_y, ENEMY_WIDTH, ENEMY_HEIGHT, REGULAR_ENEMY_IMAGE, ENEMY_SPEED) # Pass regular enemy image
-                enemies.add(new_enemy)
-                all_sprites.add(new_enemy)
-
-        else: # Before new enemy spawn level, only spawn regular enemies
-            num_enemies = random.randint(1, 3)
-            for _ in range(num_enemies):
-                if not all_available_platforms:
-                    break
-                target_platform = random.choice(all_available_platforms)
-                enemy_x = random.randint(target_platform.rect.left, target_platform.rect.right - ENEMY_WIDTH)
-                enemy_y = target_platform.rect.top - ENEMY_HEIGHT
-
-                new_enemy = Enemy(enemy_x, enemy_y, ENEMY_WIDTH, ENEMY_HEIGHT, REGULAR_ENEMY_IMAGE, ENEMY_SPEED) # Pass regular enemy image
-                enemies.add(new_enemy)
-                all_sprites.add(new_enemy)
-        
-        # Spawn Flyer enemies (can appear in any level)
-        num_flyer_enemies = random.randint(1, 2)
-        for _ in range(num_flyer_enemies):
-            flyer_x = random.randint(50, SCREEN_WIDTH - FLYER_ENEMY_WIDTH - 50)
-            flyer_y = random.randint(SCREEN_HEIGHT // 4, SCREEN_HEIGHT // 2) # Fly higher up
-            new_flyer = FlyerEnemy(flyer_x, flyer_y)
-            flyer_enemies.add(new_flyer)
-            all_sprites.add(new_flyer)
-            print(f"Spawned Flyer Enemy on Level {current_level+1}!")
-
-        # Power-up spawning logic
-        if (current_level + 1) % POWERUP_SPAWN_INTERVAL == 0 and current_level > 0: # Ensures not on level 0 and aligned
-            if all_available_platforms:
-                target_platform = random.choice(all_available_platforms)
-                pu_x = random.randint(target_platform.rect.left + COIN_SIZE, target_platform.rect.right - COIN_SIZE)
-                pu_y = target_platform.rect.top - COIN_SIZE - random.randint(10, 30)
-                
-                # Randomly choose power-up type
-                powerup_types = ['double_blast', 'orbit_shield', 'quad_jump', 'extra_life'] # Added extra_life
-                powerup_type = random.choice(powerup_types)
-
-                powerup_image = None
-                if powerup_type == 'double_blast':
-                    powerup_image = DOUBLE_BLAST_POWERUP_IMAGE
-                elif powerup_type == 'orbit_shield':
-                    powerup_image = ORBIT_SHIELD_POWERUP_IMAGE
-                elif powerup_type == 'quad_jump':
-                    powerup_image = JUMP_POWERUP_IMAGE
-                elif powerup_type == 'extra_life': # New power-up image assignment
-                    powerup_image = LIFE_POWERUP_IMAGE
-                
-                new_powerup = PowerUp(pu_x, pu_y, powerup_image, powerup_type)
-                powerups.add(new_powerup)
-                all_sprites.add(new_powerup)
-                print(f"Spawned {powerup_type} power-up on Level {current_level+1}!")
 
+# --- Per-Frame Simulation ---
+def handle_player_enemy_collision(enemy_sprite, player_ref):
+    """Player-to-enemy collision damage, shared by every enemy and projectile type."""
+    global lives, current_game_state, score # Access global variables
+    if player_ref.take_hit(): # Player takes damage (checks shields internally)
+        lives -= 1
+        if lives <= 0:
+            current_game_state = GAME_STATE_GAMEOVER
+            update_player_high_score(score)
+            player_ref.reset_position_and_state(keep_powerups=False) # Clear power-ups on game over
+        else:
+            player_ref.reset_position_and_state(keep_powerups=True) # Reset player for next life, KEEP powerups
+    else: # Hit was blocked by a shield or invincibility
+        # Push enemy back slightly if blocked (optional)
+        if hasattr(enemy_sprite, 'vel_x'): # Check if enemy has vel_x
+            enemy_sprite.vel_x *= -1
+
+def resolve_collisions():
+    """
+    Collision detection: one broadphase pass finds every overlapping pair the layer matrix cares
+    about, then each rule's handler runs in the same order the individual checks always ran.
+    Handlers can respawn the player, knock enemies back, kill sprites or spawn orbiting lights, so
+    after a rule has handled any pair the broadphase runs again before the next rule. Like
+    spritecollide, every rule sees the sprites that overlap when the rule starts.
+    """
+    colliding_pairs = None
+    for (layer_pair, handler), section_name in zip(COLLISION_RULES, COLLISION_RULE_SECTIONS):
+        if colliding_pairs is None:
+            profiler.begin("broadphase")
+            colliding_pairs = collision_broadphase.find_pairs(get_collision_layers(), COLLISION_MATRIX)
+            profiler.end()
+        profiler.begin(section_name)
+        rule_pairs = colliding_pairs[layer_pair]
+        for sprite_a, sprite_b in rule_pairs:
+            handler(sprite_a, sprite_b)
+        if rule_pairs:
+            colliding_pairs = None # The handlers may have moved, spawned or removed sprites
+        profiler.end()
+
+def update_game_frame():
+    """Advances the game by one frame: sprite updates, collisions and level completion."""
+    global score, current_game_state, boss_sprite
+
+    # Update sprites
+    profiler.begin("update")
+    player.update(terrain)
+    # Orbiting lights update is now called within player.update, using the global group
+    update_entities()
+    profiler.end()
+
+    resolve_collisions()
+
+    # --- Level Completion Logic ---
+    # Check for boss defeat
+    if boss_active and boss_sprite and not boss_sprite.alive():
+        log_game_event("BOSS DEFEATED!")
+        current_game_state = GAME_STATE_LEVEL_COMPLETE
+        update_player_high_score(score)
+        boss_sprite = None
+        boss_projectiles.empty()
+        level_prefetcher.start(current_level + 1) # Build the next level while the level-complete screen shows
+    # Check for regular level completion (all coins collected and no enemies left)
+    elif not boss_active and initial_coin_count_level > 0 and \
+         not any(entity_type.group for entity_type in ENTITY_TYPES if entity_type.blocks_completion):
+        current_game_state = GAME_STATE_LEVEL_COMPLETE
+        update_player_high_score(score)
+        level_prefetcher.start(current_level + 1)
 
 # --- Input Box for Player Creation ---
 class InputBox:
@@ -1686,723 +3270,1338 @@ class InputBox:
                 pygame.draw.line(screen, self.color, (cursor_x, cursor_y), (cursor_x, cursor_y + self.font.get_height()), 2)
 
 
-# --- Initial Game State setup ---
-current_game_state = GAME_STATE_MENU # Ensure starting in menu
-
-# Initialize player once at the very start of the script
-player = Player(100, SCREEN_HEIGHT - 100)
-all_sprites.add(player) # Add player to all_sprites immediately
-
-# --- Game Loop ---
-running = True
-new_player_input_box = None # For player creation state
-weapon_select_index = 0 # For weapon selection screen
+# --- HUD ---
+class TextCache:
+    """Rendered text surfaces keyed by (font, text, color), so a string is only rendered once."""
+    def __init__(self, max_entries=256):
+        self.surfaces = {}
+        self.max_entries = max_entries # Scores keep changing, so don't let old strings pile up
+
+    def render(self, text_font, text, color):
+        key = (text_font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= self.max_entries:
+                self.surfaces.clear()
+            surface = text_font.render(text, True, color)
+            self.surfaces[key] = surface
+        return surface
+
+class HUD:
+    """In-game status strip (score, lives, level, player, power-ups, weapon), redrawn only when a value changes."""
+    LINE_SPACING = 40
+
+    def __init__(self, text_cache, text_font):
+        self.text_cache = text_cache
+        self.font = text_font
+        self.values = None # Values the cached strip was drawn from
+        self.strip = None
+        self.line_rects = [] # Areas of the strip that hold text
+
+    def current_values(self):
+        return (score, lives, current_level, selected_player_name, player.current_weapon,
+                player.can_double_blast, player.orbit_shield_hits, player.can_quad_jump,
+                player.is_rolling, player.is_fire_dashing)
+
+    def render(self, text, color):
+        return self.text_cache.render(self.font, text, color)
+
+    def redraw(self):
+        lives_text = self.render(f"Lives: {lives}", RED)
+        level_text = self.render(f"Level: {current_level + 1}", WHITE) # Display actual level number (1-indexed)
+        lines = [ # (text surface, position)
+            (self.render(f"Score: {score}", WHITE), (10, 10)),
+            (lives_text, (SCREEN_WIDTH - lives_text.get_width() - 10, 10)),
+            (level_text, (SCREEN_WIDTH // 2 - level_text.get_width() // 2, 10)),
+            (self.render(f"Player: {selected_player_name}", ORANGE), (10, 50)),
+        ]
 
-# Track key states for combo attacks
-key_k_pressed = False
-key_lshift_pressed = False
-key_rshift_pressed = False
+        # Display active power-up status (without timers)
+        status_lines = []
+        if player.can_double_blast:
+            status_lines.append(self.render("Double Blast!", WHITE))
+        if player.orbit_shield_hits > 0:
+            status_lines.append(self.render(f"Orbit Shield: {player.orbit_shield_hits} hits", WHITE))
+        if player.can_quad_jump:
+            status_lines.append(self.render("4x Jump!", WHITE))
+        if player.is_rolling: # Display rolling status
+            status_lines.append(self.render("Rolling!", (0, 255, 255))) # Cyan text
+        if player.is_fire_dashing: # Display fire dash status
+            status_lines.append(self.render("Fire Dashing!", FIRE_RED[:3])) # Fiery red text
+        # Display current weapon
+        weapon_display_name = player.current_weapon.replace('_', ' ').title()
+        status_lines.append(self.render(f"Weapon: {weapon_display_name}", GOLD))
 
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-            save_player_profiles() # Save profiles before quitting
-        
-        # Check key down events for combo and individual actions
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_k:
-                key_k_pressed = True
-            elif event.key == pygame.K_LSHIFT:
-                key_lshift_pressed = True
-            elif event.key == pygame.K_RSHIFT:
-                key_rshift_pressed = True
-        
-        # Check key up events for combo and individual actions
-        if event.type == pygame.KEYUP:
-            if event.key == pygame.K_k:
-                key_k_pressed = False
-            elif event.key == pygame.K_LSHIFT:
-                key_lshift_pressed = False
-            elif event.key == pygame.K_RSHIFT:
-                key_rshift_pressed = False
-
-        # Fire Dash combo check (Blast + Roll)
-        # This needs to be checked *before* individual K or SHIFT presses are processed
-        if (key_k_pressed and (key_lshift_pressed or key_rshift_pressed)) and \
-           (current_game_state == GAME_STATE_PLAYING or current_game_state == GAME_STATE_BOSS_FIGHT):
-            if player.has_blast and not player.is_fire_dashing and player.fire_dash_cooldown_timer == 0:
-                player.start_fire_dash()
-                # Consume key presses so they don't trigger individual actions
-                key_k_pressed = False
-                key_lshift_pressed = False
-                key_rshift_pressed = False
-
-
-        if current_game_state == GAME_STATE_MENU:
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:
-                    current_game_state = GAME_STATE_PLAYER_SELECT # Go to player select
-                elif event.key == pygame.K_ESCAPE:
-                    running = False # Quit game
-        
-        elif current_game_state == GAME_STATE_PLAYER_SELECT:
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE: # Go back to main menu
-                    current_game_state = GAME_STATE_MENU
-                elif event.key == pygame.K_n: # 'N' to create new player
-                    current_game_state = GAME_STATE_CREATE_PLAYER
-                    new_player_input_box = InputBox(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 + 50, 200, 40)
-                    new_player_input_box.active = True # Automatically activate input box
-                elif event.key == pygame.K_r: # 'R' to reset high score for selected player
-                    if selected_player_index != -1:
-                        player_profiles[selected_player_index]['high_score'] = 0
-                        high_score = 0 # Update global for display
-                        save_player_profiles()
-                        print(f"High score for {selected_player_name} reset to 0.")
-                elif event.key == pygame.K_d: # 'D' to delete selected player
-                    if selected_player_index != -1:
-                        deleted_player_name = player_profiles[selected_player_index]['name']
-                        del player_profiles[selected_player_index]
-                        save_player_profiles()
-                        print(f"Player {deleted_player_name} deleted.")
-                        if player_profiles: # If there are still players, select the first one
-                            selected_player_index = 0
-                            selected_player_name = player_profiles[selected_player_index]['name']
-                            high_score = player_profiles[selected_player_index]['high_score']
-                        else: # No players left
-                            selected_player_index = -1
-                            selected_player_name = "Guest"
-                            high_score = 0
-                elif event.key == pygame.K_UP:
-                    if len(player_profiles) > 0:
-                        selected_player_index = (selected_player_index - 1) % len(player_profiles)
-                        selected_player_name = player_profiles[selected_player_index]['name']
-                        high_score = player_profiles[selected_player_index]['high_score']
-                elif event.key == pygame.K_DOWN:
-                    if len(player_profiles) > 0:
-                        selected_player_index = (selected_player_index + 1) % len(player_profiles)
-                        selected_player_name = player_profiles[selected_player_index]['name']
-                        high_score = player_profiles[selected_player_index]['high_score']
-                elif event.key == pygame.K_RETURN: # Select current player and start game
-                    if selected_player_index != -1:
-                        # Reset level and game state for selected player
-                        current_game_state = GAME_STATE_PLAYING # Prepare to play
-                        current_level = 0
-                        lives = INITIAL_LIVES
-                        score = 0
-                        player.set_weapon("default_slash") # Ensure default weapon
-                        setup_game() # NOW call setup_game to build the first level (or go to weapon select)
-            
-        elif current_game_state == GAME_STATE_CREATE_PLAYER:
-            player_name = new_player_input_box.handle_event(event)
-            if player_name is not None: # Means ENTER was pressed in input box
-                if player_name.strip() and all(p['name'].lower() != player_name.strip().lower() for p in player_profiles):
-                    # Add new player profile
-                    player_profiles.append({'name': player_name.strip(), 'high_score': 0})
-                    save_player_profiles()
-                    selected_player_index = len(player_profiles) - 1 # Select the newly created player
-                    selected_player_name = player_profiles[selected_player_index]['name']
-                    high_score = player_profiles[selected_player_index]['high_score']
-                    current_game_state = GAME_STATE_PLAYER_SELECT # Go back to player select
+        hud_y_offset = 90
+        for status_text in status_lines:
+            lines.append((status_text, (10, hud_y_offset)))
+            hud_y_offset += self.LINE_SPACING
+
+        strip_height = hud_y_offset - self.LINE_SPACING + self.font.get_linesize()
+        self.strip = pygame.Surface((SCREEN_WIDTH, strip_height), pygame.SRCALPHA)
+        self.line_rects = []
+        for text_surface, position in lines:
+            # Lines never overlap, so MAX copies each text's pixels and alpha onto the clear strip unchanged
+            self.line_rects.append(self.strip.blit(text_surface, position, special_flags=pygame.BLEND_RGBA_MAX))
+
+    def draw_list(self):
+        """The strip's text areas as (key, image, dest, area) entries for the gameplay draw list."""
+        values = self.current_values()
+        if values != self.values:
+            self.values = values
+            self.redraw()
+        # The strip sits at (0, 0), so each line's area on the strip is also its place on screen
+        return [(('hud', i), self.strip, line_rect, line_rect) for i, line_rect in enumerate(self.line_rects)]
+
+    def draw(self, surface):
+        surface.blits([(image, dest, area) for _, image, dest, area in self.draw_list()], doreturn=False)
+
+
+# --- Frame Profiler ---
+class FrameProfiler:
+    """
+    Times named phases of each frame with time.perf_counter. Nested sections are exclusive:
+    time spent in an inner section is not counted again in the outer one. Timing only runs
+    while the overlay is visible or a CSV file is being written.
+    """
+    WINDOW = 240 # Frames kept for the rolling percentiles
+    OVERLAY_REFRESH = 30 # Frames between overlay redraws
+
+    def __init__(self, sections, csv_path=None):
+        self.sections = list(sections) # Known section names, in display and CSV column order
+        self.history = {name: deque(maxlen=self.WINDOW) for name in self.sections + ["frame"]}
+        self.current = {}
+        self.stack = [] # (section name, start time) of the open sections
+        self.frame_start = time.perf_counter()
+        self.frame_number = 0
+        self.overlay_visible = False
+        self.overlay_image = None
+        self.overlay_font = pygame.font.Font(None, 20)
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path:
+            self.csv_file = open(csv_path, 'w', newline='')
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(["frame"] + [f"{name} ms" for name in self.sections] + ["total ms"])
+            print(f"Frame Profiler: Writing frame timings to {csv_path}")
+        self.active = self.csv_writer is not None
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        self.active = self.overlay_visible or self.csv_writer is not None
+        self.overlay_image = None
+        self.stack = []
+        self.current = {}
+
+    def begin(self, name):
+        if self.active:
+            self.stack.append((name, time.perf_counter()))
+
+    def end(self):
+        if not self.active or not self.stack:
+            return
+        name, start = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        self.current[name] = self.current.get(name, 0.0) + elapsed
+        if self.stack:
+            parent = self.stack[-1][0]
+            self.current[parent] = self.current.get(parent, 0.0) - elapsed
+
+    def end_frame(self):
+        """Closes the frame: records its timings, writes the CSV row and refreshes the overlay."""
+        now = time.perf_counter()
+        frame_time = now - self.frame_start
+        self.frame_start = now
+        self.frame_number += 1
+        if not self.active:
+            return
+        for name in self.sections:
+            self.history[name].append(self.current.get(name, 0.0))
+        self.history["frame"].append(frame_time)
+        if self.csv_writer:
+            self.csv_writer.writerow([self.frame_number] +
+                                     [f"{self.current.get(name, 0.0) * 1000:.3f}" for name in self.sections] +
+                                     [f"{frame_time * 1000:.3f}"])
+        self.current = {}
+        if self.overlay_visible and (self.overlay_image is None or self.frame_number % self.OVERLAY_REFRESH == 0):
+            self.overlay_image = self.render_overlay()
+
+    def percentiles(self, name):
+        """Rolling (p50, p99) of a section in milliseconds."""
+        samples = sorted(self.history[name])
+        if not samples:
+            return 0.0, 0.0
+        return samples[len(samples) // 2] * 1000, samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+
+    def render_overlay(self):
+        rows = [("phase", "p50 ms", "p99 ms")]
+        for name in self.sections + ["frame"]:
+            p50, p99 = self.percentiles(name)
+            rows.append((name, f"{p50:.2f}", f"{p99:.2f}"))
+        line_height = self.overlay_font.get_linesize()
+        name_width = max(self.overlay_font.size(row[0])[0] for row in rows)
+        column_width = self.overlay_font.size("0000.00")[0] + 10
+        panel = pygame.Surface((name_width + column_width * 2 + 10, line_height * len(rows) + 10), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, row in enumerate(rows):
+            y = 5 + i * line_height
+            panel.blit(self.overlay_font.render(row[0], True, WHITE), (5, y))
+            for column, text in enumerate(row[1:]):
+                text_surface = self.overlay_font.render(text, True, WHITE)
+                # Right-align the numbers in their column
+                right = 5 + name_width + column_width * (column + 1)
+                panel.blit(text_surface, (right - text_surface.get_width(), y))
+        return panel
+
+    def overlay_entry(self):
+        """The overlay as a (key, image, dest, area) draw list entry, or None while it is hidden."""
+        if not self.overlay_visible or self.overlay_image is None:
+            return None
+        # Bottom right, clear of the score and lives lines
+        overlay_position = (SCREEN_WIDTH - self.overlay_image.get_width(), SCREEN_HEIGHT - self.overlay_image.get_height())
+        return ('profiler', self.overlay_image, overlay_position, None)
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
+
+
+# --- Input Latency ---
+INPUT_LATENCY_BUCKETS_MS = (8, 16, 33, 50, 67, 100, 150, 250) # Histogram bucket upper bounds; slower presses go in a final bucket
+INPUT_LATENCY_ACTIONS = { # Gameplay keys whose latency is tracked -> action name
+    pygame.K_LEFT: "move", pygame.K_a: "move", pygame.K_RIGHT: "move", pygame.K_d: "move",
+    pygame.K_UP: "jump", pygame.K_w: "jump",
+    pygame.K_j: "slash", pygame.K_k: "blast", pygame.K_l: "shield",
+    pygame.K_LSHIFT: "roll", pygame.K_RSHIFT: "roll",
+}
+
+class InputLatencyTracker:
+    """
+    Measures, per gameplay action, the time from a key press to the display flip of the first frame
+    that reflects it: the first frame after the press that ran a simulation step. pygame events carry
+    no timestamp, so each press is stamped with the previous event poll, the earliest it can have
+    arrived; the figures are upper bounds that include the time it waited in SDL's queue.
+    """
+    def __init__(self):
+        self.previous_poll = time.perf_counter()
+        self.event_time = self.previous_poll # Stamp for the events returned by the latest poll
+        self.pending = [] # (action, event time) handled but not yet on screen
+        self.latencies = {} # action -> [seconds]
+
+    def poll(self):
+        """Call right after pygame.event.get()."""
+        now = time.perf_counter()
+        self.event_time, self.previous_poll = self.previous_poll, now
+
+    def note(self, action):
+        self.pending.append((action, self.event_time))
+
+    def frame_presented(self, simulated):
+        """Call after the flip; presses are only on screen once a simulation step has applied them."""
+        if not simulated:
+            return
+        now = time.perf_counter()
+        for action, event_time in self.pending:
+            self.latencies.setdefault(action, []).append(now - event_time)
+        self.pending = []
+
+    def discard_pending(self):
+        """Drops presses that never reached a simulation step (the game was paused or ended first)."""
+        self.pending = []
+
+    def report(self):
+        if not self.latencies:
+            return "Input Latency: No gameplay key presses recorded"
+        lines = []
+        for action, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            p50 = samples[len(samples) // 2] * 1000
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000
+            lines.append(f"Input Latency: {action:<7} {len(samples):5} presses  p50 {p50:6.1f} ms  "
+                         f"p95 {p95:6.1f} ms  max {samples[-1] * 1000:6.1f} ms")
+            counts = [0] * (len(INPUT_LATENCY_BUCKETS_MS) + 1)
+            for sample in samples:
+                bucket = 0
+                while bucket < len(INPUT_LATENCY_BUCKETS_MS) and sample * 1000 > INPUT_LATENCY_BUCKETS_MS[bucket]:
+                    bucket += 1
+                counts[bucket] += 1
+            for bucket, count in enumerate(counts):
+                if bucket < len(INPUT_LATENCY_BUCKETS_MS):
+                    label = f"<= {INPUT_LATENCY_BUCKETS_MS[bucket]:3} ms"
                 else:
-                    # Handle invalid or duplicate name
-                    print(f"Invalid name '{player_name}' or player already exists!")
-                    # You could draw an error message on screen here
-                    new_player_input_box.text = "" # Clear input
-                    new_player_input_box.txt_surface = new_player_input_box.font.render(new_player_input_box.text, True, new_player_input_box.color)
-                    new_player_input_box.active = True # Keep input box active for retry
-
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: # Cancel creation
-                current_game_state = GAME_STATE_PLAYER_SELECT
-                new_player_input_box = None
-        
-        elif current_game_state == GAME_STATE_WEAPON_SELECT:
-            weapons = ["big_sword", "dagger", "club"]
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_UP:
-                    weapon_select_index = (weapon_select_index - 1) % len(weapons)
-                elif event.key == pygame.K_DOWN:
-                    weapon_select_index = (weapon_select_index + 1) % len(weapons)
-                elif event.key == pygame.K_RETURN:
-                    chosen_weapon = weapons[weapon_select_index]
-                    player.set_weapon(chosen_weapon)
-                    current_game_state = GAME_STATE_PLAYING # Return to playing after selection
-                    setup_game() # Continue setting up the level
-                elif event.key == pygame.K_ESCAPE: # Go back to menu if ESC is pressed
-                    current_game_state = GAME_STATE_PLAYER_SELECT
-
-
-        elif current_game_state == GAME_STATE_PLAYING or current_game_state == GAME_STATE_BOSS_FIGHT: # Listen for input in both playing and boss fight
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT or event.key == pygame.K_a:
-                    player.move_left()
-                if event.key == pygame.K_RIGHT or event.key == pygame.K_d:
-                    player.move_right()
-                if event.key == pygame.K_UP or event.key == pygame.K_w:
-                    player.jump()
-                if event.key == pygame.K_j: # New: Slash attack (close range)
-                    slash_rect = player.slash_attack()
-                    if slash_rect:
-                        # Create a temporary sprite for collision detection with the Rect
-                        temp_slash_sprite = pygame.sprite.Sprite()
-                        temp_slash_sprite.rect = slash_rect
-                        
-                        # Check for regular/guard enemy collisions
-                        hit_enemies = pygame.sprite.spritecollide(temp_slash_sprite, enemies, False)
-                        for enemy in hit_enemies:
-                            apply_player_damage_to_enemy(enemy, player, 10) # 10 points for regular/guard
-
-                        # Check for shooter enemy collisions
-                        hit_shooter_enemies = pygame.sprite.spritecollide(temp_slash_sprite, shooter_enemies, False)
-                        for enemy in hit_shooter_enemies:
-                            apply_player_damage_to_enemy(enemy, player, 10) # 10 points for shooter
-
-                        # Check for flyer enemy collisions
-                        hit_flyer_enemies = pygame.sprite.spritecollide(temp_slash_sprite, flyer_enemies, False)
-                        for enemy in hit_flyer_enemies:
-                            apply_player_damage_to_enemy(enemy, player, 10) # 10 points for flyer
-
-                        # Check for boss collision with the slash hitbox
-                        if boss_active and boss_sprite and pygame.sprite.collide_rect(temp_slash_sprite, boss_sprite):
-                            apply_player_damage_to_boss(boss_sprite, player, 10, 5) # Base 10 damage to boss
-
-
-                if event.key == pygame.K_k and not (key_lshift_pressed or key_rshift_pressed): # Only blast if SHIFT is NOT pressed
-                    player.blast_attack()
-                if event.key == pygame.K_l: # New: Shield activation
-                    player.activate_shield()
-                if (event.key == pygame.K_RSHIFT or event.key == pygame.K_LSHIFT) and not key_k_pressed: # Only roll if K is NOT pressed
-                    player.start_roll()
-                if event.key == pygame.K_ESCAPE: # Press ESC to go back to menu
-                    current_game_state = GAME_STATE_MENU # Go to main menu
-                    update_player_high_score(score) # Check and save high score if returning to menu
-                    load_player_profiles() # Reload profiles for menu display
-                if event.key == pygame.K_p: # New: Press 'P' to pause
-                    current_game_state = GAME_STATE_PAUSED
-            if event.type == pygame.KEYUP:
-                if (event.key == pygame.K_LEFT or event.key == pygame.K_a) and player.vel_x < 0 and not player.is_rolling and not player.is_fire_dashing:
-                    player.stop_move()
-                if (event.key == pygame.K_RIGHT or event.key == pygame.K_d) and player.vel_x > 0 and not player.is_rolling and not player.is_fire_dashing:
-                    player.stop_move()
-        elif current_game_state == GAME_STATE_PAUSED:
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_p: # Press 'P' to unpause
-                    # Resume to correct state (PLAYING or BOSS_FIGHT)
-                    if current_level > 0 and current_level % BOSS_APPEAR_INTERVAL == 0:
-                        current_game_state = GAME_STATE_BOSS_FIGHT
-                    else:
-                        current_game_state = GAME_STATE_PLAYING
-                if event.key == pygame.K_ESCAPE: # Press ESC to return to menu from pause
-                    current_game_state = GAME_STATE_MENU # Go to main menu
-                    update_player_high_score(score) # Check and save high score if returning to menu
-                    load_player_profiles() # Reload profiles for menu display
-        elif current_game_state == GAME_STATE_GAMEOVER:
-            if event.type == pygame.KEYDOWN: # Listen for any key press to return to menu
-                current_game_state = GAME_STATE_PLAYER_SELECT # Go to player select after game over
-                load_player_profiles() # Reload profiles for menu display (to show new high score)
+                    label = f" > {INPUT_LATENCY_BUCKETS_MS[-1]:3} ms"
+                bar = "#" * round(count * 40 / len(samples))
+                lines.append(f"Input Latency:   {label} | {bar:<40} {count}")
+        return "\n".join(lines)
 
-        elif current_game_state == GAME_STATE_LEVEL_COMPLETE:
-            if event.type == pygame.KEYDOWN: # Listen for any key press to go to next level
-                current_level += 1 # Advance to the next level
-                setup_game() # Setup a new random level (or boss level, or weapon select)
-                load_player_profiles() # Reload profiles just in case
 
-
-    # --- Drawing Logic ---
+# --- Rendering ---
+def draw_background(surface):
     if BACKGROUND_IMAGE:
-        screen.blit(BACKGROUND_IMAGE, (0, 0))
+        surface.blit(BACKGROUND_IMAGE, (0, 0))
     else:
-        screen.fill(LIGHT_BLUE) # Fill with light blue if background image is missing
+        surface.fill(LIGHT_BLUE) # Fill with light blue if background image is missing
+
+_boss_health_bar_images = {} # Boss health -> bar surface
+
+def get_boss_health_bar_image(health):
+    """Boss health bar drawn once per health value."""
+    bar_image = _boss_health_bar_images.get(health)
+    if bar_image is None:
+        bar_width = BOSS_WIDTH * 2 # Make health bar wider than boss
+        bar_height = 10
+        bar_image = pygame.Surface((bar_width, bar_height), pygame.SRCALPHA)
+        # Background bar
+        pygame.draw.rect(bar_image, DARK_GRAY, (0, 0, bar_width, bar_height), 0, 3) # Rounded corners
+        # Health portion
+        health_width = (health / BOSS_HEALTH_MAX) * bar_width
+        pygame.draw.rect(bar_image, BOSS_HEALTH_COLOR, (0, 0, health_width, bar_height), 0, 3) # Rounded corners
+        _boss_health_bar_images[health] = bar_image
+    return bar_image
+
+# --- Render Interpolation ---
+previous_sprite_positions = {} # Sprite -> rect.topleft before the latest simulation step
+
+def remember_sprite_positions():
+    """Records where everything drawable is before a simulation step, for interpolating the next render."""
+    previous_sprite_positions.clear()
+    for group in (all_sprites, powerups, orbiting_lights_group):
+        for sprite in group:
+            previous_sprite_positions[sprite] = sprite.rect.topleft
+
+def render_offset(sprite, alpha):
+    """
+    Offset from a sprite's simulated position to where it is drawn, blending the last two
+    simulation steps by alpha (0 = previous step, 1 = latest step).
+    """
+    previous = previous_sprite_positions.get(sprite)
+    if previous is None:
+        return 0, 0 # Spawned during the latest step
+    dx = previous[0] - sprite.rect.x
+    dy = previous[1] - sprite.rect.y
+    if abs(dx) > RENDER_SNAP_DISTANCE or abs(dy) > RENDER_SNAP_DISTANCE:
+        return 0, 0 # Teleported, don't smear it across the screen
+    return round(dx * (1.0 - alpha)), round(dy * (1.0 - alpha))
+
+def interpolated_entries(group, tag, alpha):
+    entries = []
+    for sprite in group:
+        offset_x, offset_y = render_offset(sprite, alpha)
+        entries.append(((sprite, tag), sprite.image, (sprite.rect.x + offset_x, sprite.rect.y + offset_y), None))
+    return entries
+
+def build_gameplay_draw_list(alpha=1.0):
+    """
+    Everything drawn over the background during gameplay, in draw order, as
+    (key, image, dest, area) entries. Keys identify an element from one frame to the next.
+    alpha is how far the render time is between the last two simulation steps.
+    """
+    # Draw all sprites
+    draw_list = interpolated_entries(all_sprites, 'sprite', alpha)
+    # Draw power-ups (separately so they appear on top of platforms)
+    draw_list += interpolated_entries(powerups, 'powerup', alpha)
+    # Draw orbiting lights (separately so they appear on top of player)
+    draw_list += interpolated_entries(orbiting_lights_group, 'orbit', alpha)
+
+    # Draw slash attack visual ONLY if is_slashing_anim is true and player exists
+    if player and player.is_slashing_anim:
+        # Determine which weapon image to draw for slash animation
+        weapon_draw_image = None
+        if player.current_weapon == "big_sword" and BIG_SWORD_IMAGE:
+            weapon_draw_image = BIG_SWORD_IMAGE
+        elif player.current_weapon == "dagger" and DAGGER_IMAGE:
+            weapon_draw_image = DAGGER_IMAGE
+        elif player.current_weapon == "club" and CLUB_IMAGE:
+            weapon_draw_image = CLUB_IMAGE
+        elif SLASH_IMAGE: # Fallback for default slash if no specific weapon or image missing
+            weapon_draw_image = SLASH_IMAGE
+
+        if weapon_draw_image:
+            player_offset_x, player_offset_y = render_offset(player, alpha) # Follow the interpolated player
+            # Adjust position to be near the player and facing correct direction
+            # For big sword, the image should be centered on the expanded slash_rect
+            if player.current_weapon == "big_sword":
+                # The image needs to cover the extended width of the big sword attack
+                # Calculate new size to cover player.rect.width + ATTACK_RANGE_BIG_SWORD
+                # This is a bit of a manual adjustment for visual, actual collision is slash_rect
+                display_width = player.rect.width + ATTACK_RANGE_BIG_SWORD
+                display_height = player.rect.height * 2 # Cover more vertical space
+                display_image = assets.scale(BIG_SWORD_IMAGE, (display_width, display_height))
+
+                if player.facing_right:
+                    draw_x = player.rect.x
+                else:
+                    draw_x = player.rect.x - (display_width - player.rect.width) # Start drawing further left
+                draw_y = player.rect.centery - (display_height // 2)
 
-    if current_game_state == GAME_STATE_PLAYING or current_game_state == GAME_STATE_BOSS_FIGHT:
-        # Update sprites
-        player.update(platforms, moving_platforms)
-        # Orbiting lights update is now called within player.update, using the global group
+                draw_list.append(('slash', display_image, (draw_x + player_offset_x, draw_y + player_offset_y), None))
 
-        moving_platforms.update()
-        projectiles.update() # Player projectiles
-        shields.update()     # Player shields
-        powerups.update()    # Update power-up items (not strictly necessary but good practice)
 
-        if boss_active and boss_sprite:
-            boss_sprite.update(platforms, moving_platforms, player.rect)
-            boss_projectiles.update()
+            else: # For default slash, dagger, club (standard slash visual)
+                if player.facing_right:
+                    slash_draw_x = player.rect.right - (PLAYER_WIDTH // 4) # Slightly overlap player
+                    draw_image = weapon_draw_image
+                else:
+                    slash_draw_x = player.rect.left - weapon_draw_image.get_width() + (PLAYER_WIDTH // 4) # Slightly overlap
+                    draw_image = get_oriented_image(weapon_draw_image, False) # Flip for left
+                slash_draw_y = player.rect.centery - draw_image.get_height() // 2
+                draw_list.append(('slash', draw_image, (slash_draw_x + player_offset_x, slash_draw_y + player_offset_y), None))
+
+
+    # Draw Boss Health Bar
+    if boss_active and boss_sprite and boss_sprite.alive():
+        bar_image = get_boss_health_bar_image(boss_sprite.health)
+        boss_offset_x, boss_offset_y = render_offset(boss_sprite, alpha)
+        bar_x = boss_sprite.rect.centerx + boss_offset_x - bar_image.get_width() // 2
+        bar_y = boss_sprite.rect.top + boss_offset_y - bar_image.get_height() - 5 # Above the boss
+        draw_list.append(('boss_health', bar_image, (bar_x, bar_y), None))
+
+    # Draw score, lives, level and power-up status (re-rendered only when a value changes)
+    profiler.begin("hud")
+    draw_list += hud.draw_list()
+    profiler.end()
+    return draw_list
+
+class DirtyRectRenderer:
+    """
+    Optional gameplay renderer (--dirty-rects). Restores the background only where an element moved,
+    appeared, disappeared or changed image, redraws whatever overlaps those areas, and pushes just
+    those rectangles with pygame.display.update(rects) instead of flipping the whole screen.
+    """
+    def __init__(self):
+        self.drawn = {} # key -> (image, screen rect, area) as drawn last frame
+        self.pending_rects = None # None means present() flips the whole screen
+
+    def reset(self):
+        """Forgets the last frame (menus, pause, window exposed), so the next gameplay frame is drawn in full."""
+        self.drawn = {}
+
+    def draw(self, surface, draw_list):
+        current = {}
+        for key, image, dest, area in draw_list:
+            size = area.size if area else image.get_size()
+            current[key] = (image, pygame.Rect(dest[0], dest[1], size[0], size[1]), area)
+
+        if not self.drawn:
+            # Nothing to compare against: the background is already painted, draw everything
+            surface.blits([(image, rect, area) for image, rect, area in current.values()], doreturn=False)
+            self.pending_rects = None
+            self.drawn = current
+            return
+
+        dirty = []
+        for key, (image, rect, area) in current.items():
+            previous = self.drawn.get(key)
+            if previous is None or previous[0] is not image or previous[1] != rect or previous[2] != area:
+                dirty.append(rect)
+                if previous is not None:
+                    dirty.append(previous[1])
+        for key, (_, rect, _) in self.drawn.items():
+            if key not in current:
+                dirty.append(rect)
+
+        screen_rect = surface.get_rect()
+        dirty = [rect.clip(screen_rect) for rect in dirty]
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+        for dirty_rect in dirty:
+            surface.set_clip(dirty_rect)
+            draw_background(surface)
+            for image, rect, area in current.values():
+                if rect.colliderect(dirty_rect):
+                    surface.blit(image, rect, area)
+        surface.set_clip(None)
+
+        self.pending_rects = dirty
+        self.drawn = current
+
+    def present(self):
+        if self.pending_rects is None:
+            pygame.display.flip()
         else:
-            enemies.update(platforms, moving_platforms) # Only update regular and guard enemies if no boss
-
-        shooter_enemies.update(platforms, moving_platforms) # Update shooter enemies regardless of boss
-        shooter_projectiles.update() # Update shooter projectiles
-        flyer_enemies.update(platforms, moving_platforms) # Update flyer enemies
+            pygame.display.update(self.pending_rects)
+        self.pending_rects = None
 
 
-        # --- Collision Detection ---
-
-        # Player-PowerUp Collision
-        hit_powerups = pygame.sprite.spritecollide(player, powerups, False) # Don't kill immediately
-        for pu in hit_powerups:
-            pu.apply_effect(player) # Apply effect, which also calls pu.kill()
-            # powerups.remove(pu) # This is handled by pu.kill() which removes from all groups
+# --- Initial Game State setup ---
+current_game_state = GAME_STATE_MENU # Ensure starting in menu
 
+# Created by init_game_objects() once the display is up
+text_cache = None
+hud = None
+pause_overlay = None
+dirty_renderer = None
+enemy_store = None
+profiler = None
+input_latency = None # InputLatencyTracker with --input-latency
+
+def init_game_objects(dirty_rects=False, vectorized_enemies=False, profile_csv=None, track_input_latency=False):
+    """Creates the player, HUD and per-session helpers. Needs init_display() (and load_menu_assets()) first."""
+    global player, text_cache, hud, pause_overlay, dirty_renderer, enemy_store, profiler, input_latency
+    # Initialize player once at the start of the session
+    player = Player(100, SCREEN_HEIGHT - 100)
+    all_sprites.add(player) # Add player to all_sprites immediately
+
+    text_cache = TextCache()
+    hud = HUD(text_cache, font)
+    pause_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    pause_overlay.fill(GRAY) # This is 100 alpha, so translucent
+    dirty_renderer = DirtyRectRenderer() if dirty_rects else None
+    enemy_store = None
+    if vectorized_enemies:
+        if not EnemyArrayStore.available():
+            print("Vectorized Enemies: NumPy is not installed, falling back to per-sprite updates.")
+        else:
+            enemy_store = EnemyArrayStore()
+    profiler = FrameProfiler(["events", "update", "broadphase"] + COLLISION_RULE_SECTIONS + ["draw", "hud", "flip"],
+                             profile_csv)
+    input_latency = InputLatencyTracker() if track_input_latency else None
 
-        # Player-Enemy Collision (Player takes damage unless shielding, rolling, or fire dashing)
-        # Define a function to handle player-to-enemy collision damage to reduce redundancy
-        def handle_player_enemy_collision(enemy_sprite, player_ref):
-            global lives, current_game_state, score # Access global variables
-            if player_ref.take_hit(): # Player takes damage (checks shields internally)
-                lives -= 1
-                if lives <= 0:
-                    current_game_state = GAME_STATE_GAMEOVER
-                    update_player_high_score(score)
-                    player_ref.reset_position_and_state(keep_powerups=False) # Clear power-ups on game over
-                else:
-                    player_ref.reset_position_and_state(keep_powerups=True) # Reset player for next life, KEEP powerups
-            else: # Hit was blocked by a shield or invincibility
-                # Push enemy back slightly if blocked (optional)
-                if hasattr(enemy_sprite, 'vel_x'): # Check if enemy has vel_x
-                    enemy_sprite.vel_x *= -1
-
-        # Fire Dash collision (priority)
-        if player.is_fire_dashing and player.fire_dash_active:
-            fire_dash_enemies = pygame.sprite.spritecollide(player, enemies, False) + \
-                                pygame.sprite.spritecollide(player, shooter_enemies, False) + \
-                                pygame.sprite.spritecollide(player, flyer_enemies, False)
-            
-            for enemy_target in fire_dash_enemies:
-                # Fire dash damage to regular enemies
-                apply_player_damage_to_enemy(enemy_target, player, 10 * FIRE_DASH_DAMAGE_MULTIPLIER)
-
-            if boss_active and boss_sprite and pygame.sprite.collide_rect(player, boss_sprite):
-                # Fire dash damage to boss
-                apply_player_damage_to_boss(boss_sprite, player, 20 * FIRE_DASH_DAMAGE_MULTIPLIER, 25) # Base 20 damage * 5x multiplier, 25 score
-
-
-        # Regular and Guard enemies
-        colliding_enemies_general = pygame.sprite.spritecollide(player, enemies, False)
-        for enemy in colliding_enemies_general:
-            # Only take damage if not fire dashing
-            if not player.is_fire_dashing:
-                handle_player_enemy_collision(enemy, player)
-
-        # Shooter enemies
-        colliding_shooter_enemies = pygame.sprite.spritecollide(player, shooter_enemies, False)
-        for enemy in colliding_shooter_enemies:
-            if not player.is_fire_dashing:
-                handle_player_enemy_collision(enemy, player)
-        
-        # Flyer enemies
-        colliding_flyer_enemies = pygame.sprite.spritecollide(player, flyer_enemies, False)
-        for enemy in colliding_flyer_enemies:
-            if not player.is_fire_dashing:
-                handle_player_enemy_collision(enemy, player)
+    startup_timer.mark("game objects")
 
+# --- Game Loop ---
+running = True
+new_player_input_box = None # For player creation state
+weapon_select_index = 0 # For weapon selection screen
 
-        # Player-Boss Direct Collision
-        if boss_active and boss_sprite and pygame.sprite.collide_rect(player, boss_sprite):
-            if not player.is_fire_dashing: # Only take damage if not fire dashing
-                handle_player_enemy_collision(boss_sprite, player)
+# Track key states for combo attacks
+key_k_pressed = False
+key_lshift_pressed = False
+key_rshift_pressed = False
 
+def handle_event(event):
+    """Applies one input or window event to the game state (menus, player actions, pausing)."""
+    global running, current_game_state, current_level, lives, score
+    global selected_player_index, selected_player_name, high_score
+    global new_player_input_box, weapon_select_index
+    global key_k_pressed, key_lshift_pressed, key_rshift_pressed
+
+    if event.type == pygame.QUIT:
+        running = False # Profiles are saved as they change; the store is closed at exit
+    if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+        profiler.toggle_overlay() # Show/hide frame timings
+        profiler.begin("events") # Toggling drops the open sections
+    if dirty_renderer and event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+        dirty_renderer.reset() # The window contents may have been lost
+
+    # Check key down events for combo and individual actions
+    if event.type == pygame.KEYDOWN:
+        if event.key == pygame.K_k:
+            key_k_pressed = True
+        elif event.key == pygame.K_LSHIFT:
+            key_lshift_pressed = True
+        elif event.key == pygame.K_RSHIFT:
+            key_rshift_pressed = True
+
+    # Check key up events for combo and individual actions
+    if event.type == pygame.KEYUP:
+        if event.key == pygame.K_k:
+            key_k_pressed = False
+        elif event.key == pygame.K_LSHIFT:
+            key_lshift_pressed = False
+        elif event.key == pygame.K_RSHIFT:
+            key_rshift_pressed = False
+
+    # Fire Dash combo check (Blast + Roll)
+    # This needs to be checked *before* individual K or SHIFT presses are processed
+    fire_dash_started = False
+    if (key_k_pressed and (key_lshift_pressed or key_rshift_pressed)) and \
+       (current_game_state == GAME_STATE_PLAYING or current_game_state == GAME_STATE_BOSS_FIGHT):
+        if player.has_blast and not player.is_fire_dashing and player.fire_dash_cooldown_timer == 0:
+            player.start_fire_dash()
+            fire_dash_started = True
+            if input_latency:
+                input_latency.note("fire_dash")
+            # Consume key presses so they don't trigger individual actions
+            key_k_pressed = False
+            key_lshift_pressed = False
+            key_rshift_pressed = False
+
+
+    if current_game_state == GAME_STATE_MENU:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_RETURN:
+                current_game_state = GAME_STATE_PLAYER_SELECT # Go to player select
+            elif event.key == pygame.K_ESCAPE:
+                running = False # Quit game
 
-        # Projectile-Enemy Collision (Player's blast hits regular enemies)
-        for projectile in projectiles:
-            hit_enemies_general = pygame.sprite.spritecollide(projectile, enemies, False) # Check for regular/guard
-            for enemy in hit_enemies_general:
-                projectile.kill()
-                apply_player_damage_to_enemy(enemy, player, 10) # Player blast damage
-            
-            hit_shooter_enemies = pygame.sprite.spritecollide(projectile, shooter_enemies, False) # Check for shooter
-            for enemy in hit_shooter_enemies:
-                projectile.kill()
-                apply_player_damage_to_enemy(enemy, player, 10) # Player blast damage
-            
-            hit_flyer_enemies = pygame.sprite.spritecollide(projectile, flyer_enemies, False) # Check for flyer
-            for enemy in hit_flyer_enemies:
-                projectile.kill()
-                apply_player_damage_to_enemy(enemy, player, 10) # Player blast damage
-
-
-        # Projectile-Boss Collision (Player's blast hits boss)
-        if boss_active and boss_sprite:
-            for projectile in projectiles:
-                if pygame.sprite.collide_rect(projectile, boss_sprite):
-                    projectile.kill() # Destroy projectile on hit
-                    apply_player_damage_to_boss(boss_sprite, player, 20, 5) # Blast does 20 damage to boss
-
-
-        # Boss Projectile-Player/Orbiting Light Collision
-        if boss_active and boss_sprite and player:
-            potential_targets = pygame.sprite.Group()
-            potential_targets.add(player)
-            if player.orbit_shield_hits > 0:
-                potential_targets.add(orbiting_lights_group.sprites())
-
-            collided_projectiles_map = pygame.sprite.groupcollide(boss_projectiles, potential_targets, True, False)
-
-            for projectile, targets_hit in collided_projectiles_map.items():
-                for target in targets_hit:
-                    if target == player:
-                        if not player.is_fire_dashing: # Only take damage if not fire dashing
-                            handle_player_enemy_collision(target, player)
-                        break # Only process one hit for this projectile
-                    elif isinstance(target, OrbitingLight):
-                        player.take_hit() # Consume shield charge
-                        break # Only process one hit for this projectile
-
-        # Shooter Projectile-Player/Orbiting Light Collision (New logic for shooter projectiles)
-        if player and shooter_enemies: # Only check if player and shooter enemies exist
-            potential_targets_for_shooter = pygame.sprite.Group()
-            potential_targets_for_shooter.add(player)
-            if player.orbit_shield_hits > 0:
-                potential_targets_for_shooter.add(orbiting_lights_group.sprites())
-
-            collided_shooter_projectiles_map = pygame.sprite.groupcollide(shooter_projectiles, potential_targets_for_shooter, True, False)
-
-            for projectile, targets_hit in collided_shooter_projectiles_map.items():
-                for target in targets_hit:
-                    if target == player:
-                        if not player.is_fire_dashing: # Only take damage if not fire dashing
-                            handle_player_enemy_collision(target, player)
-                        break
-                    elif isinstance(target, OrbitingLight):
-                        player.take_hit() # Consume shield charge
-                        break
+    elif current_game_state == GAME_STATE_PLAYER_SELECT:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE: # Go back to main menu
+                current_game_state = GAME_STATE_MENU
+            elif event.key == pygame.K_n: # 'N' to create new player
+                current_game_state = GAME_STATE_CREATE_PLAYER
+                new_player_input_box = InputBox(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 + 50, 200, 40)
+                new_player_input_box.active = True # Automatically activate input box
+            elif event.key == pygame.K_r: # 'R' to reset high score for selected player
+                if selected_player_index != -1:
+                    profile_store.set_high_score(selected_player_index, 0)
+                    high_score = 0 # Update global for display
+                    print(f"High score for {selected_player_name} reset to 0.")
+            elif event.key == pygame.K_d: # 'D' to delete selected player
+                if selected_player_index != -1:
+                    deleted_player_name = selected_player_name
+                    profile_store.delete(selected_player_index)
+                    print(f"Player {deleted_player_name} deleted.")
+                    select_player(0 if len(profile_store) else -1) # First remaining player, or Guest
+            elif event.key == pygame.K_UP:
+                if len(profile_store) > 0:
+                    select_player((selected_player_index - 1) % len(profile_store))
+            elif event.key == pygame.K_DOWN:
+                if len(profile_store) > 0:
+                    select_player((selected_player_index + 1) % len(profile_store))
+            elif event.key == pygame.K_PAGEUP:
+                if len(profile_store) > 0:
+                    select_player(max(selected_player_index - PROFILES_PER_PAGE, 0))
+            elif event.key == pygame.K_PAGEDOWN:
+                if len(profile_store) > 0:
+                    select_player(min(selected_player_index + PROFILES_PER_PAGE, len(profile_store) - 1))
+            elif event.key == pygame.K_RETURN: # Select current player and start game
+                if selected_player_index != -1:
+                    # Reset level and game state for selected player
+                    current_game_state = GAME_STATE_PLAYING # Prepare to play
+                    current_level = 0
+                    lives = INITIAL_LIVES
+                    score = 0
+                    player.set_weapon("default_slash") # Ensure default weapon
+                    setup_game() # NOW call setup_game to build the first level (or go to weapon select)
 
+    elif current_game_state == GAME_STATE_CREATE_PLAYER:
+        player_name = new_player_input_box.handle_event(event)
+        if player_name is not None: # Means ENTER was pressed in input box
+            if player_name.strip() and not profile_store.has_name(player_name.strip()):
+                # Add new player profile and select it
+                select_player(profile_store.add(player_name.strip()))
+                current_game_state = GAME_STATE_PLAYER_SELECT # Go back to player select
+            else:
+                # Handle invalid or duplicate name
+                print(f"Invalid name '{player_name}' or player already exists!")
+                # You could draw an error message on screen here
+                new_player_input_box.text = "" # Clear input
+                new_player_input_box.txt_surface = new_player_input_box.font.render(new_player_input_box.text, True, new_player_input_box.color)
+                new_player_input_box.active = True # Keep input box active for retry
 
-        # Player-Coin Collision
-        collected_coins = pygame.sprite.spritecollide(player, coins, True) # True means remove coin on collision
-        for coin in collected_coins:
-            score += 1
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: # Cancel creation
+            current_game_state = GAME_STATE_PLAYER_SELECT
+            new_player_input_box = None
 
+    elif current_game_state == GAME_STATE_WEAPON_SELECT:
+        weapons = ["big_sword", "dagger", "club"]
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_UP:
+                weapon_select_index = (weapon_select_index - 1) % len(weapons)
+            elif event.key == pygame.K_DOWN:
+                weapon_select_index = (weapon_select_index + 1) % len(weapons)
+            elif event.key == pygame.K_RETURN:
+                chosen_weapon = weapons[weapon_select_index]
+                player.set_weapon(chosen_weapon)
+                current_game_state = GAME_STATE_PLAYING # Return to playing after selection
+                setup_game() # Continue setting up the level
+            elif event.key == pygame.K_ESCAPE: # Go back to menu if ESC is pressed
+                current_game_state = GAME_STATE_PLAYER_SELECT
 
-        # --- Level Completion Logic ---
-        # Check for boss defeat
-        if boss_active and boss_sprite and not boss_sprite.alive():
-            print("BOSS DEFEATED!")
-            current_game_state = GAME_STATE_LEVEL_COMPLETE
-            update_player_high_score(score)
-            boss_sprite = None
-            boss_projectiles.empty()
-        # Check for regular level completion (all coins collected and no enemies left)
-        elif not boss_active and len(coins) == 0 and initial_coin_count_level > 0 and \
-             len(enemies) == 0 and len(shooter_enemies) == 0 and len(flyer_enemies) == 0: # Include flyer enemies
-            current_game_state = GAME_STATE_LEVEL_COMPLETE
-            update_player_high_score(score)
-        
-        # Draw all sprites
-        all_sprites.draw(screen)
-        # Draw power-ups (separately so they appear on top of platforms)
-        powerups.draw(screen)
-        # Draw orbiting lights (separately so they appear on top of player)
-        orbiting_lights_group.draw(screen) # Use global group for drawing
-
-        # Draw slash attack visual ONLY if is_slashing_anim is true and player exists
-        if player and player.is_slashing_anim:
-            # Determine which weapon image to draw for slash animation
-            weapon_draw_image = None
-            if player.current_weapon == "big_sword" and BIG_SWORD_IMAGE:
-                weapon_draw_image = BIG_SWORD_IMAGE
-            elif player.current_weapon == "dagger" and DAGGER_IMAGE:
-                weapon_draw_image = DAGGER_IMAGE
-            elif player.current_weapon == "club" and CLUB_IMAGE:
-                weapon_draw_image = CLUB_IMAGE
-            elif SLASH_IMAGE: # Fallback for default slash if no specific weapon or image missing
-                weapon_draw_image = SLASH_IMAGE
-
-            if weapon_draw_image:
-                # Adjust position to be near the player and facing correct direction
-                # For big sword, the image should be centered on the expanded slash_rect
-                if player.current_weapon == "big_sword":
-                    # The image needs to cover the extended width of the big sword attack
-                    # Calculate new size to cover player.rect.width + ATTACK_RANGE_BIG_SWORD
-                    # This is a bit of a manual adjustment for visual, actual collision is slash_rect
-                    display_width = player.rect.width + ATTACK_RANGE_BIG_SWORD
-                    display_height = player.rect.height * 2 # Cover more vertical space
-                    display_image = pygame.transform.scale(BIG_SWORD_IMAGE, (display_width, display_height))
-
-                    if player.facing_right:
-                        draw_x = player.rect.x
-                    else:
-                        draw_x = player.rect.x - (display_width - player.rect.width) # Start drawing further left
-                    draw_y = player.rect.centery - (display_height // 2)
-
-                    screen.blit(display_image, (draw_x, draw_y))
-
-
-                else: # For default slash, dagger, club (standard slash visual)
-                    if player.facing_right:
-                        slash_draw_x = player.rect.right - (PLAYER_WIDTH // 4) # Slightly overlap player
-                        draw_image = weapon_draw_image
-                    else:
-                        slash_draw_x = player.rect.left - weapon_draw_image.get_width() + (PLAYER_WIDTH // 4) # Slightly overlap
-                        draw_image = pygame.transform.flip(weapon_draw_image, True, False) # Flip for left
-                    screen.blit(draw_image, (slash_draw_x, player.rect.centery - draw_image.get_height() // 2))
-
-
-        # Draw Boss Health Bar
-        if boss_active and boss_sprite and boss_sprite.alive():
-            bar_width = BOSS_WIDTH * 2 # Make health bar wider than boss
-            bar_height = 10
-            bar_x = boss_sprite.rect.centerx - bar_width // 2
-            bar_y = boss_sprite.rect.top - bar_height - 5 # Above the boss
-
-            # Background bar
-            pygame.draw.rect(screen, DARK_GRAY, (bar_x, bar_y, bar_width, bar_height), 0, 3) # Rounded corners
-
-            # Health portion
-            health_width = (boss_sprite.health / BOSS_HEALTH_MAX) * bar_width
-            pygame.draw.rect(screen, BOSS_HEALTH_COLOR, (bar_x, bar_y, health_width, bar_height), 0, 3) # Rounded corners
-
-        # Draw score and lives in PLAYING/BOSS_FIGHT state
-        score_text = font.render(f"Score: {score}", True, WHITE)
-        screen.blit(score_text, (10, 10))
-        
-        lives_text = font.render(f"Lives: {lives}", True, RED)
-        screen.blit(lives_text, (SCREEN_WIDTH - lives_text.get_width() - 10, 10))
 
-        level_text = font.render(f"Level: {current_level + 1}", True, WHITE) # Display actual level number (1-indexed)
-        screen.blit(level_text, (SCREEN_WIDTH // 2 - level_text.get_width() // 2, 10))
+    elif current_game_state == GAME_STATE_PLAYING or current_game_state == GAME_STATE_BOSS_FIGHT: # Listen for input in both playing and boss fight
+        if event.type == pygame.KEYDOWN:
+            # One action per press: the press that started a fire dash was recorded as that
+            if input_latency and event.key in INPUT_LATENCY_ACTIONS and not fire_dash_started:
+                input_latency.note(INPUT_LATENCY_ACTIONS[event.key])
+            if event.key == pygame.K_LEFT or event.key == pygame.K_a:
+                player.move_left()
+            if event.key == pygame.K_RIGHT or event.key == pygame.K_d:
+                player.move_right()
+            if event.key == pygame.K_UP or event.key == pygame.K_w:
+                player.jump()
+            if event.key == pygame.K_j: # New: Slash attack (close range)
+                slash_rect = player.slash_attack()
+                if slash_rect:
+                    # Create a temporary sprite for collision detection with the Rect
+                    temp_slash_sprite = pygame.sprite.Sprite()
+                    temp_slash_sprite.rect = slash_rect
+
+                    # Check for regular/guard enemy collisions
+                    hit_enemies = pygame.sprite.spritecollide(temp_slash_sprite, enemies, False)
+                    for enemy in hit_enemies:
+                        apply_player_damage_to_enemy(enemy, player, 10) # 10 points for regular/guard
+
+                    # Check for shooter enemy collisions
+                    hit_shooter_enemies = pygame.sprite.spritecollide(temp_slash_sprite, shooter_enemies, False)
+                    for enemy in hit_shooter_enemies:
+                        apply_player_damage_to_enemy(enemy, player, 10) # 10 points for shooter
+
+                    # Check for flyer enemy collisions
+                    hit_flyer_enemies = pygame.sprite.spritecollide(temp_slash_sprite, flyer_enemies, False)
+                    for enemy in hit_flyer_enemies:
+                        apply_player_damage_to_enemy(enemy, player, 10) # 10 points for flyer
+
+                    # Check for boss collision with the slash hitbox
+                    if boss_active and boss_sprite and pygame.sprite.collide_rect(temp_slash_sprite, boss_sprite):
+                        apply_player_damage_to_boss(boss_sprite, player, 10, 5) # Base 10 damage to boss
+
+
+            if event.key == pygame.K_k and not (key_lshift_pressed or key_rshift_pressed): # Only blast if SHIFT is NOT pressed
+                player.blast_attack()
+            if event.key == pygame.K_l: # New: Shield activation
+                player.activate_shield()
+            if (event.key == pygame.K_RSHIFT or event.key == pygame.K_LSHIFT) and not key_k_pressed: # Only roll if K is NOT pressed
+                player.start_roll()
+            if event.key == pygame.K_ESCAPE: # Press ESC to go back to menu
+                current_game_state = GAME_STATE_MENU # Go to main menu
+                update_player_high_score(score) # Check and save high score if returning to menu
+            if event.key == pygame.K_p: # New: Press 'P' to pause
+                current_game_state = GAME_STATE_PAUSED
+        if event.type == pygame.KEYUP:
+            if (event.key == pygame.K_LEFT or event.key == pygame.K_a) and player.vel_x < 0 and not player.is_rolling and not player.is_fire_dashing:
+                player.stop_move()
+            if (event.key == pygame.K_RIGHT or event.key == pygame.K_d) and player.vel_x > 0 and not player.is_rolling and not player.is_fire_dashing:
+                player.stop_move()
+    elif current_game_state == GAME_STATE_PAUSED:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_p: # Press 'P' to unpause
+                # Resume to correct state (PLAYING or BOSS_FIGHT)
+                if current_level > 0 and current_level % BOSS_APPEAR_INTERVAL == 0:
+                    current_game_state = GAME_STATE_BOSS_FIGHT
+                else:
+                    current_game_state = GAME_STATE_PLAYING
+            if event.key == pygame.K_ESCAPE: # Press ESC to return to menu from pause
+                current_game_state = GAME_STATE_MENU # Go to main menu
+                update_player_high_score(score) # Check and save high score if returning to menu
+    elif current_game_state == GAME_STATE_GAMEOVER:
+        if event.type == pygame.KEYDOWN: # Listen for any key press to return to menu
+            current_game_state = GAME_STATE_PLAYER_SELECT # Go to player select after game over
 
-        player_name_text = font.render(f"Player: {selected_player_name}", True, ORANGE)
-        screen.blit(player_name_text, (10, 50))
+    elif current_game_state == GAME_STATE_LEVEL_COMPLETE:
+        if event.type == pygame.KEYDOWN: # Listen for any key press to go to next level
+            current_level += 1 # Advance to the next level
+            setup_game() # Swaps in the prefetched level (or boss level, or weapon select)
+
+def run_simulation_steps(num_steps):
+    """Runs up to num_steps fixed simulation steps, stopping early if gameplay ends. Returns the steps run."""
+    steps = 0
+    while steps < num_steps and \
+            (current_game_state == GAME_STATE_PLAYING or current_game_state == GAME_STATE_BOSS_FIGHT):
+        remember_sprite_positions()
+        update_game_frame()
+        steps += 1
+    return steps
+
+# --- Input Recording ---
+RECORDED_EVENT_TYPES = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN)
+
+def event_to_record(event):
+    """An event as [type, attributes] with only the JSON-friendly attributes kept."""
+    attributes = {}
+    for name, value in event.dict.items():
+        if isinstance(value, tuple):
+            value = list(value)
+        if isinstance(value, (bool, int, float, str, list)):
+            attributes[name] = value
+    return [event.type, attributes]
+
+def event_from_record(record):
+    event_type, attributes = record
+    attributes = {name: tuple(value) if isinstance(value, list) else value for name, value in attributes.items()}
+    return pygame.event.Event(event_type, attributes)
+
+class InputRecorder:
+    """
+    Records the session seed, the starting player profiles and, for every rendered frame, the input
+    events handled and the number of simulation steps run. Together they reproduce the session exactly.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.profiles = profile_store.snapshot() # Snapshot before the session changes them
+        self.selected_player_index = selected_player_index
+        self.frames = [] # [simulation steps, [event records]] per frame
+
+    def record_frame(self, events, sim_steps):
+        self.frames.append([sim_steps, [event_to_record(event) for event in events if event.type in RECORDED_EVENT_TYPES]])
+
+    def save(self):
+        data = {
+            'version': 1,
+            'seed': session_seed,
+            'profiles': self.profiles,
+            'selected_player_index': self.selected_player_index,
+            'frames': self.frames,
+        }
+        try:
+            with open(self.path, "w") as file:
+                json.dump(data, file)
+            print(f"Input Recording: Saved {len(self.frames)} frames to {self.path}")
+        except Exception as e:
+            print(f"Input Recording: Error saving file: {e}")
+
+class InputReplay:
+    """Hands out a recording's frames in order: (simulation steps, events) per frame."""
+    def __init__(self, data):
+        self.frames = data['frames']
+        self.index = 0
+
+    def finished(self):
+        return self.index >= len(self.frames)
+
+    def next_frame(self):
+        if self.finished():
+            return 0, []
+        sim_steps, records = self.frames[self.index]
+        self.index += 1
+        return sim_steps, [event_from_record(record) for record in records]
+
+def replay_summary():
+    return f"Replay: Finished at level {current_level} with score {score} and {lives} lives"
+
+input_recorder = None # Set by main() for --record
+input_replay = None # Set by main() for --replay
+
+def run_headless_replay(replay):
+    """Feeds a recorded session through the game logic as fast as possible, without drawing."""
+    load_gameplay_assets() # Loaded up front so image loading isn't timed as simulation
+    start_time = time.perf_counter()
+    total_steps = 0
+    while running and not replay.finished():
+        sim_steps, events = replay.next_frame()
+        for event in events:
+            handle_event(event)
+        total_steps += run_simulation_steps(sim_steps)
+
+    elapsed = max(time.perf_counter() - start_time, 1e-9)
+    print(f"Headless: Replayed {replay.index} frames ({total_steps} simulation steps) in {elapsed:.2f}s "
+          f"- {total_steps / elapsed:.0f} simulated FPS")
+    print(replay_summary())
+
+def run_headless(num_levels, frames_per_level):
+    """Steps the game logic as fast as the CPU allows, without drawing, and reports simulated FPS."""
+    global current_level, current_game_state, lives, score
+    global selected_player_index, selected_player_name, high_score
+    # Play as a guest so simulated game overs never write to the player profiles file
+    selected_player_index = -1
+    selected_player_name = "Guest"
+    high_score = 0
+    current_level = 0
+    lives = INITIAL_LIVES
+    score = 0
+    player.set_weapon("default_slash")
+    load_gameplay_assets() # Loaded up front so image loading isn't timed as simulation
+
+    total_frames = 0
+    start_time = time.perf_counter()
+    for _ in range(num_levels):
+        current_game_state = GAME_STATE_PLAYING
+        setup_game()
+        if current_game_state == GAME_STATE_WEAPON_SELECT:
+            # Take the weapon highlighted by default on the selection screen, as if ENTER was pressed
+            player.set_weapon(["big_sword", "dagger", "club"][weapon_select_index])
+            current_game_state = GAME_STATE_PLAYING
+            setup_game()
+
+        for _ in range(frames_per_level):
+            update_game_frame()
+            total_frames += 1
+            if current_game_state == GAME_STATE_GAMEOVER:
+                # Keep simulating the same level with a fresh set of lives
+                lives = INITIAL_LIVES
+                score = 0
+                current_game_state = GAME_STATE_BOSS_FIGHT if boss_active else GAME_STATE_PLAYING
+            elif current_game_state == GAME_STATE_LEVEL_COMPLETE:
+                break
+        current_level += 1
+
+    elapsed = max(time.perf_counter() - start_time, 1e-9)
+    print(f"Headless: Simulated {num_levels} levels ({total_frames} frames) in {elapsed:.2f}s "
+          f"- {total_frames / elapsed:.0f} simulated FPS")
+
+# --- Benchmarks ---
+BENCHMARK_REPEATS = 7 # Timed samples per benchmark; the median is reported
+BENCHMARK_MIN_SAMPLE_TIME = 0.02 # Seconds each sample runs for at least (iterations are doubled until it does)
+BENCHMARK_REGRESSION_THRESHOLD = 0.10 # Median slowdown versus the baseline that gets flagged
+BENCHMARK_SEED = 12345 # game_rng seed every sample starts from, so samples repeat the same work
+
+def parse_benchmark_sizes(text):
+    """'10x10,100x50' -> [(10, 10), (100, 50)] as (entities, platforms) pairs."""
+    sizes = []
+    for size in text.split(","):
+        num_entities, num_platforms = size.lower().split("x")
+        sizes.append((int(num_entities), int(num_platforms)))
+    return sizes
+
+def build_benchmark_world(num_entities, num_platforms):
+    """
+    Replaces the level with a fixed layout of num_platforms platforms (a quarter of them moving) and
+    num_entities each of coins, regular enemies and flyers, plus a boss. Same sizes, same world.
+    """
+    global current_game_state, boss_sprite, lives
+    current_game_state = GAME_STATE_MENU
+    setup_game() # Clears every level group and resets the player without generating a level
+    load_gameplay_assets()
+    current_game_state = GAME_STATE_PLAYING
+    lives = 10 ** 9 # Collisions may hit the player as often as they like without a game over
+
+    rng = random.Random(num_entities * 100003 + num_platforms)
+    ground = pools.spawn(Platform, 0, SCREEN_HEIGHT - PLATFORM_HEIGHT, SCREEN_WIDTH)
+    platforms.add(ground)
+    all_sprites.add(ground)
+    level_platforms = [ground]
+    for i in range(num_platforms):
+        width = rng.randint(80, 200)
+        x = rng.randint(0, SCREEN_WIDTH - width)
+        y = rng.randint(PLAYER_HEIGHT, SCREEN_HEIGHT - 2 * PLATFORM_HEIGHT - PLAYER_HEIGHT)
+        if i % 4 == 3:
+            new_platform = pools.spawn(MovingPlatform, x, y, width, x, min(x + width + 100, SCREEN_WIDTH), ENEMY_SPEED)
+            moving_platforms.add(new_platform)
+        else:
+            new_platform = pools.spawn(Platform, x, y, width)
+            platforms.add(new_platform)
+        all_sprites.add(new_platform)
+        level_platforms.append(new_platform)
+    terrain.rebuild(platforms, moving_platforms)
+
+    for _ in range(num_entities):
+        target = rng.choice(level_platforms)
+        new_coin = pools.spawn(Coin, rng.randint(target.rect.left, target.rect.right - COIN_SIZE), target.rect.top - COIN_SIZE - 10)
+        coins.add(new_coin)
+        target = rng.choice(level_platforms)
+        new_enemy = pools.spawn(Enemy, rng.randint(target.rect.left, target.rect.right - ENEMY_WIDTH), target.rect.top - ENEMY_HEIGHT,
+                                ENEMY_WIDTH, ENEMY_HEIGHT, REGULAR_ENEMY_IMAGE, ENEMY_SPEED)
+        enemies.add(new_enemy)
+        new_flyer = pools.spawn(FlyerEnemy, rng.randint(50, SCREEN_WIDTH - FLYER_ENEMY_WIDTH - 50), rng.randint(SCREEN_HEIGHT // 4, SCREEN_HEIGHT // 2))
+        flyer_enemies.add(new_flyer)
+        all_sprites.add(new_coin, new_enemy, new_flyer)
+    boss_sprite = Boss(SCREEN_WIDTH // 2 - BOSS_WIDTH // 2, SCREEN_HEIGHT // 4)
+
+def time_benchmark(function, prepare):
+    """
+    Runs function in timed samples and returns its median and best time per call in microseconds.
+    prepare() (untimed) restores the same starting state before every sample, since function
+    changes the world it runs on; each sample then repeats exactly the same sequence of calls.
+    """
+    prepare()
+    function() # Warm up caches (images, grid cells, pools)
+    iterations = 1
+    while True:
+        prepare()
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        if time.perf_counter() - start_time >= BENCHMARK_MIN_SAMPLE_TIME:
+            break
+        iterations *= 2
+    samples = []
+    for _ in range(BENCHMARK_REPEATS):
+        prepare()
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        samples.append((time.perf_counter() - start_time) / iterations)
+    return {'median_us': statistics.median(samples) * 1e6, 'min_us': min(samples) * 1e6, 'iterations': iterations}
+
+def draw_benchmark_frame():
+    draw_background(screen)
+    screen.blits([(image, dest, area) for _, image, dest, area in build_gameplay_draw_list()], doreturn=False)
+
+def setup_benchmark_level(level):
+    global current_level, current_game_state
+    current_level = level
+    current_game_state = GAME_STATE_PLAYING
+    with contextlib.redirect_stdout(io.StringIO()): # setup_game announces every level and spawn
+        setup_game()
+
+def run_benchmarks(sizes, output_path=None, baseline_path=None):
+    """Times the simulation hot paths for each (entities, platforms) size, optionally saving and comparing to a baseline."""
+    global selected_player_index, selected_player_name, high_score
+    # Play as a guest so nothing the benchmarks do is written to the player profiles
+    selected_player_index = -1
+    selected_player_name = "Guest"
+    high_score = 0
+    player.set_weapon("big_sword") # Past the level 1 weapon selection
+
+    cases = [
+        ("Player.update", lambda: player.update(terrain)),
+        ("Enemy.update", lambda: enemies.update(terrain)),
+        ("FlyerEnemy.update", lambda: flyer_enemies.update(terrain)),
+        ("Boss.update", lambda: boss_sprite.update(terrain, player.rect)),
+        ("update_entities", update_entities),
+        ("collisions", resolve_collisions),
+        ("draw", draw_benchmark_frame),
+    ]
+    if enemy_store:
+        cases.insert(2, ("Enemy.update vectorized", lambda: enemy_store.update(terrain, [enemies])))
+
+    results = {}
+    def record(key, result):
+        results[key] = result
+        print(f"Benchmark: {key:<52} median {result['median_us']:10.1f} us   best {result['min_us']:10.1f} us")
+
+    def prepare_world(num_entities, num_platforms):
+        game_rng.seed(BENCHMARK_SEED) # Enemy spawns and updates draw from game_rng
+        build_benchmark_world(num_entities, num_platforms)
+
+    for num_entities, num_platforms in sizes:
+        for name, function in cases:
+            # Every sample of every case starts from the same freshly built world
+            record(f"{name}[entities={num_entities},platforms={num_platforms}]",
+                   time_benchmark(function, lambda: prepare_world(num_entities, num_platforms)))
+    for level in (2, BOSS_APPEAR_INTERVAL):
+        # Reseeded per sample, so every sample generates the same sequence of level layouts
+        record(f"setup_game[level={level}]",
+               time_benchmark(lambda: setup_benchmark_level(level), lambda: game_rng.seed(BENCHMARK_SEED)))
+
+    if output_path:
+        data = {
+            'version': 1,
+            'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'vectorized_enemies': enemy_store is not None,
+            'results': results,
+        }
+        with open(output_path, "w") as file:
+            json.dump(data, file, indent=4)
+        print(f"Benchmark: Saved {len(results)} results to {output_path}")
+
+    if baseline_path:
+        with open(baseline_path, "r") as file:
+            baseline = json.load(file)['results']
+        regressions = 0
+        compared = 0
+        for key, result in results.items():
+            if key not in baseline:
+                continue
+            compared += 1
+            change = result['median_us'] / baseline[key]['median_us'] - 1
+            best_change = result['min_us'] / baseline[key]['min_us'] - 1
+            flag = ""
+            # A real slowdown moves the best sample too; a noisy median on its own isn't flagged
+            if change > BENCHMARK_REGRESSION_THRESHOLD and best_change > BENCHMARK_REGRESSION_THRESHOLD:
+                flag = "  SLOWER"
+                regressions += 1
+            print(f"Baseline: {key:<52} {baseline[key]['median_us']:10.1f} -> {result['median_us']:10.1f} us {change:+7.1%}{flag}")
+        print(f"Baseline: {regressions} of {compared} benchmarks more than "
+              f"{BENCHMARK_REGRESSION_THRESHOLD:.0%} slower than {baseline_path}")
+
+# --- Main Loop ---
+def run_game_loop(fps=60):
+    """Runs the windowed game until it is closed (or a --replay finishes)."""
+    global running
+    frame_time = 0.0 # Seconds since the previous rendered frame
+    sim_accumulator = 0.0 # Real time not yet consumed by simulation steps
+    while running:
+        profiler.begin("events")
+        events = pygame.event.get()
+        if input_latency:
+            input_latency.poll()
+        if input_replay:
+            if any(event.type == pygame.QUIT for event in events):
+                running = False # Closing the window still stops a replay
+            replay_steps, events = input_replay.next_frame()
+        for event in events:
+            handle_event(event)
+        profiler.end()
+
+
+        # --- Drawing Logic ---
+        profiler.begin("draw")
+        sim_steps = 0
+        in_gameplay = current_game_state == GAME_STATE_PLAYING or current_game_state == GAME_STATE_BOSS_FIGHT
+        if dirty_renderer and not in_gameplay:
+            dirty_renderer.reset() # Menus and overlays are always drawn in full
+        if not (dirty_renderer and dirty_renderer.drawn):
+            draw_background(screen)
+
+        if in_gameplay:
+            if input_replay:
+                sim_steps = run_simulation_steps(replay_steps) # Step exactly as the recorded frame did
+                render_alpha = 1.0
+            else:
+                # Fixed-timestep simulation: run as many SIM_STEP updates as the elapsed real time covers
+                sim_accumulator += frame_time
+                due_steps = int(sim_accumulator / SIM_STEP)
+                if due_steps > MAX_SIM_STEPS_PER_FRAME:
+                    due_steps = MAX_SIM_STEPS_PER_FRAME # Too far behind to catch up, let the game slow down instead
+                    sim_accumulator = due_steps * SIM_STEP
+                sim_steps = run_simulation_steps(due_steps)
+                sim_accumulator -= due_steps * SIM_STEP
+                render_alpha = min(sim_accumulator / SIM_STEP, 1.0)
+
+            draw_list = build_gameplay_draw_list(render_alpha)
+            overlay_entry = profiler.overlay_entry()
+            if overlay_entry:
+                draw_list.append(overlay_entry)
+            if dirty_renderer:
+                dirty_renderer.draw(screen, draw_list)
+            else:
+                screen.blits([(image, dest, area) for _, image, dest, area in draw_list], doreturn=False)
 
-        # Display active power-up status (without timers)
-        hud_y_offset = 90
-        if player.can_double_blast:
-            double_blast_status = font.render(f"Double Blast!", True, WHITE)
-            screen.blit(double_blast_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        if player.orbit_shield_hits > 0:
-            orbit_shield_status = font.render(f"Orbit Shield: {player.orbit_shield_hits} hits", True, WHITE)
-            screen.blit(orbit_shield_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        if player.can_quad_jump:
-            quad_jump_status = font.render(f"4x Jump!", True, WHITE)
-            screen.blit(quad_jump_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        if player.is_rolling: # Display rolling status
-            roll_status = font.render(f"Rolling!", True, (0, 255, 255)) # Cyan text
-            screen.blit(roll_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        if player.is_fire_dashing: # Display fire dash status
-            fire_dash_status = font.render(f"Fire Dashing!", True, FIRE_RED[:3]) # Fiery red text
-            screen.blit(fire_dash_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        
-        # Display current weapon
-        weapon_display_name = player.current_weapon.replace('_', ' ').title()
-        weapon_text = font.render(f"Weapon: {weapon_display_name}", True, GOLD)
-        screen.blit(weapon_text, (10, hud_y_offset))
 
+        elif current_game_state == GAME_STATE_MENU:
+            # Display Title
+            title_text = menu_font_large.render("Boot.dev Platformer", True, BLACK)
+            title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 200))
+            screen.blit(title_text, title_rect)
 
-    elif current_game_state == GAME_STATE_MENU:
-        # Display Title
-        title_text = menu_font_large.render("Boot.dev Platformer", True, BLACK)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 200))
-        screen.blit(title_text, title_rect)
+            # Display High Score for selected player on Menu
+            high_score_text = menu_font_medium.render(f"High Score ({selected_player_name}): {high_score}", True, BLACK)
+            high_score_rect = high_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 120))
+            screen.blit(high_score_text, high_score_rect)
 
-        # Display High Score for selected player on Menu
-        high_score_text = menu_font_medium.render(f"High Score ({selected_player_name}): {high_score}", True, BLACK)
-        high_score_rect = high_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 120))
-        screen.blit(high_score_text, high_score_rect)
+            # Shared leaderboard (from the client's cache, so drawing never waits on the network)
+            if leaderboard_client:
+                top_scores = leaderboard_client.top(3)
+                if top_scores:
+                    leaderboard_line = "Top: " + "   ".join(f"{i + 1}. {entry['name']} {entry['score']}" for i, entry in enumerate(top_scores))
+                else:
+                    leaderboard_line = "Leaderboard: no scores yet"
+                leaderboard_text = menu_font_small.render(leaderboard_line, True, BLACK)
+                leaderboard_rect = leaderboard_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60))
+                screen.blit(leaderboard_text, leaderboard_rect)
 
-        # "Press ENTER to Select Player"
-        select_player_prompt = menu_font_medium.render("Press ENTER to Select Player", True, BLACK)
-        select_player_rect = select_player_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
-        screen.blit(select_player_prompt, select_player_rect)
+            # "Press ENTER to Select Player"
+            select_player_prompt = menu_font_medium.render("Press ENTER to Select Player", True, BLACK)
+            select_player_rect = select_player_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
+            screen.blit(select_player_prompt, select_player_rect)
 
-        # "Press ESC to Quit"
-        quit_prompt = menu_font_medium.render("Press ESC to Quit", True, BLACK)
-        quit_rect = quit_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 120))
-        screen.blit(quit_prompt, quit_rect)
+            # "Press ESC to Quit"
+            quit_prompt = menu_font_medium.render("Press ESC to Quit", True, BLACK)
+            quit_rect = quit_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 120))
+            screen.blit(quit_prompt, quit_rect)
 
 
-    elif current_game_state == GAME_STATE_PLAYER_SELECT:
-        screen.fill(LIGHT_BLUE) # Clear screen for player select
+        elif current_game_state == GAME_STATE_PLAYER_SELECT:
+            screen.fill(LIGHT_BLUE) # Clear screen for player select
         
-        select_title = menu_font_large.render("Select Player", True, BLACK)
-        select_title_rect = select_title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 200))
-        screen.blit(select_title, select_title_rect)
-
-        y_offset = SCREEN_HEIGHT // 2 - 100
-        if not player_profiles:
-            no_players_text = menu_font_medium.render("No players found. Press 'N' to create one!", True, RED)
-            no_players_rect = no_players_text.get_rect(center=(SCREEN_WIDTH // 2, y_offset + 50))
-            screen.blit(no_players_text, no_players_rect)
-        else:
-            for i, profile in enumerate(player_profiles):
-                color = ORANGE if i == selected_player_index else BLACK
-                player_display_text = font.render(f"{profile['name']} (High Score: {profile['high_score']})", True, color)
-                player_display_rect = player_display_text.get_rect(center=(SCREEN_WIDTH // 2, y_offset + i * 40))
-                screen.blit(player_display_text, player_display_rect)
-
-            select_prompt = menu_font_small.render("Use UP/DOWN to select, ENTER to play", True, BLACK)
-            select_prompt_rect = select_prompt.get_rect(center=(SCREEN_WIDTH // 2, y_offset + len(player_profiles) * 40 + 50))
-            screen.blit(select_prompt, select_prompt_rect)
+            select_title = menu_font_large.render("Select Player", True, BLACK)
+            select_title_rect = select_title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 200))
+            screen.blit(select_title, select_title_rect)
+
+            y_offset = SCREEN_HEIGHT // 2 - 100
+            if not len(profile_store):
+                no_players_text = menu_font_medium.render("No players found. Press 'N' to create one!", True, RED)
+                no_players_rect = no_players_text.get_rect(center=(SCREEN_WIDTH // 2, y_offset + 50))
+                screen.blit(no_players_text, no_players_rect)
+            else:
+                # Only the page holding the selected player is listed
+                page_start = max(selected_player_index, 0) // PROFILES_PER_PAGE * PROFILES_PER_PAGE
+                page_profiles = profile_store.page(page_start, PROFILES_PER_PAGE)
+                for i, profile in enumerate(page_profiles):
+                    color = ORANGE if page_start + i == selected_player_index else BLACK
+                    player_display_text = font.render(f"{profile['name']} (High Score: {profile['high_score']})", True, color)
+                    player_display_rect = player_display_text.get_rect(center=(SCREEN_WIDTH // 2, y_offset + i * 40))
+                    screen.blit(player_display_text, player_display_rect)
+
+                prompt = "Use UP/DOWN to select, ENTER to play"
+                page_count = (len(profile_store) + PROFILES_PER_PAGE - 1) // PROFILES_PER_PAGE
+                if page_count > 1:
+                    prompt += f" (Page {page_start // PROFILES_PER_PAGE + 1}/{page_count}, PGUP/PGDN)"
+                select_prompt = menu_font_small.render(prompt, True, BLACK)
+                select_prompt_rect = select_prompt.get_rect(center=(SCREEN_WIDTH // 2, y_offset + len(page_profiles) * 40 + 50))
+                screen.blit(select_prompt, select_prompt_rect)
         
-        create_player_prompt = menu_font_small.render("Press 'N' to Create New Player", True, BLACK)
-        create_player_rect = create_player_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 130))
-        screen.blit(create_player_prompt, create_player_rect)
+            create_player_prompt = menu_font_small.render("Press 'N' to Create New Player", True, BLACK)
+            create_player_rect = create_player_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 130))
+            screen.blit(create_player_prompt, create_player_rect)
 
-        reset_hs_prompt = menu_font_small.render("Press 'R' to Reset High Score", True, BLACK)
-        reset_hs_rect = reset_hs_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 90))
-        screen.blit(reset_hs_prompt, reset_hs_rect)
+            reset_hs_prompt = menu_font_small.render("Press 'R' to Reset High Score", True, BLACK)
+            reset_hs_rect = reset_hs_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 90))
+            screen.blit(reset_hs_prompt, reset_hs_rect)
 
-        delete_player_prompt = menu_font_small.render("Press 'D' to Delete Player", True, BLACK)
-        delete_player_rect = delete_player_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50))
-        screen.blit(delete_player_prompt, delete_player_rect)
+            delete_player_prompt = menu_font_small.render("Press 'D' to Delete Player", True, BLACK)
+            delete_player_rect = delete_player_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50))
+            screen.blit(delete_player_prompt, delete_player_rect)
 
 
-    elif current_game_state == GAME_STATE_CREATE_PLAYER:
-        screen.fill(LIGHT_BLUE)
-        create_title = menu_font_large.render("Create New Player", True, BLACK)
-        create_title_rect = create_title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100))
-        screen.blit(create_title, create_title_rect)
+        elif current_game_state == GAME_STATE_CREATE_PLAYER:
+            screen.fill(LIGHT_BLUE)
+            create_title = menu_font_large.render("Create New Player", True, BLACK)
+            create_title_rect = create_title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100))
+            screen.blit(create_title, create_title_rect)
 
-        enter_name_prompt = font.render("Enter Name:", True, BLACK)
-        enter_name_rect = enter_name_prompt.get_rect(topright=(SCREEN_WIDTH // 2 - 10, SCREEN_HEIGHT // 2 + 10))
-        screen.blit(enter_name_prompt, enter_name_rect)
+            enter_name_prompt = font.render("Enter Name:", True, BLACK)
+            enter_name_rect = enter_name_prompt.get_rect(topright=(SCREEN_WIDTH // 2 - 10, SCREEN_HEIGHT // 2 + 10))
+            screen.blit(enter_name_prompt, enter_name_rect)
 
-        new_player_input_box.draw(screen)
+            new_player_input_box.draw(screen)
 
-        confirm_prompt = font.render("Press ENTER to Confirm, ESC to Cancel", True, BLACK)
-        confirm_rect = confirm_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 150))
-        screen.blit(confirm_prompt, confirm_rect)
+            confirm_prompt = font.render("Press ENTER to Confirm, ESC to Cancel", True, BLACK)
+            confirm_rect = confirm_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 150))
+            screen.blit(confirm_prompt, confirm_rect)
 
-    elif current_game_state == GAME_STATE_WEAPON_SELECT:
-        screen.fill(LIGHT_BLUE)
-        weapon_title = menu_font_large.render("Choose Your Weapon!", True, BLACK)
-        weapon_title_rect = weapon_title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 200))
-        screen.blit(weapon_title, weapon_title_rect)
-
-        weapons_options = [
-            ("Big Sword", BIG_SWORD_IMAGE, "Wide arc attack, 2x damage, cannot use blast."),
-            ("Dagger", DAGGER_IMAGE, "3x damage from behind, 0x from front."),
-            ("Club", CLUB_IMAGE, "Knocks enemies away, faster attack speed.")
-        ]
+        elif current_game_state == GAME_STATE_WEAPON_SELECT:
+            screen.fill(LIGHT_BLUE)
+            weapon_title = menu_font_large.render("Choose Your Weapon!", True, BLACK)
+            weapon_title_rect = weapon_title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 200))
+            screen.blit(weapon_title, weapon_title_rect)
+
+            weapons_options = [
+                ("Big Sword", BIG_SWORD_IMAGE, "Wide arc attack, 2x damage, cannot use blast."),
+                ("Dagger", DAGGER_IMAGE, "3x damage from behind, 0x from front."),
+                ("Club", CLUB_IMAGE, "Knocks enemies away, faster attack speed.")
+            ]
         
-        y_offset = SCREEN_HEIGHT // 2 - 50
-        for i, (name, image, description) in enumerate(weapons_options):
-            color = GOLD if i == weapon_select_index else BLACK
+            y_offset = SCREEN_HEIGHT // 2 - 50
+            for i, (name, image, description) in enumerate(weapons_options):
+                color = GOLD if i == weapon_select_index else BLACK
             
-            # Display weapon image
-            if image:
-                # Scale for display in menu, maybe slightly larger
-                display_image = pygame.transform.scale(image, (PLAYER_WIDTH * 3, PLAYER_HEIGHT * 3))
-                image_rect = display_image.get_rect(midright=(SCREEN_WIDTH // 2 - 20, y_offset + i * 100 + display_image.get_height() // 2))
-                screen.blit(display_image, image_rect)
+                # Display weapon image
+                if image:
+                    # Scale for display in menu, maybe slightly larger
+                    display_image = assets.scale(image, (PLAYER_WIDTH * 3, PLAYER_HEIGHT * 3))
+                    image_rect = display_image.get_rect(midright=(SCREEN_WIDTH // 2 - 20, y_offset + i * 100 + display_image.get_height() // 2))
+                    screen.blit(display_image, image_rect)
             
-            # Display weapon name
-            weapon_name_text = menu_font_medium.render(name, True, color)
-            weapon_name_rect = weapon_name_text.get_rect(midleft=(SCREEN_WIDTH // 2 + 20, y_offset + i * 100 + 10))
-            screen.blit(weapon_name_text, weapon_name_rect)
-
-            # Display weapon description
-            weapon_desc_text = menu_font_small.render(description, True, BLACK)
-            weapon_desc_rect = weapon_desc_text.get_rect(topleft=(SCREEN_WIDTH // 2 + 20, y_offset + i * 100 + 40))
-            screen.blit(weapon_desc_text, weapon_desc_rect)
+                # Display weapon name
+                weapon_name_text = menu_font_medium.render(name, True, color)
+                weapon_name_rect = weapon_name_text.get_rect(midleft=(SCREEN_WIDTH // 2 + 20, y_offset + i * 100 + 10))
+                screen.blit(weapon_name_text, weapon_name_rect)
+
+                # Display weapon description
+                weapon_desc_text = menu_font_small.render(description, True, BLACK)
+                weapon_desc_rect = weapon_desc_text.get_rect(topleft=(SCREEN_WIDTH // 2 + 20, y_offset + i * 100 + 40))
+                screen.blit(weapon_desc_text, weapon_desc_rect)
             
 
-        select_prompt = menu_font_small.render("Use UP/DOWN to select, ENTER to confirm", True, BLACK)
-        select_prompt_rect = select_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 80))
-        screen.blit(select_prompt, select_prompt_rect)
+            select_prompt = menu_font_small.render("Use UP/DOWN to select, ENTER to confirm", True, BLACK)
+            select_prompt_rect = select_prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 80))
+            screen.blit(select_prompt, select_prompt_rect)
 
 
-    elif current_game_state == GAME_STATE_PAUSED:
-        all_sprites.draw(screen) # Draw game elements first
-        boss_projectiles.draw(screen) # Ensure boss projectiles are also drawn underneath overlay
-        shooter_projectiles.draw(screen) # Draw shooter projectiles underneath overlay
-        # Draw power-ups and orbiting lights underneath overlay too
-        powerups.draw(screen)
-        orbiting_lights_group.draw(screen) # Use global group for drawing
-
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill(GRAY) # This is 100 alpha, so translucent
-        screen.blit(overlay, (0, 0))
-
-        pause_text = menu_font_large.render("PAUSED", True, WHITE)
-        resume_text = menu_font_small.render("Press 'P' to resume", True, WHITE)
-        menu_return_text = font.render("Press 'ESC' to return to menu", True, WHITE)
-
-        pause_rect = pause_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
-        resume_rect = resume_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
-        menu_return_rect = menu_return_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 80))
-
-        screen.blit(pause_text, pause_rect)
-        screen.blit(resume_text, resume_rect)
-        screen.blit(menu_return_text, menu_return_rect)
-
-        # Draw score and lives in PAUSED state
-        score_text = font.render(f"Score: {score}", True, WHITE)
-        screen.blit(score_text, (10, 10))
-        lives_text = font.render(f"Lives: {lives}", True, RED)
-        screen.blit(lives_text, (SCREEN_WIDTH - lives_text.get_width() - 10, 10))
-        level_text = font.render(f"Level: {current_level + 1}", True, WHITE)
-        screen.blit(level_text, (SCREEN_WIDTH // 2 - level_text.get_width() // 2, 10))
-        player_name_text = font.render(f"Player: {selected_player_name}", True, ORANGE)
-        screen.blit(player_name_text, (10, 50))
-        
-        # Display active power-up status (without timers)
-        hud_y_offset = 90
-        if player.can_double_blast:
-            double_blast_status = font.render(f"Double Blast!", True, WHITE)
-            screen.blit(double_blast_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        if player.orbit_shield_hits > 0:
-            orbit_shield_status = font.render(f"Orbit Shield: {player.orbit_shield_hits} hits", True, WHITE)
-            screen.blit(orbit_shield_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        if player.can_quad_jump:
-            quad_jump_status = font.render(f"4x Jump!", True, WHITE)
-            screen.blit(quad_jump_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        if player.is_rolling: # Display rolling status
-            roll_status = font.render(f"Rolling!", True, (0, 255, 255)) # Cyan text
-            screen.blit(roll_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        if player.is_fire_dashing: # Display fire dash status
-            fire_dash_status = font.render(f"Fire Dashing!", True, FIRE_RED[:3]) # Fiery red text
-            screen.blit(fire_dash_status, (10, hud_y_offset))
-            hud_y_offset += 40
-        
-        # Display current weapon
-        weapon_display_name = player.current_weapon.replace('_', ' ').title()
-        weapon_text = font.render(f"Weapon: {weapon_display_name}", True, GOLD)
-        screen.blit(weapon_text, (10, hud_y_offset))
+        elif current_game_state == GAME_STATE_PAUSED:
+            all_sprites.draw(screen) # Draw game elements first
+            boss_projectiles.draw(screen) # Ensure boss projectiles are also drawn underneath overlay
+            shooter_projectiles.draw(screen) # Draw shooter projectiles underneath overlay
+            # Draw power-ups and orbiting lights underneath overlay too
+            powerups.draw(screen)
+            orbiting_lights_group.draw(screen) # Use global group for drawing
 
+            screen.blit(pause_overlay, (0, 0))
 
-    elif current_game_state == GAME_STATE_GAMEOVER:
-        game_over_text = game_over_font.render("GAME OVER!", True, RED)
-        final_score_text = menu_font_medium.render(f"Final Score ({selected_player_name}): {score}", True, WHITE)
-        high_score_display_text = menu_font_small.render(f"High Score: {high_score}", True, WHITE)
-        restart_text = font.render("Press any key to return to player select", True, WHITE)
+            pause_text = text_cache.render(menu_font_large, "PAUSED", WHITE)
+            resume_text = text_cache.render(menu_font_small, "Press 'P' to resume", WHITE)
+            menu_return_text = text_cache.render(font, "Press 'ESC' to return to menu", WHITE)
 
-        go_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100))
-        score_rect = final_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30))
-        hs_display_rect = high_score_display_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
-        restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100))
+            pause_rect = pause_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
+            resume_rect = resume_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
+            menu_return_rect = menu_return_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 80))
 
-        screen.blit(game_over_text, go_rect)
-        screen.blit(final_score_text, score_rect)
-        screen.blit(high_score_display_text, hs_display_rect)
-        screen.blit(restart_text, restart_rect)
+            screen.blit(pause_text, pause_rect)
+            screen.blit(resume_text, resume_rect)
+            screen.blit(menu_return_text, menu_return_rect)
+
+            # Draw score and lives in PAUSED state
+            hud.draw(screen)
 
-    elif current_game_state == GAME_STATE_LEVEL_COMPLETE:
-        level_complete_text = game_over_font.render("LEVEL COMPLETE!", True, GREEN)
-        current_score_text = menu_font_medium.render(f"Score ({selected_player_name}): {score}", True, WHITE)
-        high_score_display_text = menu_font_small.render(f"High Score: {high_score}", True, WHITE)
-        next_level_text = font.render("Press any key for next level", True, WHITE)
 
-        lc_rect = level_complete_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100))
-        score_rect = current_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30))
-        hs_display_rect = high_score_display_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
-        next_rect = next_level_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100))
+        elif current_game_state == GAME_STATE_GAMEOVER:
+            game_over_text = game_over_font.render("GAME OVER!", True, RED)
+            final_score_text = menu_font_medium.render(f"Final Score ({selected_player_name}): {score}", True, WHITE)
+            high_score_display_text = menu_font_small.render(f"High Score: {high_score}", True, WHITE)
+            restart_text = font.render("Press any key to return to player select", True, WHITE)
 
-        screen.blit(level_complete_text, lc_rect)
-        screen.blit(current_score_text, score_rect)
-        screen.blit(high_score_display_text, hs_display_rect)
-        screen.blit(next_level_text, next_rect)
+            go_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100))
+            score_rect = final_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30))
+            hs_display_rect = high_score_display_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
+            restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100))
 
-    pygame.display.flip()
-    clock.tick(60)
+            screen.blit(game_over_text, go_rect)
+            screen.blit(final_score_text, score_rect)
+            screen.blit(high_score_display_text, hs_display_rect)
+            screen.blit(restart_text, restart_rect)
 
-pygame.quit()
+        elif current_game_state == GAME_STATE_LEVEL_COMPLETE:
+            level_complete_text = game_over_font.render("LEVEL COMPLETE!", True, GREEN)
+            current_score_text = menu_font_medium.render(f"Score ({selected_player_name}): {score}", True, WHITE)
+            high_score_display_text = menu_font_small.render(f"High Score: {high_score}", True, WHITE)
+            next_level_text = font.render("Press any key for next level", True, WHITE)
+
+            lc_rect = level_complete_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100))
+            score_rect = current_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30))
+            hs_display_rect = high_score_display_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
+            next_rect = next_level_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100))
+
+            screen.blit(level_complete_text, lc_rect)
+            screen.blit(current_score_text, score_rect)
+            screen.blit(high_score_display_text, hs_display_rect)
+            screen.blit(next_level_text, next_rect)
+
+        if not in_gameplay and profiler.overlay_entry():
+            _, overlay_image, overlay_dest, _ = profiler.overlay_entry()
+            screen.blit(overlay_image, overlay_dest)
+        profiler.end()
+
+        profiler.begin("flip")
+        if dirty_renderer:
+            dirty_renderer.present()
+        else:
+            pygame.display.flip()
+        profiler.end()
+        startup_timer.finish("first frame") # Launch is over once the menu is on screen
+        profiler.end_frame()
+        if input_latency:
+            input_latency.frame_presented(sim_steps > 0)
+            if not in_gameplay:
+                input_latency.discard_pending()
+        if input_recorder:
+            input_recorder.record_frame(events, sim_steps)
+        if input_replay and input_replay.finished():
+            running = False
+            print(replay_summary())
+        frame_time = min(clock.tick(fps) / 1000.0, MAX_FRAME_TIME)
+        if not in_gameplay:
+            sim_accumulator = 0.0 # Menus and pauses don't bank simulation time
+
+# --- Entry Point ---
+def main(argv=None):
+    """Starts the game (or the headless, benchmark or asset build mode chosen on the command line)."""
+    global replay_data, leaderboard_client, input_recorder, input_replay, log_game_events
+    args = arg_parser.parse_args(argv)
+    headless = args.headless or args.benchmark or args.build_assets
+    # Thousands of simulated levels would flood stdout, and printing would count against the timings
+    log_game_events = args.verbose or not (args.headless or args.benchmark)
+
+    seed = args.seed
+    if args.replay:
+        with open(args.replay, "r") as file:
+            replay_data = json.load(file)
+        seed = replay_data['seed']
+    print(f"Session Seed: {seed_session(seed)}")
+
+    init_display(headless)
+    load_menu_assets(None if args.build_assets else ASSET_CACHE_DIR) # A build always starts from the source files
+    load_player_profiles(args.profile_db)
+    if args.leaderboard_url and not replay_data: # Replays never submit scores
+        leaderboard_client = LeaderboardClient(args.leaderboard_url)
+    init_game_objects(args.dirty_rects, args.vectorized_enemies, args.profile_csv, args.input_latency)
+    input_recorder = InputRecorder(args.record) if args.record else None
+    input_replay = InputReplay(replay_data) if replay_data else None
+
+    if headless:
+        startup_timer.finish() # No window, so launch ends here
+    if args.build_assets:
+        load_gameplay_assets()
+        Coin(0, 0) # Coins load their image when created
+        print(f"Asset Cache: Wrote {assets.write_cache(ASSET_CACHE_DIR)} images and {ASSET_MANIFEST_FILE} to {ASSET_CACHE_DIR}/")
+    elif args.benchmark:
+        run_benchmarks(parse_benchmark_sizes(args.benchmark_sizes), args.benchmark_out, args.benchmark_baseline)
+    elif headless:
+        if input_replay:
+            run_headless_replay(input_replay)
+        else:
+            run_headless(args.levels, args.frames_per_level)
+    else:
+        run_game_loop(args.fps)
+
+    profiler.close()
+    level_prefetcher.close()
+    profile_store.close()
+    if leaderboard_client:
+        leaderboard_client.close()
+    if input_recorder:
+        input_recorder.save()
+    if input_latency:
+        print(input_latency.report())
+    print(assets.report())
+    print(pools.report())
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
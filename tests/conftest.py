@@ -0,0 +1,21 @@
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import mario_platformer as game
+
+
+@pytest.fixture(scope="module", autouse=True)
+def engine():
+    """Headless display, menu assets and game objects, as main() sets them up before the first level."""
+    game.seed_session(1)
+    game.init_display(headless=True)
+    game.load_menu_assets(None)
+    game.init_game_objects()
+    yield
+    game.pygame.quit()
@@ -0,0 +1,44 @@
+import mario_platformer as game
+
+
+def make_image(directory, name, color):
+    image = game.pygame.Surface((64, 48), game.pygame.SRCALPHA)
+    image.fill(color)
+    path = str(directory / name)
+    game.pygame.image.save(image, path)
+    return path
+
+
+def test_same_label_at_several_sizes_and_alphas_all_come_back_from_the_cache(tmp_path):
+    path = make_image(tmp_path, "tile.png", (200, 40, 40, 255))
+    other_path = make_image(tmp_path, "other.png", (40, 200, 40, 255))
+    keys = [(path, (32, 24), True), (path, (16, 12), True), (path, (32, 24), False), (other_path, (32, 24), True)]
+    builder = game.AssetManager()
+    for key_path, size, alpha in keys:
+        builder.load(key_path, size, alpha, label="Tile")
+    cache_dir = str(tmp_path / "cache")
+    assert builder.write_cache(cache_dir) == len(keys)
+
+    cached = game.AssetManager(cache_dir)
+    for key_path, size, alpha in keys:
+        image = cached.load(key_path, size, alpha, label="Tile")
+        assert image.get_size() == size
+        assert image.get_at((0, 0))[:3] == builder.images[(key_path, size, alpha)].get_at((0, 0))[:3]
+    assert cached.cache_loads == len(keys)
+    assert not cached.decoded # Nothing had to be decoded from the source files
+
+
+def test_manifest_from_another_version_is_ignored(tmp_path):
+    path = make_image(tmp_path, "tile.png", (200, 40, 40, 255))
+    builder = game.AssetManager()
+    builder.load(path, (32, 24), label="Tile")
+    cache_dir = tmp_path / "cache"
+    builder.write_cache(str(cache_dir))
+    manifest_path = cache_dir / game.ASSET_MANIFEST_FILE
+    manifest = game.json.loads(manifest_path.read_text())
+    manifest['version'] = game.ASSET_MANIFEST_VERSION - 1
+    manifest_path.write_text(game.json.dumps(manifest))
+
+    cached = game.AssetManager(str(cache_dir))
+    assert cached.load(path, (32, 24), label="Tile").get_size() == (32, 24)
+    assert cached.cache_loads == 0
@@ -0,0 +1,75 @@
+import mario_platformer as game
+
+
+def clear_level():
+    for entity_type in game.ENTITY_TYPES:
+        entity_type.group.empty()
+    game.current_game_state = game.GAME_STATE_PLAYING
+    game.lives = 3
+    game.score = 0
+    game.player.reset_position_and_state(keep_powerups=False)
+
+
+def test_respawned_player_collects_coin_at_spawn_point_in_same_frame():
+    clear_level()
+    player = game.player
+    spawn_point = player.rect.topleft
+    coin = game.Coin(*spawn_point)
+    game.coins.add(coin)
+    enemy = game.Enemy(400, 300, 40, 50, None, game.ENEMY_SPEED)
+    game.enemies.add(enemy)
+    player.rect.topleft = enemy.rect.topleft
+
+    game.resolve_collisions()
+
+    assert game.lives == 2 # The enemy hit respawned the player onto the coin
+    assert player.rect.topleft == spawn_point
+    assert not coin.alive()
+    assert game.score == 1
+
+
+def test_coin_left_behind_by_respawn_is_not_collected():
+    clear_level()
+    player = game.player
+    enemy = game.Enemy(400, 300, 40, 50, None, game.ENEMY_SPEED)
+    coin = game.Coin(400, 300)
+    game.enemies.add(enemy)
+    game.coins.add(coin)
+    player.rect.topleft = enemy.rect.topleft
+
+    game.resolve_collisions()
+
+    assert game.lives == 2
+    assert coin.alive()
+    assert game.score == 0
+
+
+def test_touching_enemies_from_two_groups_costs_one_life():
+    clear_level()
+    player = game.player
+    walker = game.Enemy(400, 300, 40, 50, None, game.ENEMY_SPEED)
+    flyer = game.FlyerEnemy(400, 300)
+    game.enemies.add(walker)
+    game.flyer_enemies.add(flyer)
+    player.rect.topleft = (400, 300)
+
+    game.resolve_collisions()
+
+    # The walker's hit respawns the player away from the flyer before the flyers are checked
+    assert game.lives == 2
+    assert player.rect.topleft == (100, 100)
+
+
+def test_boss_shot_in_flight_still_hits_in_the_frame_the_boss_dies(monkeypatch):
+    clear_level()
+    player = game.player
+    boss = game.Boss(500, 100)
+    monkeypatch.setattr(game, "boss_active", True)
+    monkeypatch.setattr(game, "boss_sprite", boss) # Defeated: out of boss_group, not yet cleared by the level-complete check
+    shot = game.BossProjectile(player.rect.centerx, player.rect.centery, 0, 0)
+    game.boss_projectiles.add(shot)
+
+    game.resolve_collisions()
+
+    assert game.lives == 2
+    assert not shot.alive()
@@ -0,0 +1,26 @@
+import mario_platformer as game
+
+
+def press(key):
+    game.handle_event(game.pygame.event.Event(game.pygame.KEYDOWN, key=key))
+
+
+def release(key):
+    game.handle_event(game.pygame.event.Event(game.pygame.KEYUP, key=key))
+
+
+def test_fire_dash_press_is_recorded_as_one_action(monkeypatch):
+    tracker = game.InputLatencyTracker()
+    monkeypatch.setattr(game, "input_latency", tracker)
+    monkeypatch.setattr(game, "current_game_state", game.GAME_STATE_PLAYING)
+    game.player.reset_position_and_state(keep_powerups=False)
+    monkeypatch.setattr(game.player, "has_blast", True)
+
+    press(game.pygame.K_LSHIFT) # Starts a roll
+    press(game.pygame.K_k) # With shift held: starts a fire dash
+    release(game.pygame.K_k)
+    release(game.pygame.K_LSHIFT)
+    press(game.pygame.K_j)
+
+    assert game.player.is_fire_dashing
+    assert [action for action, _ in tracker.pending] == ["roll", "fire_dash", "slash"]
@@ -0,0 +1,73 @@
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import leaderboard_server
+import mario_platformer as game
+
+
+@pytest.fixture
+def server():
+    server = leaderboard_server.start_server_thread(port=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def server_url(server):
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def http_status(url, data=None):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=2) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_client_submissions_keep_each_players_best_score(server, monkeypatch):
+    monkeypatch.setattr(game, "LEADERBOARD_BATCH_WINDOW", 0)
+    client = game.LeaderboardClient(server_url(server))
+    for name, score in [("Liam", 10), ("Ana", 30), ("Liam", 58), ("Liam", 20)]:
+        client.submit(name, score)
+    client.close() # Sends whatever is still queued before the thread exits
+    assert not client.thread.is_alive()
+
+    status, payload = http_status(server_url(server) + "/top?limit=10")
+    assert status == 200
+    assert payload['scores'] == [{'name': "Liam", 'score': 58}, {'name': "Ana", 'score': 30}]
+    assert http_status(server_url(server) + "/top?limit=1")[1]['scores'] == [{'name': "Liam", 'score': 58}]
+
+
+def test_server_rejects_bad_requests(server):
+    url = server_url(server)
+    assert http_status(url + "/top?limit=ten")[0] == 400
+    assert http_status(url + "/scores", data=b'{"scores": [{"name": "Liam"}]}')[0] == 400
+    assert http_status(url + "/scores", data=b'not json')[0] == 400
+    assert http_status(url + "/missing")[0] == 404
+    assert http_status(url + "/missing", data=b'{}')[0] == 404
+
+
+def test_client_waits_out_the_retry_delay_while_server_is_down(monkeypatch):
+    monkeypatch.setattr(game, "LEADERBOARD_BATCH_WINDOW", 0)
+    monkeypatch.setattr(game, "LEADERBOARD_RETRY_SECONDS", 60)
+    attempts = []
+    client = game.LeaderboardClient("http://127.0.0.1:9")
+    monkeypatch.setattr(client, "_send_batch", lambda batch, timeout=None: attempts.append(list(batch)) and False)
+
+    client.submit("Liam", 1)
+    deadline = time.monotonic() + 2
+    while not attempts and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for score in range(2, 6): # Each submission wakes the thread, which must keep waiting
+        client.submit("Liam", score)
+        time.sleep(0.02)
+    assert attempts == [[("Liam", 1)]]
+
+    client.close()
+    assert attempts[-1] == [("Liam", score) for score in range(1, 6)] # The last attempt at exit sends everything
+    assert len(attempts) == 2
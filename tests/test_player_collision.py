@@ -0,0 +1,51 @@
+import pytest
+
+import mario_platformer as game
+
+
+def build_level(*platforms):
+    for group in (game.platforms, game.moving_platforms):
+        group.empty()
+    for platform in platforms:
+        game.platforms.add(platform)
+    game.terrain.rebuild(game.platforms, game.moving_platforms)
+
+
+def step_player(top, vel_y, vel_x=0):
+    player = game.player
+    player.reset_position_and_state(keep_powerups=False)
+    player.rect.topleft = (150, top)
+    player.vel_x = vel_x
+    player.vel_y = vel_y
+    player.update(game.terrain)
+    return player
+
+
+@pytest.mark.parametrize("insert_upper_first", [True, False])
+def test_fast_fall_lands_on_nearest_of_two_stacked_platforms(monkeypatch, insert_upper_first):
+    monkeypatch.setattr(game, "MAX_FALL_VELOCITY", 200)
+    upper = game.Platform(100, 140, 200)
+    lower = game.Platform(100, 180, 200)
+    build_level(*((upper, lower) if insert_upper_first else (lower, upper)))
+    # Bottom goes from 100 to 210 in one step, crossing both tops
+    player = step_player(100 - game.PLAYER_HEIGHT, 110)
+    assert player.rect.bottom == 140
+    assert player.on_ground
+
+
+@pytest.mark.parametrize("insert_lower_first", [True, False])
+def test_fast_rise_stops_under_nearest_of_two_stacked_platforms(insert_lower_first):
+    upper = game.Platform(100, 140, 200)
+    lower = game.Platform(100, 180, 200)
+    build_level(*((lower, upper) if insert_lower_first else (upper, lower)))
+    # Top goes from 230 to 120 in one step, crossing both bottoms
+    player = step_player(230, -110)
+    assert player.rect.top == 200
+    assert player.vel_y == 0
+
+
+def test_normal_fall_lands_as_before():
+    build_level(game.Platform(100, 300, 200))
+    player = step_player(300 - game.PLAYER_HEIGHT - 5, 10)
+    assert player.rect.bottom == 300
+    assert player.on_ground
@@ -0,0 +1,15 @@
+import json
+
+import mario_platformer as game
+
+
+def test_json_store_writes_the_profiles_as_they_were_when_saved(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    store = game.JsonProfileStore([], path)
+    index = store.add("Liam")
+    store.set_high_score(index, 58)
+    store.writer.close() # Waits for the background write
+    store.profiles[index]['high_score'] = 99 # Changed after the last save: not on disk
+
+    with open(path) as file:
+        assert json.load(file) == [{'name': "Liam", 'high_score': 58}]